@@ -1,12 +1,30 @@
 # bigquery_loader.py
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
 from google.cloud import bigquery
+from google.api_core import exceptions
 from google.api_core.exceptions import Conflict
 
-def ensure_bq_dataset(key:str, pid:str, did: str, location: str = "US"):
+import profiling
+from bq_schema import load_job_config, replace_if_layout_differs, table_schema
+
+# tables above this many rows are loaded in chunks through a staging table
+CHUNK_ROWS = 500_000
+MANIFEST_DIR = ".bq_upload"
+_RETRYABLE = (exceptions.ServerError, exceptions.TooManyRequests, ConnectionError, TimeoutError)
+
+def ensure_bq_dataset(key:str, pid:str, did: str, location: str = "US", client=None):
     """
     Create the dataset if it doesn't already exist.
     """
-    client = bigquery.Client.from_service_account_json(key, project=pid)
+    client = client or bigquery.Client.from_service_account_json(key, project=pid)
     # Create dataset if needed
     dataset_ref = f"{pid}.{did}"
     try:
@@ -15,26 +33,189 @@ def ensure_bq_dataset(key:str, pid:str, did: str, location: str = "US"):
         client.create_dataset(dataset_ref)
 
 
+# —————— Retry / chunked loads ——————
+
+def _with_retry(fn, retries=5, backoff=1.0, what="load"):
+    """Call fn(attempt) until it succeeds; transient errors back off exponentially with jitter."""
+    for attempt in range(retries + 1):
+        try:
+            return fn(attempt)
+        except _RETRYABLE as e:
+            if attempt == retries:
+                raise
+            delay = backoff * 2 ** attempt * (0.5 + random.random())
+            print(f"⚠️ {what} failed ({e}); retry {attempt + 1}/{retries} in {delay:.1f}s")
+            time.sleep(delay)
+
+
+def _fingerprint(df: pd.DataFrame, chunk_rows=CHUNK_ROWS) -> str:
+    """
+    Identity of a DataFrame's full contents (columns and every row), hashed
+    `chunk_rows` rows at a time: a resume must never mix chunks of two
+    different tables, however similar.
+    """
+    h = hashlib.sha256(json.dumps([len(df), list(map(str, df.columns))]).encode())
+    for lo in range(0, len(df), chunk_rows):
+        rows = pd.util.hash_pandas_object(df.iloc[lo:lo + chunk_rows], index=False)
+        h.update(rows.to_numpy().tobytes())
+    return h.hexdigest()[:16]
+
+
+class _Manifest:
+    """Chunks already loaded into the staging table, persisted after each one."""
+
+    def __init__(self, path, table_ref, fingerprint, chunk_rows, n_chunks):
+        self.path = path
+        self._lock = threading.Lock()
+        state = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                state = json.load(f)
+        same = (state.get("table") == table_ref and state.get("fingerprint") == fingerprint
+                and state.get("chunk_rows") == chunk_rows)
+        self.resumed = same and bool(state.get("done"))
+        # staging table of an earlier run with other data, for the caller to drop
+        self.stale_staging = None if same else state.get("staging")
+        self.state = state if same else {
+            "table": table_ref, "fingerprint": fingerprint, "chunk_rows": chunk_rows,
+            "n_chunks": n_chunks, "staging": f"{table_ref}__staging_{fingerprint}", "done": []}
+
+    def mark_done(self, i):
+        with self._lock:
+            self.state["done"] = sorted(set(self.state["done"]) | {i})
+            self.save()
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp, self.path)
+
+    def remove(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def _job_succeeded(client, job_id) -> bool:
+    """
+    Whether an earlier attempt's job actually finished fine server-side.
+    A job still running (the client gave up waiting, not the server) is
+    waited for: resubmitting it would load the chunk twice.
+    """
+    try:
+        job = client.get_job(job_id)
+    except exceptions.NotFound:
+        return False
+    if job.state != "DONE":
+        try:
+            job.result()
+        except exceptions.GoogleAPICallError:
+            if job.state != "DONE":
+                raise   # polling failed, not the job: retried, and checked again
+    return job.error_result is None
+
+
+def chunked_load(client, df, table_ref, table_name, chunk_rows=CHUNK_ROWS, max_workers=4,
+                 retries=5, backoff=1.0, manifest_dir=MANIFEST_DIR, schemas=None, layouts=None):
+    """
+    Load `df` into `table_ref` as parallel append jobs of at most
+    `chunk_rows` rows into a staging table, each chunk retried with
+    backoff, then copy the staging table over `table_ref` and drop it.
+
+    Finished chunks are recorded in `manifest_dir/<table_ref>.json`; if
+    some chunks still fail the manifest is kept and calling again with the
+    same data resumes with only the missing chunks.
+    """
+    n_chunks = max(1, -(-len(df) // chunk_rows))
+    manifest = _Manifest(os.path.join(manifest_dir, f"{table_ref}.json"), table_ref,
+                         _fingerprint(df, chunk_rows), chunk_rows, n_chunks)
+    staging = manifest.state["staging"]
+    load_cfg = load_job_config(table_name, df, schemas, layouts, write_disposition="WRITE_APPEND")
+
+    if manifest.stale_staging:
+        client.delete_table(manifest.stale_staging, not_found_ok=True)
+    if not manifest.resumed:
+        client.delete_table(staging, not_found_ok=True)
+    table = bigquery.Table(staging, schema=table_schema(table_name, df, schemas))
+    table.range_partitioning = load_cfg.range_partitioning
+    table.clustering_fields = load_cfg.clustering_fields
+    client.create_table(table, exists_ok=True)
+    manifest.save()
+
+    def _load_chunk(i):
+        chunk = df.iloc[i * chunk_rows:(i + 1) * chunk_rows]
+        job_ids = []
+
+        def _attempt(attempt):
+            if job_ids and _job_succeeded(client, job_ids[-1]):
+                return   # the "failed" attempt had in fact been applied
+            job_ids.append(f"{table_name}_{manifest.state['fingerprint']}_{i}_{attempt}_{int(time.time())}")
+            client.load_table_from_dataframe(chunk, staging, job_config=load_cfg,
+                                             job_id=job_ids[-1]).result()
+
+        _with_retry(_attempt, retries, backoff, what=f"{table_ref} chunk {i + 1}/{n_chunks}")
+        manifest.mark_done(i)
+
+    todo = [i for i in range(n_chunks) if i not in manifest.state["done"]]
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        errors = [f.exception() for f in [pool.submit(_load_chunk, i) for i in todo]]
+    errors = [e for e in errors if e]
+    if errors:
+        left = n_chunks - len(manifest.state["done"])
+        raise RuntimeError(f"{left}/{n_chunks} chunks of {table_ref} failed ({errors[0]}); "
+                           f"re-run to resume from {manifest.path}") from errors[0]
+
+    replace_if_layout_differs(client, table_ref, load_cfg)
+    copy_cfg = bigquery.CopyJobConfig(write_disposition="WRITE_TRUNCATE")
+    _with_retry(lambda _: client.copy_table(staging, table_ref, job_config=copy_cfg).result(),
+                retries, backoff, what=f"{table_ref} swap")
+    client.delete_table(staging, not_found_ok=True)
+    manifest.remove()
+
+
 def upload_all_to_bq(grade_df, students_df, academic_df, grads_df, term_df,
-                     project_id, dataset_id, key):
-    client = bigquery.Client.from_service_account_json(key, project=project_id)
+                     project_id, dataset_id, key, marks_df=None, extra_tables=None,
+                     schemas=None, layouts=None, client=None,
+                     chunk_rows=CHUNK_ROWS, max_workers=4, retries=5, backoff=1.0,
+                     manifest_dir=MANIFEST_DIR):
+    """
+    Load every table with an explicit schema (from the metadata catalog)
+    and its partitioning / clustering (bq_schema.TABLE_LAYOUTS).
+    `schemas` / `layouts` override those per table; `client` replaces the
+    service-account client (e.g. a stub in tests). Tables longer than
+    `chunk_rows` go through chunked_load; every load job is retried on
+    transient errors.
+    """
+    client = client or bigquery.Client.from_service_account_json(key, project=project_id)
 
     # 1) ensure dataset
-    ensure_bq_dataset(key=key,pid=project_id, did=dataset_id)
+    ensure_bq_dataset(key=key,pid=project_id, did=dataset_id, client=client)
 
     # 2) upload each table (truncating any existing)
     def _upload(df, table_name):
         table_ref = f"{project_id}.{dataset_id}.{table_name}"
-        job = client.load_table_from_dataframe(
-            df,
-            table_ref,
-            job_config=bigquery.LoadJobConfig(write_disposition="WRITE_TRUNCATE")
-        )
-        job.result()
+        if len(df) > chunk_rows:
+            chunked_load(client, df, table_ref, table_name, chunk_rows, max_workers,
+                         retries, backoff, manifest_dir, schemas, layouts)
+        else:
+            cfg = load_job_config(table_name, df, schemas, layouts)
+            replace_if_layout_differs(client, table_ref, cfg)
+            _with_retry(lambda _: client.load_table_from_dataframe(
+                df,
+                table_ref,
+                job_config=cfg
+            ).result(), retries, backoff, what=table_ref)
         print(f"Uploaded {len(df)} rows to {table_ref}")
 
-    _upload(grade_df,    "grades")
-    _upload(students_df.drop(columns=["last_pct","fail_count","terminated"]), "students")
-    _upload(academic_df, "academic")
-    _upload(grads_df,    "graduates")
-    _upload(term_df,     "terminated")
+    with profiling.phase("upload"):
+        _upload(grade_df,    "grades")
+        _upload(students_df.drop(columns=["last_pct","fail_count","terminated"]), "students")
+        _upload(academic_df, "academic")
+        _upload(grads_df,    "graduates")
+        _upload(term_df,     "terminated")
+        if marks_df is not None:
+            _upload(marks_df, "academic_subject_marks")
+        # optional extras such as the rollup tables: {table_name: DataFrame}
+        for name, df in (extra_tables or {}).items():
+            _upload(df, name)
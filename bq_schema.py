@@ -0,0 +1,160 @@
+# bq_schema.py
+"""
+Explicit BigQuery schemas and table layouts for the uploaded tables.
+
+Schemas come from the "Student Records Metadata" catalog: every
+"## N. `table`" / "### `table`" section's column table gives each
+column's type and description. Columns missing from the catalog (e.g.
+the semester layout's academic_records) fall back to a type derived from
+the pandas dtype, so a load never depends on BigQuery's inference.
+
+TABLE_LAYOUTS gives each table its integer-range partitioning and
+clustering; both schemas and layouts can be overridden per table.
+BigQuery cannot change the partitioning of an existing table, so a
+truncating load first drops a table whose layout differs (e.g. one made
+by an older, unpartitioned upload) with replace_if_layout_differs().
+"""
+import os
+import re
+
+import pandas as pd
+from google.api_core import exceptions
+from google.cloud import bigquery
+
+CATALOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Student Records Metadata")
+
+_TYPES = {"INTEGER": "INT64", "INT64": "INT64", "FLOAT": "FLOAT64", "FLOAT64": "FLOAT64",
+          "BOOLEAN": "BOOL", "BOOL": "BOOL", "STRING": "STRING", "DATE": "DATE"}
+
+# partition: (column, start, end, interval) for integer-range partitioning
+YEAR_PARTITION = ("academic_year", 1900, 2100, 1)
+TABLE_LAYOUTS = {
+    "academic":               {"partition": YEAR_PARTITION, "clustering": ["enrollment_id", "grade"]},
+    "academic_records":       {"partition": YEAR_PARTITION, "clustering": ["enrollment_id", "grade_current"]},
+    "academic_subject_marks": {"partition": YEAR_PARTITION, "clustering": ["enrollment_id", "subject"]},
+    "student_state_by_year":  {"partition": YEAR_PARTITION, "clustering": ["grade", "enrollment_id"]},
+    "students":               {"partition": None, "clustering": ["enrollment_year", "enrollment_id"]},
+    "graduates":              {"partition": None, "clustering": ["enrollment_id"]},
+    "terminated":             {"partition": None, "clustering": ["academic_year", "enrollment_id"]},
+}
+
+
+# —————— Catalog parsing ——————
+
+def _expand_names(cell):
+    """`a`, `b` -> [a, b]; `subject_1_marks` … `subject_5_marks` -> the whole range."""
+    names = re.findall(r"`([^`]+)`", cell)
+    if "…" in cell and len(names) == 2:
+        a = re.fullmatch(r"(.*?)(\d+)(.*)", names[0])
+        b = re.fullmatch(r"(.*?)(\d+)(.*)", names[1])
+        if a and b and (a[1], a[3]) == (b[1], b[3]):
+            return [f"{a[1]}{i}{a[3]}" for i in range(int(a[2]), int(b[2]) + 1)]
+    return names
+
+
+def parse_catalog(path=CATALOG_PATH) -> dict:
+    """{table: [SchemaField, ...]} from the metadata catalog."""
+    schemas, table = {}, None
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            head = re.match(r"^#{2,3} (?:\d+\. )?`(\w+)`", line)
+            if head:
+                table = head[1]
+                schemas[table] = []
+                continue
+            if line.startswith("#"):
+                table = None
+            if not table or not line.startswith("|"):
+                continue
+            cells = [c.strip() for c in line.strip().strip("|").split("|")]
+            if len(cells) < 3 or "`" not in cells[0]:
+                continue   # header / separator rows
+            names = _expand_names(cells[0])
+            types = [_TYPES[t.strip().upper()] for t in cells[1].split("/")]
+            desc = re.sub(r"[`*\\]", "", cells[2])
+            for i, nm in enumerate(names):
+                schemas[table].append(bigquery.SchemaField(
+                    nm, types[i] if len(types) == len(names) else types[0], description=desc))
+    return {t: fields for t, fields in schemas.items() if fields}
+
+
+_CATALOG = None
+
+
+def catalog() -> dict:
+    global _CATALOG
+    if _CATALOG is None:
+        _CATALOG = parse_catalog()
+    return _CATALOG
+
+
+# —————— Job config ——————
+
+def _dtype_type(series: pd.Series) -> str:
+    if pd.api.types.is_bool_dtype(series):
+        return "BOOL"
+    if pd.api.types.is_integer_dtype(series):
+        return "INT64"
+    if pd.api.types.is_float_dtype(series):
+        return "FLOAT64"
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return "TIMESTAMP"
+    return "STRING"
+
+
+def table_schema(table_name: str, df: pd.DataFrame, schemas: dict = None) -> list:
+    """Schema for exactly the columns of `df`, in order."""
+    known = {f.name: f for f in (schemas or {}).get(table_name) or catalog().get(table_name, [])}
+    return [known.get(col) or bigquery.SchemaField(col, _dtype_type(df[col]))
+            for col in df.columns]
+
+
+def load_job_config(table_name: str, df: pd.DataFrame, schemas: dict = None,
+                    layouts: dict = None,
+                    write_disposition="WRITE_TRUNCATE") -> bigquery.LoadJobConfig:
+    """
+    LoadJobConfig with an explicit schema plus the table's partitioning and
+    clustering. `schemas` / `layouts` override the catalog / TABLE_LAYOUTS
+    per table; layout columns missing from `df` are ignored.
+    """
+    layout = {**TABLE_LAYOUTS.get(table_name, {}), **(layouts or {}).get(table_name, {})}
+    cfg = bigquery.LoadJobConfig(write_disposition=write_disposition,
+                                 schema=table_schema(table_name, df, schemas))
+    part = layout.get("partition")
+    if part and part[0] in df.columns:
+        col, start, end, interval = part
+        cfg.range_partitioning = bigquery.RangePartitioning(
+            field=col, range_=bigquery.PartitionRange(start=start, end=end, interval=interval))
+    clustering = [c for c in layout.get("clustering") or [] if c in df.columns]
+    if clustering:
+        cfg.clustering_fields = clustering[:4]   # BigQuery allows at most four
+    return cfg
+
+
+# —————— Existing tables ——————
+
+def _layout(partitioning, clustering) -> tuple:
+    part = partitioning and (partitioning.field, partitioning.range_.start,
+                             partitioning.range_.end, partitioning.range_.interval)
+    return part or None, list(clustering or [])
+
+
+def replace_if_layout_differs(client, table_ref: str, cfg: bigquery.LoadJobConfig) -> bool:
+    """
+    Drop `table_ref` if it exists with other partitioning / clustering than
+    `cfg`, so the truncating load (or copy) that follows can create it
+    anew: BigQuery rejects those against a table laid out differently.
+    Only call it before replacing the table's contents. Returns whether
+    the table was dropped.
+    """
+    try:
+        existing = client.get_table(table_ref)
+    except exceptions.NotFound:
+        return False
+    if existing.time_partitioning is None and (
+            _layout(existing.range_partitioning, existing.clustering_fields)
+            == _layout(cfg.range_partitioning, cfg.clustering_fields)):
+        return False
+    print(f"♻️ {table_ref} has another partitioning / clustering; recreating it")
+    client.delete_table(table_ref, not_found_ok=True)
+    return True
@@ -0,0 +1,143 @@
+# csv_export.py
+"""
+Fast CSV export for the generated tables.
+
+Every table is converted to Arrow and written by pyarrow's C++ CSV writer
+on its own thread (the writer releases the GIL), so the five tables are
+written concurrently. Output can be gzip- or zstd-compressed. Each file is
+written to a temporary name in the output directory and renamed into
+place once complete: readers never see a half-written file, and a file
+held open elsewhere fails that table with an error instead of waiting on
+input(). The bytes are those DataFrame.to_csv(index=False) writes: quotes
+only where needed, True/False, floats as Python repr ("1.0"), and files
+get the usual umask permissions.
+"""
+import io
+import os
+import secrets
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+
+import profiling
+from engine.backend import to_arrow, to_pandas
+
+COMPRESSIONS = {None: ".csv", "gzip": ".csv.gz", "zstd": ".csv.zst"}
+_STRUCTURAL = r'[,"\r\n]'
+
+
+def _to_arrow(df) -> pa.Table:
+    return csv_ready(to_arrow(df))
+
+
+def _float_text(col) -> pa.Array:
+    """Float column as the text pandas writes: Python's repr ("1.0", "1e-05"), nulls stay null."""
+    col = col.combine_chunks() if isinstance(col, pa.ChunkedArray) else col
+    values = col.to_numpy(zero_copy_only=False)
+    null = np.asarray(col.is_null())
+    if col.type == pa.float64():
+        # Arrow's shortest round-trip digits match repr in plain notation; it only differs
+        # in where it switches to exponents, and it drops ".0" from whole numbers
+        arrow_text = pc.cast(col, pa.string())
+        text = np.asarray(arrow_text, dtype=object)
+        mag = np.abs(values)
+        has = lambda ch: np.asarray(pc.match_substring(arrow_text, ch).fill_null(False))
+        plain = ~null & np.isfinite(mag) & ((mag >= 1e-4) | (mag == 0)) & ~has("e")
+        whole = plain & ~has(".")
+        text[whole] = text[whole] + ".0"
+        rest = ~null & ~plain
+        text[rest] = values[rest].astype(str)
+    else:
+        text = values.astype(str).astype(object)
+    return pa.array(text, type=pa.string(), mask=null)
+
+
+def csv_ready(table: pa.Table) -> pa.Table:
+    """
+    `table` with pandas' spelling for booleans (True/False rather than
+    Arrow's true/false) and floats (repr, e.g. 1.0 rather than 1).
+    Write it with write_options(table).
+    """
+    for i, field in enumerate(table.schema):
+        if pa.types.is_boolean(field.type):
+            col = pc.if_else(table.column(i), "True", "False")
+            table = table.set_column(i, field.name, col)
+        elif pa.types.is_floating(field.type):
+            table = table.set_column(i, field.name, _float_text(table.column(i)))
+    return table.replace_schema_metadata(None)
+
+
+def needs_quoting(table: pa.Table) -> bool:
+    """Whether any text value contains a comma, quote or line break."""
+    return any(pc.any(pc.match_substring_regex(table.column(i), _STRUCTURAL)).as_py()
+               for i, field in enumerate(table.schema)
+               if pa.types.is_string(field.type) or pa.types.is_large_string(field.type))
+
+
+def write_options(table: pa.Table, **kwargs) -> pacsv.WriteOptions:
+    """
+    Unquoted output, as pandas writes it, unless a value needs quotes: Arrow
+    can then only quote every text field ("needed"), which parses the same.
+    """
+    style = "needed" if needs_quoting(table) else "none"
+    return pacsv.WriteOptions(quoting_header="none", quoting_style=style, **kwargs)
+
+
+def _create_temp(directory) -> str:
+    """
+    A new empty file in `directory`, with the mode open() would give it
+    (0666 less the umask; mkstemp's files are 0600).
+    """
+    while True:
+        tmp = os.path.join(directory, f".tmp-{secrets.token_hex(6)}")
+        try:
+            os.close(os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666))
+            return tmp
+        except FileExistsError:
+            continue
+
+
+def write_csv(df, path: str, compression: str = None):
+    """Write one table (pandas / polars DataFrame or pyarrow Table) to `path` atomically (temp file + rename)."""
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"compression must be one of {list(COMPRESSIONS)}, got {compression!r}")
+    table = _to_arrow(df)
+    exact = not needs_quoting(table)
+    tmp = _create_temp(os.path.dirname(path) or ".")
+    try:
+        sink = pa.CompressedOutputStream(tmp, compression) if compression else pa.OSFile(tmp, "wb")
+        with sink:
+            if exact:
+                pacsv.write_csv(table, sink, pacsv.WriteOptions(quoting_header="none", quoting_style="none"))
+            else:
+                # rare: Arrow would quote every text field, pandas only the ones that need it
+                with io.TextIOWrapper(sink, encoding="utf-8", newline="") as f:
+                    to_pandas(df).to_csv(f, index=False)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return path
+
+
+def write_tables(tables: dict, out_dir: str = ".", compression: str = None,
+                 max_workers: int = None) -> dict:
+    """
+    Write {name: DataFrame} to `out_dir`/<name>.csv[.gz|.zst] concurrently.
+    Returns {name: path}; raises the first error after all writes finished.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    ext = COMPRESSIONS.get(compression, ".csv")
+    paths = {nm: os.path.join(out_dir, nm + ext) for nm in tables}
+    with profiling.phase("write_csv"), \
+            ThreadPoolExecutor(max_workers=max_workers or len(tables) or 1) as pool:
+        futures = {nm: pool.submit(write_csv, df, paths[nm], compression)
+                   for nm, df in tables.items()}
+    errors = {nm: f.exception() for nm, f in futures.items() if f.exception()}
+    if errors:
+        nm, err = next(iter(errors.items()))
+        raise OSError(f"Could not write {paths[nm]}: {err}") from err
+    return paths
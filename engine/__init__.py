@@ -0,0 +1,54 @@
+"""
+School records simulation engine.
+
+One vectorized implementation of the generators: population builders,
+a compiled curriculum, batched marks models, pluggable rule sets and the
+yearly simulation step. The GUI, the CLI scripts and the out-of-core
+runner all call into this package.
+"""
+# bump whenever a change alters what a given configuration generates;
+# it is part of every output cache key (see output_cache.py)
+ENGINE_VERSION = "1.1"
+
+from .attendance import ATTENDANCE_COLUMNS, AttendanceWriter, school_days
+from .backend import BACKENDS, to_arrow, to_pandas
+from .context import GeneratorContext
+from .core import (
+    Simulation,
+    SimulationResult,
+    YearBatch,
+    active_positions,
+    iter_simulation,
+    simulate,
+    simulate_year,
+)
+from .curriculum import Curriculum, CurriculumEntry, as_curriculum
+from .features import FEATURE_FORMATS, FeatureMatrix, feature_columns
+from .marks_model import LatentAbilityMarks, SplitMarks, UniformMarks, parse_difficulty
+from .population import (
+    build_name_pools,
+    calculate_student_distribution,
+    generate_grade_table,
+    generate_initial_student_enrollment,
+    generate_semester_grade_table,
+    generate_student_details,
+    generate_student_enrollment,
+    generate_subject_counts,
+    intake_cohort,
+)
+from .rollups import ROLLUP_TABLES, RollupCollector, year_partials
+from .rules import (
+    AnnualScoring,
+    BalancedPlacement,
+    NoIntake,
+    PriorPercentagePlacement,
+    ReplaceLeavers,
+    RuleSet,
+    SemesterScoring,
+    ThreeStrikes,
+    annual_rules,
+    semester_rules,
+)
+from .state_snapshot import STUDENT_STATE_COLUMNS, state_snapshot
+from .student_store import StudentStore, with_tracking
+from .subject_marks import MARKS_FORMATS, SUBJECT_MARKS_COLUMNS, MarksCollector, marks_matrix_frame
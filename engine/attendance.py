@@ -0,0 +1,168 @@
+"""
+`attendance`: one row per (school day, enrollment_id) for every student
+the year step scored, with status present / absent / late.
+
+Each student gets an absence and a lateness rate for the year from their
+performance class that year (A students miss the fewest days) times a
+per-student lognormal factor, and every school day is one vectorized
+draw against those rates. Rows are streamed straight into Parquet,
+hive-partitioned by academic year (the academic_year of the other tables:
+year=2015 is September 2015 – June 2016) and calendar month of `date`:
+
+    <out_dir>/year=2015/month=09/part-0.parquet
+    <out_dir>/year=2015/month=01/part-0.parquet    (January 2016)
+
+The months of a year are generated and written on `workers` threads
+(Parquet encoding releases the GIL), each at most `batch_rows` rows at a
+time, and every call adds row groups to the open files of its year, so a
+national-scale run (billions of rows) needs no more memory than
+`workers` batches. The generator has its own random stream, split per
+month, so its output does not depend on `workers`, and turning
+attendance on does not change any other table of a seeded run.
+"""
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from .rules import performance_class
+
+ATTENDANCE_COLUMNS = ["date", "enrollment_id", "status"]
+STATUSES = ["present", "absent", "late"]
+
+# per performance class A…D: share of school days absent / late before the per-student factor
+ABSENT_RATE = np.array([0.02, 0.04, 0.07, 0.12])
+LATE_RATE   = np.array([0.02, 0.03, 0.05, 0.08])
+_SPREAD     = 0.5                  # sigma of the per-student lognormal factor
+
+_SCHEMA = pa.schema([("date", pa.date32()),
+                     ("enrollment_id", pa.int64()),
+                     ("status", pa.dictionary(pa.int8(), pa.string()))])
+_STATUS_DICT = pa.array(STATUSES)
+
+
+@lru_cache(maxsize=None)
+def school_days(year: int) -> np.ndarray:
+    """
+    Weekdays of academic year `year` (1 September `year` – 30 June
+    `year` + 1) outside the winter break (24 December – 1 January), as
+    datetime64[D].
+    """
+    days = np.arange(np.datetime64(f"{year}-09-01"), np.datetime64(f"{year + 1}-07-01"))
+    month = days.astype("datetime64[M]").astype(int) % 12 + 1
+    dom = (days - days.astype("datetime64[M]")).astype(int) + 1
+    weekday = (days.astype(np.int64) + 3) % 7            # 1970-01-01 was a Thursday
+    open_ = (weekday < 5) & ~((month == 12) & (dom >= 24)) & ~((month == 1) & (dom == 1))
+    return days[open_]
+
+
+def attendance_rates(pct, rng) -> tuple[np.ndarray, np.ndarray]:
+    """(absent, late) daily probabilities for students with year percentage `pct`."""
+    cls = performance_class(pct)
+    factor = rng.lognormal(0.0, _SPREAD, size=len(cls))
+    absent = np.minimum(ABSENT_RATE[cls] * factor, 0.6)
+    late = np.minimum(LATE_RATE[cls] * factor, 0.3)
+    return absent, late
+
+
+class AttendanceWriter:
+    """
+    Streams attendance rows into `out_dir`. Feed it each year's scored
+    students with add_year() (several calls per year are fine, e.g. one
+    per chunk), or whole YearBatches with add_batch(); close() finishes
+    the files and returns {partition: rows}. A year's partition is
+    replaced as a whole when the writer first gets rows for it; other
+    years (and anything else) in `out_dir` are left alone.
+    """
+
+    def __init__(self, out_dir, seed=None, rng=None, batch_rows=2_000_000, compression="zstd",
+                 workers=4):
+        self.out_dir, self.batch_rows, self.compression = out_dir, batch_rows, compression
+        self._pool = ThreadPoolExecutor(max_workers=workers)
+        self.rng = rng if rng is not None else np.random.default_rng(
+            None if seed is None else [seed, 0xA77E])
+        self.rows = {}
+        self._year = None
+        self._writers = {}
+        self._replaced = set()
+
+    def _writer(self, year, month):
+        key = f"year={year}/month={month:02d}"
+        if key not in self._writers:
+            path = os.path.join(self.out_dir, key)
+            os.makedirs(path, exist_ok=True)
+            # ids are near-sorted within a batch: delta encoding beats a dictionary
+            self._writers[key] = pq.ParquetWriter(
+                os.path.join(path, "part-0.parquet"), _SCHEMA, compression=self.compression,
+                use_dictionary=["date", "status"],
+                column_encoding={"enrollment_id": "DELTA_BINARY_PACKED"})
+            self.rows[key] = 0
+        return key, self._writers[key]
+
+    def _close_writers(self):
+        for w in self._writers.values():
+            w.close()
+        self._writers = {}
+
+    def add_year(self, year, enrollment_ids, pct) -> int:
+        """Write the attendance of students `enrollment_ids` (year percentage `pct`) in `year`."""
+        if year != self._year:
+            self._close_writers()
+            self._year = year
+        if year not in self._replaced:
+            # a rerun replaces the year's partition, not just the months it writes again
+            shutil.rmtree(os.path.join(self.out_dir, f"year={year}"), ignore_errors=True)
+            self._replaced.add(year)
+        ids = np.asarray(enrollment_ids, dtype=np.int64)
+        if not len(ids):
+            return 0
+        absent, late = attendance_rates(np.asarray(pct, dtype=np.float64), self.rng)
+        days = school_days(year)
+        months = days.astype("datetime64[M]").astype(int) % 12 + 1
+        jobs = [(self._writer(year, int(m)), days[months == m], rng)
+                for m, rng in zip(np.unique(months), self.rng.spawn(len(np.unique(months))))]
+        futures = [self._pool.submit(self._write_month, writer, mdays, ids, absent, late, rng)
+                   for (_, writer), mdays, rng in jobs]
+        written = 0
+        for ((key, _), _, _), fut in zip(jobs, futures):
+            n = fut.result()
+            self.rows[key] += n
+            written += n
+        return written
+
+    def _write_month(self, writer, mdays, ids, absent, late, rng) -> int:
+        step = max(1, self.batch_rows // len(mdays))
+        for lo in range(0, len(ids), step):
+            hi = min(len(ids), lo + step)
+            u = rng.random((len(mdays), hi - lo), dtype=np.float32)    # day-major: rows sorted by date
+            code = (u < absent[lo:hi]).astype(np.int8)
+            code[(u >= absent[lo:hi]) & (u < absent[lo:hi] + late[lo:hi])] = 2
+            table = pa.Table.from_arrays(
+                [pa.array(np.repeat(mdays, hi - lo)),
+                 pa.array(np.tile(ids[lo:hi], len(mdays))),
+                 pa.DictionaryArray.from_arrays(pa.array(code.ravel()), _STATUS_DICT)],
+                schema=_SCHEMA)
+            writer.write_table(table)
+        return len(ids) * len(mdays)
+
+    def add_batch(self, batch) -> int:
+        """add_year() for an engine YearBatch; needs its student_state rows (snapshots=True)."""
+        if batch.student_state is None:
+            raise ValueError("attendance needs the year's student_state rows (snapshots=True)")
+        state = batch.student_state
+        return self.add_year(batch.year, np.asarray(state["enrollment_id"]), np.asarray(state["final_pct"]))
+
+    def close(self) -> dict:
+        self._close_writers()
+        self._pool.shutdown()
+        return dict(self.rows)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,152 @@
+"""
+Output backends: which dataframe library the engine builds its tables in.
+
+The simulation itself always runs on NumPy columns; a backend only
+decides what the per-year batches and the final tables are made of:
+
+  • "pandas" – pandas DataFrames (the default, what every caller expects)
+  • "arrow"  – pyarrow Tables, built straight from the NumPy columns and
+               concatenated without copying; strings never become pandas
+               object columns, and CSV / Parquet export and joins run in
+               Arrow's multithreaded C++ code
+  • "polars" – polars DataFrames, made zero-copy from the Arrow tables
+               (needs the optional `polars` package)
+
+Policies hand the backend a {column: array} dict; nullable integer
+columns are NumPy masked arrays. They become Int64 columns in pandas and
+Arrow fields tagged as such, so `to_pandas()` gives them back as Int64
+even when no value is missing. `to_pandas()` / `to_arrow()` convert any
+backend's table for code that needs one or the other.
+"""
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+BACKENDS = ("pandas", "arrow", "polars")
+_NULLABLE_INT = {"pandas_dtype": "Int64"}     # field metadata of a masked-array column
+
+
+def check_backend(name: str) -> str:
+    if name not in BACKENDS:
+        raise ValueError(f"backend must be one of {BACKENDS}, got {name!r}")
+    return name
+
+
+class PandasBackend:
+    name = "pandas"
+
+    def frame(self, columns: dict, order=None) -> pd.DataFrame:
+        data = {c: (pd.arrays.IntegerArray(v.data.astype(np.int64), np.ma.getmaskarray(v).copy())
+                    if isinstance(v, np.ma.MaskedArray) else v)
+                for c, v in columns.items()}
+        df = pd.DataFrame(data)
+        return df[order] if order else df
+
+    def empty(self, columns) -> pd.DataFrame:
+        return pd.DataFrame(columns=columns)
+
+    def concat(self, frames, columns=()):
+        frames = [f for f in frames if len(f)]
+        if not frames:
+            return self.empty(columns)
+        return pd.concat(frames, ignore_index=True)
+
+    def from_pandas(self, df):
+        return df
+
+    def finish(self, table):
+        return table
+
+
+class ArrowBackend:
+    name = "arrow"
+
+    @staticmethod
+    def _array(values, n):
+        if isinstance(values, np.ma.MaskedArray):
+            return pa.array(values.data, mask=np.ma.getmaskarray(values))
+        if np.isscalar(values):
+            return pa.array(np.full(n, values))
+        values = np.asarray(values)
+        if values.dtype == object:
+            return pa.array(values, from_pandas=True)
+        return pa.array(values)
+
+    def frame(self, columns: dict, order=None) -> pa.Table:
+        n = next((len(v) for v in columns.values() if not np.isscalar(v)), 0)
+        names = order or list(columns)
+        arrays = [self._array(columns[c], n) for c in names]
+        fields = [pa.field(c, a.type, metadata=_NULLABLE_INT if isinstance(columns[c], np.ma.MaskedArray)
+                           else None) for c, a in zip(names, arrays)]
+        return pa.Table.from_arrays(arrays, schema=pa.schema(fields))
+
+    def empty(self, columns) -> pa.Table:
+        return pa.table({c: pa.array([], pa.null()) for c in columns})
+
+    def concat(self, frames, columns=()):
+        frames = [f for f in frames if len(f)]
+        if not frames:
+            return self.empty(columns)
+        # all-null batches (e.g. a year without Sem 2 marks) are promoted to the other types
+        return pa.concat_tables(frames, promote_options="permissive")
+
+    def from_pandas(self, df) -> pa.Table:
+        return pa.Table.from_pandas(df, preserve_index=False).replace_schema_metadata(None)
+
+    def finish(self, table):
+        return table
+
+
+class PolarsBackend(ArrowBackend):
+    """Arrow tables throughout; only the final tables are handed over to polars."""
+    name = "polars"
+
+    def __init__(self):
+        try:
+            import polars
+        except ImportError as e:
+            raise ImportError("backend='polars' needs the polars package (pip install polars)") from e
+        self._pl = polars
+
+    def finish(self, table):
+        return self._pl.from_arrow(table)
+
+
+def get_backend(name="pandas"):
+    return {"pandas": PandasBackend, "arrow": ArrowBackend,
+            "polars": PolarsBackend}[check_backend(name)]()
+
+
+PANDAS = PandasBackend()
+
+
+# —————— Conversions ——————
+
+def to_arrow(table) -> pa.Table:
+    """A pyarrow Table from a pandas / polars DataFrame or a Table (returned as is)."""
+    if isinstance(table, pa.Table):
+        return table
+    if isinstance(table, pd.DataFrame):
+        return ArrowBackend().from_pandas(table)
+    return table.to_arrow()                     # polars
+
+
+def to_pandas(table) -> pd.DataFrame:
+    """A pandas DataFrame from any backend's table (nullable integers stay Int64)."""
+    if isinstance(table, pd.DataFrame):
+        return table
+    table = to_arrow(table)
+    df = table.to_pandas()
+    for field, col in zip(table.schema, table.columns):
+        nullable = col.null_count or (field.metadata or {}).get(b"pandas_dtype") == b"Int64"
+        if pa.types.is_integer(col.type) and nullable:
+            df[field.name] = df[field.name].astype("Int64")
+    return df
+
+
+def to_columns(table) -> dict:
+    """{column: NumPy array} from any backend's table (strings as object arrays)."""
+    if isinstance(table, (pd.DataFrame, dict)):
+        return {c: np.asarray(v) for c, v in table.items()}
+    table = to_arrow(table)
+    return {c: col.to_numpy(zero_copy_only=False) for c, col in zip(table.column_names, table.columns)}
@@ -0,0 +1,60 @@
+"""
+Per-run generator context.
+
+A GeneratorContext owns everything random a run draws from: the NumPy
+generator for populations and marks, a random.Random for the grade
+table's subject picks, the Faker name pools and the run's curriculum.
+Builders and the simulation take it explicitly (`ctx=`), so runs on
+different threads of one process never share state and one run's seed
+never moves another's draws.
+
+The name pools are the expensive part (a Faker call per name) and are
+read-only, so a warm context can hand them on: `ctx.reseed(seed)` is a
+fresh, independent context that reuses them.
+"""
+import random
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from .curriculum import Curriculum, as_curriculum
+from .population import build_name_pools, generate_grade_table, generate_semester_grade_table
+
+
+@dataclass
+class GeneratorContext:
+    seed: int = None
+    rng: np.random.Generator = None
+    rnd: random.Random = None
+    pools: tuple = None
+    grade_df: object = None
+    curriculum: Curriculum = field(default=None, repr=False)
+
+    @classmethod
+    def create(cls, seed=None, name_pool_seed=None, pools=None):
+        """
+        Context for one run. Name pools are drawn with `name_pool_seed`
+        (default: `seed`) unless warm `pools` are passed in.
+        """
+        if pools is None:
+            pools = build_name_pools(seed=seed if name_pool_seed is None else name_pool_seed)
+        return cls(seed=seed, rng=np.random.default_rng(seed),
+                   rnd=random.Random(seed) if seed is not None else random.Random(),
+                   pools=pools)
+
+    def reseed(self, seed=None):
+        """A new, independent context for another run that shares these name pools."""
+        return GeneratorContext.create(seed, pools=self.pools)
+
+    def grade_table(self, subjects):
+        """Draw this run's annual grade table and keep it as the run's curriculum."""
+        return self.use_grade_table(generate_grade_table(subjects, self.rnd))
+
+    def semester_grade_table(self, all_subjects, mandatory_subjects, total_grades):
+        return self.use_grade_table(
+            generate_semester_grade_table(all_subjects, mandatory_subjects, total_grades, self.rnd))
+
+    def use_grade_table(self, grade_df):
+        self.grade_df = grade_df
+        self.curriculum = as_curriculum(grade_df)
+        return grade_df
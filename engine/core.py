@@ -0,0 +1,246 @@
+"""
+The simulation engine: one vectorized year step shared by every generator.
+
+    result = simulate(students, grade_table, start_year, end_year, rules)
+    for batch in iter_simulation(students, grade_table, start_year, end_year, rules): ...
+
+Each year the active students are scored, placed in classes, recorded,
+then promoted / graduated / terminated by the rule set, and finally the
+intake policy may admit new students. All steps work on whole cohorts of
+NumPy columns; there is no per-student Python loop.
+"""
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from .backend import PANDAS, get_backend, to_columns
+from .curriculum import as_curriculum
+from .features import FeatureMatrix
+from .population import build_name_pools
+from .rollups import RollupCollector, year_partials
+from .rules import RuleSet, annual_rules
+from .state_snapshot import STUDENT_STATE_COLUMNS, state_snapshot
+from .student_store import TRACKING_COLUMNS, StudentStore, with_tracking
+from .subject_marks import SUBJECT_MARKS_COLUMNS, MarksCollector, check_marks_format
+
+
+class YearBatch(NamedTuple):
+    year: int
+    academic: pd.DataFrame
+    graduates: pd.DataFrame
+    terminated: pd.DataFrame
+    subject_marks: pd.DataFrame   # None for marks_format="wide"
+    active: int
+    leavers: int
+    rollups: dict = None          # rollup partials, when requested
+    student_state: pd.DataFrame = None   # student_state_by_year rows, when requested
+
+
+class SimulationResult(NamedTuple):
+    academic: pd.DataFrame
+    graduates: pd.DataFrame
+    terminated: pd.DataFrame
+    students: pd.DataFrame        # everyone ever enrolled, incl. intake
+    subject_marks: pd.DataFrame   # None for marks_format="wide"
+    rollups: dict = None          # {name: DataFrame} when rollups=True
+    student_state: pd.DataFrame = None   # student_state_by_year, when snapshots=True
+    features: FeatureMatrix = None       # per-student ML features, when features=True
+
+
+def active_positions(state, year, rules: RuleSet) -> np.ndarray:
+    active = ~state["terminated"]
+    if rules.skip_future_enrollments:
+        active &= state["enrollment_year"] <= year
+    return np.flatnonzero(active)
+
+
+def simulate_year(state, year, curriculum, rules: RuleSet, rng,
+                  marks_format="wide", idx=None, rollups=False, snapshots=False,
+                  features: FeatureMatrix = None, row_offset=0, backend=PANDAS) -> YearBatch:
+    """
+    Run one academic year on `state` (dict of NumPy columns, updated in
+    place). `idx` restricts the step to given positions; by default every
+    active student takes part. With `rollups` / `snapshots`, the batch also
+    carries the year's rollup partials (engine.rollups) / its
+    student_state_by_year rows (engine.state_snapshot). `features` is a
+    FeatureMatrix to record the year into, at rows idx + row_offset.
+    The batch's tables are built by `backend` (engine.backend).
+    """
+    idx = active_positions(state, year, rules) if idx is None else idx
+    scores = rules.scoring.score(state, idx, curriculum, rng)
+    cls = rules.placement.place(state, idx, scores.pct, rng)
+    state["class"][idx] = cls
+    academic = rules.scoring.records(year, state, idx, cls, scores, marks_format,
+                                     rules.termination.final_grade, backend)
+    marks = None
+    if marks_format != "wide":
+        collector = MarksCollector(backend)
+        eids = state["enrollment_id"][idx]
+        for b in scores.blocks:
+            collector.add_matrix(year, eids[b.rows], b.subjects, b.marks, b.semester)
+        marks = collector.frame()
+    grade = state["grade"][idx].copy()
+    grads, term, leavers = rules.termination.apply(state, idx, scores.pct, year, backend)
+    passed = scores.pct >= rules.termination.pass_mark
+    partials = snapshot = None
+    if rollups:
+        left = state["terminated"][idx]
+        partials = year_partials(year, grade, cls, scores.pct, state["enrollment_year"][idx],
+                                 passed, left & passed, left & ~passed)
+    if snapshots:
+        snapshot = state_snapshot(year, state, idx, grade, cls, scores.pct, passed, backend)
+    if features is not None:
+        left = state["terminated"][idx]
+        features.record(year, idx + row_offset, grade, cls, scores.pct, passed,
+                        left & passed, left & ~passed)
+    return YearBatch(year, academic, grads, term, marks, len(idx), leavers, partials, snapshot)
+
+
+class Simulation:
+    """
+    A simulation run one year at a time. Iterating yields each year's
+    YearBatch (academic rows, new graduates, new terminations and, with
+    `snapshots=True`, the year's student_state rows) as soon as the year is
+    done; nothing is kept between years, so consumers can stop early or
+    stream years into their own sinks in constant memory. Arguments are
+    those of simulate(). After (or during) the run, `students()` is
+    everyone enrolled so far, `rollup_tables()` the rollups and `features`
+    the FeatureMatrix (complete once the last year is done), when requested.
+    """
+
+    def __init__(self, students, grade_table, start_year: int, end_year: int,
+                 rules: RuleSet = None, rng=None, marks_format="wide", pools=None,
+                 log=None, rollups=False, snapshots=False, features=False,
+                 ctx=None, backend="pandas"):
+        if ctx is not None:
+            rng, pools = ctx.rng, ctx.pools
+            grade_table = ctx.curriculum if grade_table is None else grade_table
+        check_marks_format(marks_format)
+        self.rules = rules or annual_rules()
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self.curriculum = as_curriculum(grade_table)
+        self.backend = get_backend(backend)
+        self.start_year, self.end_year, self.year = start_year, end_year, start_year
+        self.marks_format, self.rollups, self.snapshots, self.log = marks_format, rollups, snapshots, log
+        if not isinstance(students, pd.DataFrame):
+            students = to_columns(students)
+        self.base_columns = [c for c in students if c not in TRACKING_COLUMNS]
+
+        years = end_year - start_year + 1
+        self.store = StudentStore(with_tracking(students, self.rules.marks_model, self.rng),
+                                  capacity=self.rules.intake.capacity_hint(len(students), years))
+        if pools is None and self.rules.intake.admits:
+            pools = build_name_pools()
+        self.pools = pools
+        self.collector = RollupCollector() if rollups else None
+        self.features = FeatureMatrix(start_year, end_year, self.store.capacity) if features else None
+        self._features_done = False
+
+    def step(self):
+        """Run the next year; its YearBatch in backend-internal tables, or None when done."""
+        if self.year > self.end_year:
+            if self.features is not None and not self._features_done:
+                store = self.store
+                self.features.finish(store["enrollment_year"][:store.size], store["birth_year"][:store.size])
+                self._features_done = True
+            return None
+        year, rules, store = self.year, self.rules, self.store
+        batch = simulate_year(store.columns, year, self.curriculum, rules, self.rng,
+                              self.marks_format, rollups=self.rollups, snapshots=self.snapshots,
+                              features=self.features, backend=self.backend)
+        if self.collector:
+            self.collector.add(batch.rollups)
+        admitted = rules.intake.admit(store, batch.leavers, year, self.end_year, self.rng,
+                                      self.pools, rules.marks_model)
+        if self.log:
+            self.log(f"📅 Year {year}: {batch.active} active, {batch.leavers} left, {admitted} admitted")
+        self.year += 1
+        return batch
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> YearBatch:
+        batch = self.step()
+        if batch is None:
+            raise StopIteration
+        return self.finish(batch)
+
+    def finish(self, batch) -> YearBatch:
+        """A step() batch with its tables handed over to the backend's output type."""
+        finish = self.backend.finish
+        return batch._replace(**{f: finish(getattr(batch, f))
+                                 for f in ("academic", "graduates", "terminated",
+                                           "subject_marks", "student_state")
+                                 if getattr(batch, f) is not None})
+
+    def students(self):
+        """Everyone enrolled so far (the `students` table of the result)."""
+        return self.backend.finish(self.store.frame(self.base_columns, self.backend))
+
+    def rollup_tables(self) -> dict:
+        out = self.backend
+        return {nm: out.finish(out.from_pandas(t)) for nm, t in self.collector.tables().items()}
+
+
+def iter_simulation(students, grade_table, start_year: int, end_year: int,
+                    rules: RuleSet = None, **kwargs) -> Simulation:
+    """
+    Iterate the simulation year by year (see Simulation); takes simulate()'s
+    arguments.
+
+        for batch in iter_simulation(students_df, grade_df, 2010, 2024, snapshots=True):
+            sink(batch.academic, batch.graduates, batch.terminated, batch.student_state)
+    """
+    return Simulation(students, grade_table, start_year, end_year, rules, **kwargs)
+
+
+def simulate(students, grade_table, start_year: int, end_year: int,
+             rules: RuleSet = None, rng=None, marks_format="wide", pools=None,
+             log=None, rollups=False, snapshots=False, features=False,
+             on_year=None, ctx=None, backend="pandas") -> SimulationResult:
+    """
+    Simulate `start_year`..`end_year` for `students` (enrollment + details
+    columns; tracking columns are added if missing) under `rules`
+    (default: annual_rules()) and collect every year into full tables.
+    `grade_table` is a grade DataFrame or a compiled Curriculum. `log`,
+    if given, is called with one progress line per year. `rollups` adds
+    the engine.rollups summary tables to the result, `snapshots` the
+    student_state_by_year table and `features` an
+    engine.features.FeatureMatrix (rows in `students` order). `on_year`, if
+    given, receives each YearBatch as soon as its year is done, with the
+    same tables iterating a Simulation yields. With a
+    GeneratorContext `ctx`, its rng and name pools are used, and its
+    curriculum when `grade_table` is None.
+
+    `backend` ("pandas", "arrow" or "polars", see engine.backend) picks
+    what the batches and result tables are; `students` may be a pandas
+    DataFrame, a pyarrow Table or a polars DataFrame either way.
+    """
+    sim = Simulation(students, grade_table, start_year, end_year, rules, rng, marks_format, pools,
+                     log, rollups, snapshots, features, ctx, backend)
+    batches = []
+    while (batch := sim.step()) is not None:
+        batches.append(batch)
+        if on_year:
+            on_year(sim.finish(batch))
+
+    out = sim.backend
+
+    def concat(frames, columns):
+        return out.finish(out.concat(frames, columns))
+
+    termination = sim.rules.termination
+    return SimulationResult(
+        concat([b.academic for b in batches], []),
+        concat([b.graduates for b in batches], termination.graduate_columns()),
+        concat([b.terminated for b in batches], termination.terminated_columns),
+        sim.students(),
+        concat([b.subject_marks for b in batches], SUBJECT_MARKS_COLUMNS)
+        if marks_format != "wide" else None,
+        sim.rollup_tables() if rollups else None,
+        concat([b.student_state for b in batches], STUDENT_STATE_COLUMNS)
+        if snapshots else None,
+        sim.features,
+    )
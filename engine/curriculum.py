@@ -0,0 +1,53 @@
+"""
+Compiled view of a grade table (`generate_grade_table` or
+`generate_semester_grade_table`), built once per run.
+
+Each (grade, semester) maps to its subject list, max-marks vector and
+total marks, so the simulations look subjects up by key instead of
+boolean-filtering the grade table for every student. Annual tables have
+no `semester` column and are keyed with semester=None.
+"""
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+
+class CurriculumEntry(NamedTuple):
+    subjects: list
+    max_marks: np.ndarray
+    total: int
+
+
+class Curriculum:
+    def __init__(self, grade_df: pd.DataFrame):
+        self.has_semesters = "semester" in grade_df.columns
+        keys = ["grade", "semester"] if self.has_semesters else ["grade"]
+        self._entries = {}
+        for key, subs in grade_df.groupby(keys, sort=True):
+            grade, semester = (key if self.has_semesters else (key[0], None))
+            mx = subs.max_marks.to_numpy(dtype=np.int64)
+            self._entries[(int(grade), None if semester is None else int(semester))] = \
+                CurriculumEntry(subs.subject.tolist(), mx, int(mx.sum()))
+        self.grades = sorted({g for g, _ in self._entries})
+        self.max_subjects = max((len(e.subjects) for e in self._entries.values()), default=0)
+
+    def get(self, grade, semester=None):
+        """Entry for (grade, semester), or None when the table has no such subjects."""
+        return self._entries.get((int(grade), semester))
+
+    def __getitem__(self, key):
+        grade, semester = key if isinstance(key, tuple) else (key, None)
+        entry = self.get(grade, semester)
+        if entry is None:
+            raise KeyError(key)
+        return entry
+
+    def __contains__(self, key):
+        grade, semester = key if isinstance(key, tuple) else (key, None)
+        return self.get(grade, semester) is not None
+
+
+def as_curriculum(grade_table) -> Curriculum:
+    """Accept either a grade table DataFrame or an already compiled Curriculum."""
+    return grade_table if isinstance(grade_table, Curriculum) else Curriculum(grade_table)
@@ -0,0 +1,131 @@
+"""
+Dense per-student ML feature matrix, filled from the simulation state.
+
+One row per student (in population order), float32, NaN where a value
+does not exist:
+
+    enrollment_year, age_at_enrollment, starting_grade, first_year,
+    years_scored, fail_total, final_grade,
+    pct_<year> … for every simulated year,
+    class_<year> … (0–3 for A–D) for every simulated year
+
+and an int8 label vector: 1 graduated, 0 terminated, -1 still enrolled
+at the end of the run.
+
+`save()` writes features.npy / labels.npy / enrollment_ids.npy (load with
+np.load(..., mmap_mode="r")) or one features.arrow IPC file (load with
+pyarrow.ipc.open_file(pyarrow.memory_map(path)); written one record batch
+of `batch_rows` rows at a time), plus feature_schema.json.
+With `path`, the matrix itself is a memmapped .npy file and is written
+in place, so out_of_core.py never holds it in RAM.
+"""
+import json
+import os
+
+import numpy as np
+
+from .rules import CLASS_LABELS
+
+_STATIC = ["enrollment_year", "age_at_enrollment", "starting_grade", "first_year",
+           "years_scored", "fail_total", "final_grade"]
+FEATURE_FORMATS = ("npy", "arrow")
+LABELS = {"graduated": 1, "terminated": 0, "enrolled": -1}
+
+
+def feature_columns(start_year: int, end_year: int) -> list[str]:
+    years = range(start_year, end_year + 1)
+    return _STATIC + [f"pct_{y}" for y in years] + [f"class_{y}" for y in years]
+
+
+class FeatureMatrix:
+    def __init__(self, start_year: int, end_year: int, n: int = 1024, path: str = None):
+        """`path`: directory for a memmapped matrix of exactly `n` rows."""
+        self.start_year = start_year
+        self.columns = feature_columns(start_year, end_year)
+        self._col = {c: i for i, c in enumerate(self.columns)}
+        self.path = path
+        if path:
+            os.makedirs(path, exist_ok=True)
+            self.X = np.lib.format.open_memmap(os.path.join(path, "features.npy"), mode="w+",
+                                               dtype=np.float32, shape=(n, len(self.columns)))
+            self.labels = np.lib.format.open_memmap(os.path.join(path, "labels.npy"), mode="w+",
+                                                    dtype=np.int8, shape=(n,))
+            self._init_rows(0, n)
+        else:
+            self.X = np.empty((0, len(self.columns)), dtype=np.float32)
+            self.labels = np.empty(0, dtype=np.int8)
+            self._grow(n)
+
+    def _init_rows(self, lo, hi):
+        self.X[lo:hi] = np.nan
+        self.X[lo:hi, self._col["years_scored"]] = 0
+        self.X[lo:hi, self._col["fail_total"]] = 0
+        self.labels[lo:hi] = LABELS["enrolled"]
+
+    def _grow(self, rows):
+        lo = len(self.X)
+        self.X = np.concatenate([self.X, np.empty((rows, self.X.shape[1]), np.float32)])
+        self.labels = np.concatenate([self.labels, np.empty(rows, np.int8)])
+        self._init_rows(lo, lo + rows)
+
+    def record(self, year, rows, grade, cls, pct, passed, graduated, dropped):
+        """One year step for the students at population positions `rows`."""
+        if len(rows) and rows.max() >= len(self.X):
+            if self.path:
+                raise IndexError("memmapped feature matrix is full")
+            self._grow(max(len(self.X), rows.max() + 1 - len(self.X)))
+        X, c = self.X, self._col
+        X[rows, c["pct_" + str(year)]] = pct
+        X[rows, c["class_" + str(year)]] = cls
+        first = np.isnan(X[rows, c["starting_grade"]])
+        X[rows[first], c["starting_grade"]] = grade[first]
+        X[rows[first], c["first_year"]] = year
+        X[rows, c["years_scored"]] += 1
+        X[rows, c["fail_total"]] += ~passed
+        X[rows, c["final_grade"]] = grade
+        self.labels[rows[graduated]] = LABELS["graduated"]
+        self.labels[rows[dropped]] = LABELS["terminated"]
+
+    def finish(self, enrollment_year, birth_year, lo=0):
+        """Static columns for rows lo.. (called chunk by chunk out of core)."""
+        hi = lo + len(enrollment_year)
+        self.X[lo:hi, self._col["enrollment_year"]] = enrollment_year
+        self.X[lo:hi, self._col["age_at_enrollment"]] = np.asarray(enrollment_year) - birth_year
+
+    def save(self, out_dir, enrollment_ids, fmt="npy", batch_rows=1_000_000):
+        """Write the first len(enrollment_ids) rows; returns the written paths."""
+        if fmt not in FEATURE_FORMATS:
+            raise ValueError(f"fmt must be one of {FEATURE_FORMATS}, got {fmt!r}")
+        os.makedirs(out_dir, exist_ok=True)
+        n = len(enrollment_ids)
+        paths = {"schema": os.path.join(out_dir, "feature_schema.json")}
+        if fmt == "npy":
+            paths["enrollment_ids"] = os.path.join(out_dir, "enrollment_ids.npy")
+            np.save(paths["enrollment_ids"], np.asarray(enrollment_ids, dtype=np.int64))
+            for nm, arr in (("features", self.X), ("labels", self.labels)):
+                paths[nm] = os.path.join(out_dir, f"{nm}.npy")
+                if isinstance(arr, np.memmap) and os.path.abspath(arr.filename) == os.path.abspath(paths[nm]):
+                    arr.flush()   # already in place
+                else:
+                    np.save(paths[nm], arr[:n])
+        else:
+            import pyarrow as pa
+            schema = pa.schema([("enrollment_id", pa.int64()), ("label", pa.int8())]
+                               + [(c, pa.float32()) for c in self.columns])
+            paths["features"] = os.path.join(out_dir, "features.arrow")
+            # a batch at a time: the columns are strided slices of X, so each one is a copy
+            with pa.OSFile(paths["features"], "wb") as sink, \
+                    pa.ipc.new_file(sink, schema) as writer:
+                for lo in range(0, n, batch_rows):
+                    hi = min(n, lo + batch_rows)
+                    X = self.X[lo:hi]
+                    arrays = [pa.array(np.asarray(enrollment_ids[lo:hi], dtype=np.int64)),
+                              pa.array(np.asarray(self.labels[lo:hi], dtype=np.int8))]
+                    arrays += [pa.array(np.ascontiguousarray(X[:, i])) for i in range(len(self.columns))]
+                    writer.write_batch(pa.record_batch(arrays, schema=schema))
+        with open(paths["schema"], "w") as f:
+            json.dump({"format": fmt, "rows": n, "dtype": "float32",
+                       "columns": self.columns, "labels": LABELS,
+                       "missing": "NaN",
+                       "class_codes": {c: i for i, c in enumerate(CLASS_LABELS)}}, f, indent=2)
+        return paths
@@ -0,0 +1,103 @@
+"""
+Batched NumPy marks models. A model draws one latent ability per student
+when the student is created, then produces a whole cohort's marks for one
+curriculum entry in a single call:
+
+    ability = model.draw_ability(n, rng)
+    marks   = model.draw_marks(ability, entry, rng)   # (n × n_subjects) ints
+
+`UniformMarks` reproduces the original independent `randint(0, max)`
+draws of the annual generators and `SplitMarks` the 75/25 decent/poor
+split of the semester generator. `LatentAbilityMarks` gives correlated, ML-friendly data: a
+student's marks across subjects and years share their ability, with a
+per-year shock, per-mark noise and per-subject difficulty on top.
+"""
+import numpy as np
+
+ABILITY_DISTRIBUTIONS = ("normal", "t", "uniform")
+
+
+class UniformMarks:
+    """Independent uniform draws in [0, max_marks] (the original behaviour)."""
+
+    def draw_ability(self, n, rng):
+        return np.zeros(n, dtype=np.float32)
+
+    def draw_marks(self, ability, entry, rng):
+        return rng.integers(0, entry.max_marks + 1, size=(len(ability), len(entry.max_marks)))
+
+
+class SplitMarks:
+    """
+    Each mark is "decent" (uniform in [pass_mark, max]) with probability
+    p_decent, otherwise "poor" (uniform in [0, pass_mark - 1]); pass_mark is
+    in percent of each subject's max_marks.
+    """
+
+    def __init__(self, p_decent=0.75, pass_mark=30):
+        self.p_decent = p_decent
+        self.pass_mark = pass_mark
+
+    def draw_ability(self, n, rng):
+        return np.zeros(n, dtype=np.float32)
+
+    def draw_marks(self, ability, entry, rng):
+        n, k = len(ability), len(entry.max_marks)
+        floor = entry.max_marks * self.pass_mark // 100
+        decent = rng.random((n, k)) < self.p_decent
+        u = rng.random((n, k))
+        lo = np.where(decent, floor, 0)
+        hi = np.where(decent, entry.max_marks, floor - 1)
+        return (lo + (u * (hi - lo + 1)).astype(np.int64)).astype(np.int64)
+
+
+class LatentAbilityMarks:
+    """
+    Expected percentage = mean_pct + ability + year shock - subject difficulty,
+    plus independent per-mark noise; everything is in percentage points and
+    the result is scaled to each subject's max_marks and clipped.
+
+    ability_dist: "normal", "t" (heavier tails, `df` degrees of freedom) or
+    "uniform" (same standard deviation as the others).
+    difficulty:   {subject: percentage points subtracted}; unknown subjects get 0.
+    """
+
+    def __init__(self, mean_pct=55.0, ability_sd=15.0, year_sd=6.0, subject_sd=8.0,
+                 difficulty=None, ability_dist="normal", df=5):
+        if ability_dist not in ABILITY_DISTRIBUTIONS:
+            raise ValueError(f"ability_dist must be one of {ABILITY_DISTRIBUTIONS}, got {ability_dist!r}")
+        self.mean_pct = mean_pct
+        self.ability_sd = ability_sd
+        self.year_sd = year_sd
+        self.subject_sd = subject_sd
+        self.difficulty = dict(difficulty or {})
+        self.ability_dist = ability_dist
+        self.df = df
+
+    def draw_ability(self, n, rng):
+        if self.ability_dist == "normal":
+            z = rng.standard_normal(n)
+        elif self.ability_dist == "t":
+            z = rng.standard_t(self.df, n) * np.sqrt((self.df - 2) / self.df) if self.df > 2 \
+                else rng.standard_t(self.df, n)
+        else:
+            z = rng.uniform(-np.sqrt(3), np.sqrt(3), n)
+        return (z * self.ability_sd).astype(np.float32)
+
+    def draw_marks(self, ability, entry, rng):
+        n, k = len(ability), len(entry.max_marks)
+        diff = np.array([self.difficulty.get(s, 0.0) for s in entry.subjects])
+        year = rng.normal(0.0, self.year_sd, size=(n, 1))
+        pct = (self.mean_pct + np.asarray(ability, dtype=np.float64)[:, None] + year - diff
+               + rng.normal(0.0, self.subject_sd, size=(n, k)))
+        marks = np.rint(pct / 100 * entry.max_marks)
+        return np.clip(marks, 0, entry.max_marks).astype(np.int64)
+
+
+def parse_difficulty(spec: str) -> dict:
+    """'Math=5,Art=-3' -> {'Math': 5.0, 'Art': -3.0}"""
+    out = {}
+    for part in filter(None, (p.strip() for p in (spec or "").split(","))):
+        name, _, val = part.partition("=")
+        out[name.strip()] = float(val)
+    return out
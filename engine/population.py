@@ -0,0 +1,254 @@
+"""
+Grade tables and student populations, generated in bulk.
+
+Names are sampled from a pool of Faker names drawn once per run and
+birthdates are built as NumPy date arrays, so creating a population (or a
+yearly intake cohort) costs a handful of vectorized calls instead of one
+Faker/mimesis call per student.
+
+Every builder draws from an explicit `rng` / `pools` or, with `ctx`, from
+an engine.context.GeneratorContext's; only unseeded calls without either
+fall back to fresh ones.
+"""
+import random
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from faker import Faker
+
+_NAME_POOL = 2_000
+
+
+# —————— Grade tables ——————
+
+def generate_subject_counts(rnd=None):
+    rnd = rnd or random
+    return {g: (3 if g <= 3 else rnd.randint(3, 5)) for g in range(1, 9)}
+
+
+def generate_grade_table(subjects, rnd=None):
+    """
+    Annual table: 3 mandatory subjects + 0–2 optional ones from grade 4.
+    `rnd` is a random.Random to draw from (default: the module-level one).
+    """
+    rnd = rnd or random
+    rows = []
+    for grade, total in generate_subject_counts(rnd).items():
+        mandatory = subjects[:3]
+        extras    = rnd.sample(subjects[3:], total - 3)
+        for subj in mandatory + extras:
+            rows.append({"grade":grade,"subject":subj,"min_marks":0,"max_marks":100})
+    return pd.DataFrame(rows)
+
+
+def generate_semester_grade_table(all_subjects: list[str], mandatory_subjects: list[str],
+                                  total_grades: int, rnd=None) -> pd.DataFrame:
+    """Generate semester-wise subject table with mandatory subjects"""
+    rnd = rnd or random
+    rows = []
+    for grade in range(1, total_grades + 1):
+        for semester in [1, 2]:
+            # All grades have mandatory subjects
+            semester_subjects = mandatory_subjects.copy()
+
+            # Grades 4+ get additional subjects
+            if grade >= 4:
+                additional_count = rnd.randint(1, 2)
+                available_additional = [s for s in all_subjects if s not in mandatory_subjects]
+                if available_additional:
+                    additional_subjects = rnd.sample(available_additional,
+                                                        min(additional_count, len(available_additional)))
+                    semester_subjects.extend(additional_subjects)
+
+            for subject in semester_subjects:
+                rows.append({
+                    "grade": grade,
+                    "semester": semester,
+                    "subject": subject,
+                    "is_mandatory": subject in mandatory_subjects,
+                    "min_marks": 0,
+                    "max_marks": 100
+                })
+    return pd.DataFrame(rows)
+
+
+def calculate_student_distribution(total_students: int, total_grades: int,
+                                   total_classes: int) -> tuple[int, int]:
+    if total_students % total_grades:
+        raise ValueError("Total students must be divisible by number of grades")
+    per_grade = total_students // total_grades
+    if per_grade % total_classes:
+        raise ValueError("Students per grade must be divisible by number of classes")
+    return per_grade, per_grade // total_classes
+
+
+# —————— Bulk names and dates ——————
+
+def build_name_pools(size: int = _NAME_POOL, seed=None):
+    """Draw Faker first/last names once; bulk generation samples from these."""
+    fake = Faker()
+    if seed is not None:
+        fake.seed_instance(seed)
+    first = np.array(sorted({fake.first_name() for _ in range(size)}), dtype=object)
+    last  = np.array(sorted({fake.last_name()  for _ in range(size)}), dtype=object)
+    return first, last
+
+
+def bulk_names(n: int, pools, rng):
+    first_pool, last_pool = pools
+    return (first_pool[rng.integers(0, len(first_pool), size=n)],
+            last_pool[rng.integers(0, len(last_pool), size=n)])
+
+
+def _year_starts(years) -> np.ndarray:
+    return (np.asarray(years, dtype=np.int64) - 1970).astype("datetime64[Y]")
+
+
+def bulk_birthdates(years, rng) -> np.ndarray:
+    """Random month 1-12 / day 1-28 for each birth year, as datetime.date objects."""
+    years = np.asarray(years)
+    months = rng.integers(0, 12, size=len(years))
+    days   = rng.integers(0, 28, size=len(years))
+    d = (_year_starts(years).astype("datetime64[M]") + months).astype("datetime64[D]") + days
+    return d.astype(object)
+
+
+def dates_within_years(years, rng) -> np.ndarray:
+    """Uniformly random day inside each given year, as datetime.date objects."""
+    years = np.asarray(years, dtype=np.int64)
+    leap  = (years % 4 == 0) & ((years % 100 != 0) | (years % 400 == 0))
+    doy   = (rng.random(len(years)) * (365 + leap)).astype(np.int64)
+    return (_year_starts(years).astype("datetime64[D]") + doy).astype(object)
+
+
+def birth_years(birthdates) -> np.ndarray:
+    return pd.to_datetime(pd.Series(birthdates)).dt.year.to_numpy(dtype=np.int64)
+
+
+# —————— Students ——————
+
+def _default_multiplier(n):
+    return 1000 if n >= 1000 else 100
+
+
+def generate_student_details(n, school_start, rng=None, pools=None, mult=None,
+                             min_age=2, seq_start=1, per_year_seq=False, ctx=None):
+    """
+    [student_id, first_name, last_name, birthdate] for `n` students born
+    between (school_start - 10) and (current_year - min_age).
+
+    student_id = birth_year * mult + seq, where seq runs over the whole
+    batch (from `seq_start`) or, with per_year_seq, restarts per birth year.
+    """
+    if ctx is not None:
+        rng, pools = ctx.rng, ctx.pools
+    rng   = rng if rng is not None else np.random.default_rng()
+    pools = pools if pools is not None else build_name_pools()
+    mult  = mult or _default_multiplier(n)
+    current = datetime.now().year
+
+    by = rng.integers(school_start - 10, current - min_age + 1, size=n)
+    if per_year_seq:
+        seq = pd.Series(by).groupby(by).cumcount().to_numpy() + 1
+    else:
+        seq = np.arange(seq_start, seq_start + n, dtype=np.int64)
+    first, last = bulk_names(n, pools, rng)
+    return pd.DataFrame({"student_id": by * mult + seq,
+                         "first_name": first,
+                         "last_name":  last,
+                         "birthdate":  dates_within_years(by, rng)})
+
+
+def generate_student_enrollment(student_details_df, school_start, n, rng=None,
+                                mult=None, seq_start=1, ctx=None):
+    """
+    New students enter grade 1 at age 2 (or at school start); transfers
+    enter between ages 3 and 10 with grade clamp(age - 2, 1, 8). Students
+    born before (school_start - 2) are always transfers.
+    """
+    if ctx is not None:
+        rng = ctx.rng
+    rng  = rng if rng is not None else np.random.default_rng()
+    mult = mult or _default_multiplier(n)
+    current = datetime.now().year
+    m  = len(student_details_df)
+    by = birth_years(student_details_df.birthdate)
+
+    transfer = (by < school_start - 2) | (rng.random(m) < 0.5)
+    e_min = np.maximum(school_start, by + 3)
+    e_max = np.minimum(current, by + 10)
+    ok    = transfer & (e_min <= e_max)
+    span  = np.where(ok, e_max - e_min + 1, 1)
+    ey    = np.where(ok, e_min + (rng.random(m) * span).astype(np.int64),
+                     np.maximum(by + 2, school_start))
+    grade = np.where(transfer, np.clip(ey - by - 2, 1, 8), 1)
+    seq   = np.arange(seq_start, seq_start + m, dtype=np.int64)
+    return pd.DataFrame({"student_id":        student_details_df.student_id.to_numpy(),
+                         "enrollment_id":     ey * mult + seq,
+                         "enrollment_status": np.where(ok, "transfer-in", "new").astype(object),
+                         "enrollment_year":   ey,
+                         "starting_grade":    grade})
+
+
+def generate_initial_student_enrollment(details_df: pd.DataFrame,
+                                        school_start: int,
+                                        total: int,
+                                        grades: int = 8,
+                                        classes: int = 4,
+                                        rng=None, ctx=None) -> pd.DataFrame:
+    """
+    Semester layout: every grade/class starts full at school_start. Each
+    student's birthdate in `details_df` is rewritten to match their grade.
+    """
+    if ctx is not None:
+        rng = ctx.rng
+    rng = rng if rng is not None else np.random.default_rng()
+    per_grade, per_class = calculate_student_distribution(total, grades, classes)
+    class_labels = np.array(["A", "B", "C", "D"][:classes], dtype=object)
+
+    grade = np.repeat(np.arange(1, grades + 1), per_grade)
+    cls   = np.tile(np.repeat(class_labels, per_class), grades)
+    n     = len(grade)
+
+    new    = (grade == 1) & (rng.random(n) < 0.5)
+    status = np.where(new, "new", "transfer-in").astype(object)
+    by     = np.where(grade == 1, np.where(new, school_start - 2, school_start - 3),
+                      school_start - (grade + 2))
+    details_df.loc[details_df.index[:n], "birthdate"] = bulk_birthdates(by, rng)
+
+    uid_mult = 1000 if total < 1000 else 10000
+    return pd.DataFrame({"student_id":        details_df.student_id.to_numpy()[:n],
+                         "enrollment_id":     school_start * uid_mult + np.arange(1, n + 1),
+                         "enrollment_status": status,
+                         "enrollment_year":   school_start,
+                         "starting_grade":    grade,
+                         "starting_class":    cls})
+
+
+def intake_cohort(required: int, year: int, classes: int = 4, pools=None, rng=None) -> pd.DataFrame:
+    """New grade-1 students enrolling in `year`, spread evenly over the classes."""
+    if required == 0:
+        return pd.DataFrame()
+
+    pools = pools if pools is not None else build_name_pools()
+    rng = rng if rng is not None else np.random.default_rng()
+    class_labels = ["A", "B", "C", "D"][:classes]
+
+    per_class = required // classes
+    remainder = required % classes
+    counts = [per_class + (1 if i < remainder else 0) for i in range(len(class_labels))]
+
+    sid = year * 10000 + 9000 + np.arange(1, required + 1)
+    first, last = bulk_names(required, pools, rng)
+    return pd.DataFrame(
+        {"student_id": sid,
+         "enrollment_id": sid,
+         "first_name": first,
+         "last_name": last,
+         "birthdate": bulk_birthdates(np.full(required, year - 2), rng),
+         "enrollment_status": "new",
+         "enrollment_year": year,
+         "starting_grade": 1,
+         "starting_class": np.repeat(np.array(class_labels, dtype=object), counts)}
+    )
@@ -0,0 +1,93 @@
+"""
+Analytical rollup tables, accumulated while the simulation runs.
+
+    grade_year_summary  – (academic_year, grade)
+    class_year_summary  – (academic_year, grade, class)
+    cohort_progression  – (enrollment_year, academic_year)
+
+Each year step contributes additive partials (counts, sums, min/max) for
+the students it scored, so partials from several chunks of the same year
+(out_of_core.py) combine exactly; `RollupCollector.tables()` turns them
+into averages and rates once at the end.
+"""
+import numpy as np
+import pandas as pd
+
+from .rules import CLASS_LABELS
+
+ROLLUP_TABLES = ["grade_year_summary", "class_year_summary", "cohort_progression"]
+
+_KEYS = {"grade_year_summary": ["academic_year", "grade"],
+         "class_year_summary": ["academic_year", "grade", "class"],
+         "cohort_progression": ["enrollment_year", "academic_year"]}
+_SUMS = ["students", "passed", "graduated", "terminated", "pct_sum", "grade_sum"]
+
+
+def year_partials(year, grade, cls, pct, enrollment_year, passed, graduated, dropped) -> dict:
+    """Additive per-key partials for one year step (or one chunk of it)."""
+    df = pd.DataFrame({"academic_year": np.full(len(grade), year),
+                       "grade": grade,
+                       "class": CLASS_LABELS[cls],
+                       "enrollment_year": enrollment_year,
+                       "students": 1,
+                       "passed": passed.astype(np.int64),
+                       "graduated": graduated.astype(np.int64),
+                       "terminated": dropped.astype(np.int64),
+                       "pct_sum": pct,
+                       "pct_min": pct,
+                       "pct_max": pct,
+                       "grade_sum": grade})
+    agg = {**{c: "sum" for c in _SUMS}, "pct_min": "min", "pct_max": "max"}
+    return {nm: df.groupby(keys, as_index=False).agg(agg) for nm, keys in _KEYS.items()}
+
+
+class RollupCollector:
+    """Combines per-year / per-chunk partials into the final rollup tables."""
+
+    def __init__(self):
+        self._parts = {nm: [] for nm in ROLLUP_TABLES}
+
+    def add(self, partials: dict):
+        for nm, df in partials.items():
+            self._parts[nm].append(df)
+
+    def _combined(self, nm):
+        keys = _KEYS[nm]
+        if not self._parts[nm]:
+            return pd.DataFrame(columns=keys + _SUMS + ["pct_min", "pct_max"])
+        agg = {**{c: "sum" for c in _SUMS}, "pct_min": "min", "pct_max": "max"}
+        return (pd.concat(self._parts[nm], ignore_index=True)
+                .groupby(keys, as_index=False).agg(agg)
+                .sort_values(keys, ignore_index=True))
+
+    def tables(self) -> dict:
+        out = {}
+        for nm in ["grade_year_summary", "class_year_summary"]:
+            df = self._combined(nm)
+            out[nm] = pd.DataFrame({
+                **{k: df[k] for k in _KEYS[nm]},
+                "students":   df["students"],
+                "passed":     df["passed"],
+                "failed":     df["students"] - df["passed"],
+                "pass_rate":  (df["passed"] / df["students"]).round(4),
+                "avg_pct":    (df["pct_sum"] / df["students"]).round(2),
+                "min_pct":    df["pct_min"],
+                "max_pct":    df["pct_max"],
+                "graduated":  df["graduated"],
+                "terminated": df["terminated"],
+            })
+        df = self._combined("cohort_progression")
+        cohort = df.groupby("enrollment_year")
+        out["cohort_progression"] = pd.DataFrame({
+            "enrollment_year":    df["enrollment_year"],
+            "academic_year":      df["academic_year"],
+            "active_students":    df["students"],
+            "avg_grade":          (df["grade_sum"] / df["students"]).round(2),
+            "avg_pct":            (df["pct_sum"] / df["students"]).round(2),
+            "passed":             df["passed"],
+            "graduated":          df["graduated"],
+            "terminated":         df["terminated"],
+            "graduated_to_date":  cohort["graduated"].cumsum(),
+            "terminated_to_date": cohort["terminated"].cumsum(),
+        })
+        return out
@@ -0,0 +1,386 @@
+"""
+Pluggable rule sets for the simulation engine.
+
+A RuleSet combines four policies:
+
+  • scoring     – AnnualScoring (one percentage per year) or
+                  SemesterScoring (Sem 2 only after passing Sem 1)
+  • placement   – PriorPercentagePlacement (class from last year's
+                  percentage) or BalancedPlacement (equal class sizes)
+  • intake      – NoIntake or ReplaceLeavers (new grade-1 students)
+  • termination – ThreeStrikes (graduation / repeat / termination)
+
+Every policy works on whole cohorts: `state` is a dict of NumPy columns
+(see StudentStore) and `idx` the positions of this year's active students.
+"""
+from dataclasses import dataclass, field
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from .backend import PANDAS
+from .curriculum import CurriculumEntry
+from .marks_model import SplitMarks, UniformMarks
+from .population import intake_cohort
+from .student_store import with_tracking
+
+CLASS_LABELS = np.array(["A", "B", "C", "D"], dtype=object)
+PASS_MARK = 30
+
+_FALLBACK_ENTRY = CurriculumEntry(["Subject1", "Subject2", "Subject3"],
+                                  np.array([100, 100, 100]), 300)
+
+
+def round_pct(x, decimals=2) -> np.ndarray:
+    """
+    np.round with the results of Python's round(): values within float
+    error of a half (where x * 10**decimals can round either way) are
+    rounded one by one on their exact value, like the original generators.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    out = np.round(x, decimals)
+    scaled = x * 10 ** decimals
+    near = np.flatnonzero(np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6)
+    out[near] = [round(float(v), decimals) for v in x[near]]
+    return out
+
+
+def performance_class(pct) -> np.ndarray:
+    """Class codes (0=A … 3=D): ≥90 A, ≥70 B, ≥55 C, otherwise D."""
+    pct = np.asarray(pct, dtype=np.float64)
+    return np.select([pct >= 90, pct >= 70, pct >= 55], [0, 1, 2], default=3).astype(np.int8)
+
+
+class MarkBlock(NamedTuple):
+    rows: np.ndarray          # positions into idx
+    subjects: list
+    marks: np.ndarray         # (len(rows) × len(subjects))
+    semester: object = None
+
+
+class Scores(NamedTuple):
+    pct: np.ndarray           # year percentage per active student
+    blocks: list              # MarkBlocks, one per grade (and semester)
+    extra: dict               # scoring-specific per-student arrays
+
+
+def _draw(curriculum, grade, semester, model, ability, rng):
+    entry = curriculum.get(grade, semester)
+    if entry is None:
+        entry = _FALLBACK_ENTRY
+    marks = model.draw_marks(ability, entry, rng)
+    pct = round_pct(marks.sum(axis=1) / entry.total * 100)
+    return entry, marks, pct
+
+
+# —————— Scoring ——————
+
+class AnnualScoring:
+    """One draw per subject per year; percentage = obtained / max × 100."""
+    max_wide_subjects = 5
+
+    def __init__(self, marks_model=None):
+        self.marks_model = marks_model or UniformMarks()
+
+    def score(self, state, idx, curriculum, rng) -> Scores:
+        grade = state["grade"][idx]
+        ability = state["ability"][idx]
+        pct = np.zeros(len(idx))
+        blocks = []
+        for g in np.unique(grade):
+            rows = np.flatnonzero(grade == g)
+            entry, marks, p = _draw(curriculum, g, None, self.marks_model, ability[rows], rng)
+            pct[rows] = p
+            blocks.append(MarkBlock(rows, entry.subjects, marks))
+        return Scores(pct, blocks, {})
+
+    def records(self, year, state, idx, cls, scores, marks_format, final_grade, backend=PANDAS):
+        m = len(idx)
+        rec = {"academic_year": np.full(m, year),
+               "enrollment_id": state["enrollment_id"][idx],
+               "grade": state["grade"][idx],
+               "class": CLASS_LABELS[cls],
+               "final_percentage": scores.pct}
+        if marks_format != "long":
+            k = self.max_wide_subjects
+            wide = np.zeros((m, k), dtype=np.int64)
+            mask = np.ones((m, k), dtype=bool)
+            for b in scores.blocks:
+                n = min(k, b.marks.shape[1])
+                wide[b.rows, :n] = b.marks[:, :n]
+                mask[b.rows, :n] = False
+            for i in range(k):
+                rec[f"subject_{i+1}_marks"] = np.ma.MaskedArray(wide[:, i], mask[:, i])
+        return backend.frame(rec)
+
+
+def academic_year_score(sem1, sem2) -> np.ndarray:
+    """
+    Vectorized year score from semester percentages (sem2 NaN when not taken):
+    sem1 < 30 → sem1; no sem2 → sem1; sem2 < 30 → sem2; else the average.
+    """
+    sem1 = np.asarray(sem1, dtype=np.float64)
+    sem2 = np.asarray(sem2, dtype=np.float64)
+    avg = round_pct((sem1 + sem2) / 2)
+    return np.where(sem1 < PASS_MARK, sem1,
+                    np.where(np.isnan(sem2), sem1,
+                             np.where(sem2 < PASS_MARK, sem2, avg)))
+
+
+# column order of the semester academic_records output
+SEMESTER_ACADEMIC_COLUMNS = [
+    "academic_year", "enrollment_id", "grade_current", "class_current",
+    "Sem 1 Subjects", "Sem 1 Scores", "Sem 1 Percentage",
+    "Active backlogs until sem 1", "cleared backlogs in Sem 1",
+    "Sem 2 subjects", "Sem 2 Scores", "Sem 2 Percentage",
+    "Active backlogs until sem 2", "cleared backlogs in Sem 2",
+    "Total Weighted percentage in current academic year",
+    "Next year projected grade", "Next year projected class",
+]
+
+
+class SemesterScoring:
+    """Semester 1 for everyone, Semester 2 only for students with Sem 1 ≥ 30%."""
+
+    def __init__(self, marks_model=None):
+        self.marks_model = marks_model or SplitMarks()
+
+    def score(self, state, idx, curriculum, rng) -> Scores:
+        grade = state["grade"][idx]
+        ability = state["ability"][idx]
+        sem1 = np.zeros(len(idx))
+        sem2 = np.full(len(idx), np.nan)
+        blocks = []
+        for g in np.unique(grade):
+            rows = np.flatnonzero(grade == g)
+            entry, marks, p1 = _draw(curriculum, g, 1, self.marks_model, ability[rows], rng)
+            sem1[rows] = p1
+            blocks.append(MarkBlock(rows, entry.subjects, marks, 1))
+            rows2 = rows[p1 >= PASS_MARK]
+            if len(rows2):
+                entry, marks, p2 = _draw(curriculum, g, 2, self.marks_model, ability[rows2], rng)
+                sem2[rows2] = p2
+                blocks.append(MarkBlock(rows2, entry.subjects, marks, 2))
+        return Scores(academic_year_score(sem1, sem2), blocks, {"sem1": sem1, "sem2": sem2})
+
+    def records(self, year, state, idx, cls, scores, marks_format, final_grade, backend=PANDAS):
+        m = len(idx)
+        grade = state["grade"][idx]
+        pct = scores.pct
+        rec = {"academic_year": np.full(m, year),
+               "enrollment_id": state["enrollment_id"][idx],
+               "grade_current": grade,
+               "class_current": CLASS_LABELS[cls]}
+        if marks_format != "long":
+            for sem, subj_col, score_col in [(1, "Sem 1 Subjects", "Sem 1 Scores"),
+                                             (2, "Sem 2 subjects", "Sem 2 Scores")]:
+                subjects = np.full(m, "", dtype=object)
+                scores_s = np.full(m, "", dtype=object)
+                for b in scores.blocks:
+                    if b.semester == sem:
+                        subjects[b.rows] = "; ".join(b.subjects)
+                        scores_s[b.rows] = ["; ".join(map(str, r)) for r in b.marks.tolist()]
+                rec[subj_col] = subjects
+                rec[score_col] = scores_s
+        rec.update({
+            "Sem 1 Percentage": scores.extra["sem1"],
+            "Active backlogs until sem 1": 0,
+            "cleared backlogs in Sem 1": 0,
+            "Sem 2 Percentage": np.nan_to_num(scores.extra["sem2"], nan=0.0),
+            "Active backlogs until sem 2": 0,
+            "cleared backlogs in Sem 2": 0,
+            "Total Weighted percentage in current academic year": pct,
+            "Next year projected grade": np.where((pct >= PASS_MARK) & (grade < final_grade),
+                                                  grade + 1, grade),
+            "Next year projected class": CLASS_LABELS[performance_class(pct)],
+        })
+        cols = [c for c in SEMESTER_ACADEMIC_COLUMNS if c in rec]
+        return backend.frame(rec, cols)
+
+
+# —————— Class placement ——————
+
+class PriorPercentagePlacement:
+    """Class from last year's percentage (≥90 A, ≥70 B, ≥55 C, else D); random in the first year."""
+
+    def place(self, state, idx, pct, rng):
+        prev = state["last_pct"][idx]
+        cls = performance_class(prev)
+        first = np.isnan(prev)
+        cls[first] = rng.integers(0, 4, size=int(first.sum()))
+        return cls
+
+
+def _can_move(pct, target):
+    if target == 0:
+        return pct >= PASS_MARK
+    if target == 1:
+        return (pct >= PASS_MARK) & (pct < 90)
+    if target == 2:
+        return (pct >= PASS_MARK) & (pct < 70)
+    return pct < 55
+
+
+class BalancedPlacement:
+    """
+    Per grade: start from this year's performance class, then fill each
+    class (A first) up to `per_class` by moving eligible students up from
+    lower classes in alphabetical order of their full name.
+    """
+
+    def __init__(self, per_class, classes=4):
+        self.per_class = per_class
+        self.classes = classes
+
+    def place(self, state, idx, pct, rng):
+        cls = performance_class(pct)
+        grade = state["grade"][idx]
+        for g in np.unique(grade):
+            rows = np.flatnonzero(grade == g)
+            sub, p = cls[rows], pct[rows]
+            names = None
+            for target in range(self.classes):
+                needed = self.per_class - int((sub == target).sum())
+                if needed <= 0:
+                    continue
+                cand = np.flatnonzero((sub > target) & _can_move(p, target))
+                if not len(cand):
+                    continue
+                if names is None:
+                    pos = idx[rows]
+                    names = (pd.Series(state["first_name"][pos], dtype=object) + " "
+                             + pd.Series(state["last_name"][pos], dtype=object)).str.lower().to_numpy(dtype=object)
+                cand = cand[np.argsort(names[cand], kind="stable")]
+                sub[cand[:needed]] = target
+            cls[rows] = sub
+        return cls
+
+
+# —————— Intake ——————
+
+class NoIntake:
+    admits = False
+
+    def capacity_hint(self, n, years):
+        return n
+
+    def admit(self, store, leavers, year, end_year, rng, pools, marks_model):
+        return 0
+
+
+class ReplaceLeavers:
+    """Every leaver is replaced by a new grade-1 student enrolling next year."""
+    admits = True
+
+    def __init__(self, classes=4, per_grade=0):
+        self.classes = classes
+        self.per_grade = per_grade
+
+    def capacity_hint(self, n, years):
+        # roughly one grade leaves per year
+        return n + self.per_grade * years
+
+    def admit(self, store, leavers, year, end_year, rng, pools, marks_model):
+        if not leavers or year >= end_year:
+            return 0
+        new = intake_cohort(leavers, year + 1, self.classes, pools, rng)
+        return store.append(with_tracking(new, marks_model, rng))
+
+
+# —————— Termination ——————
+
+@dataclass
+class ThreeStrikes:
+    """
+    Pass at ≥ pass_mark: promote, or graduate from final_grade. Fail:
+    repeat the grade (optionally moved to `failed_class`); the
+    `max_fails`-th consecutive failure terminates the student.
+    """
+    final_grade: int = 8
+    pass_mark: float = PASS_MARK
+    max_fails: int = 3
+    reason: str = "Failed 3× in grade {grade}"
+    graduation_year_column: str = "Graduation Year"
+    graduation_year_offset: int = 1
+    failed_class: str = None
+
+    def graduate_columns(self):
+        cols = ["enrollment_id", "first_name", "last_name", "final_pct", "age"]
+        return cols + ([self.graduation_year_column] if self.graduation_year_column else [])
+
+    terminated_columns = ["enrollment_id", "first_name", "last_name", "grade", "academic_year", "reason"]
+
+    def apply(self, state, idx, pct, year, backend=PANDAS):
+        grade = state["grade"][idx]
+        passed = pct >= self.pass_mark
+        grad = passed & (grade == self.final_grade)
+        promo = passed & (grade < self.final_grade)
+        fails = state["fail_count"][idx] + (~passed)
+        fails[promo] = 0
+        dropped = ~passed & (fails >= self.max_fails)
+
+        state["grade"][idx] = grade + promo
+        state["fail_count"][idx] = fails
+        state["last_pct"][idx] = np.where(grad, state["last_pct"][idx], pct)
+        state["terminated"][idx] = grad | dropped
+        if self.failed_class is not None:
+            state["class"][idx[~passed]] = list(CLASS_LABELS).index(self.failed_class)
+
+        g = idx[grad]
+        grads = {"enrollment_id": state["enrollment_id"][g],
+                 "first_name": state["first_name"][g],
+                 "last_name": state["last_name"][g],
+                 "final_pct": pct[grad],
+                 "age": year - state["birth_year"][g]}
+        if self.graduation_year_column:
+            grads[self.graduation_year_column] = np.full(len(g), year + self.graduation_year_offset)
+
+        d = idx[dropped]
+        term = {"enrollment_id": state["enrollment_id"][d],
+                "first_name": state["first_name"][d],
+                "last_name": state["last_name"][d],
+                "grade": grade[dropped],
+                "academic_year": np.full(len(d), year),
+                "reason": np.array([self.reason.format(grade=x) for x in grade[dropped]], dtype=object)}
+        return backend.frame(grads), backend.frame(term), len(g) + len(d)
+
+
+# —————— Rule sets ——————
+
+@dataclass
+class RuleSet:
+    scoring: object = field(default_factory=AnnualScoring)
+    placement: object = field(default_factory=PriorPercentagePlacement)
+    intake: object = field(default_factory=NoIntake)
+    termination: ThreeStrikes = field(default_factory=ThreeStrikes)
+    # students only appear from their enrollment year onwards
+    skip_future_enrollments: bool = True
+
+    @property
+    def marks_model(self):
+        return self.scoring.marks_model
+
+
+def annual_rules(marks_model=None, skip_future_enrollments=True,
+                 graduation_year_column="Graduation Year",
+                 reason="Failed 3× in grade {grade}") -> RuleSet:
+    """The annual generator (generator.py / GUI)."""
+    return RuleSet(scoring=AnnualScoring(marks_model),
+                   placement=PriorPercentagePlacement(),
+                   intake=NoIntake(),
+                   termination=ThreeStrikes(reason=reason,
+                                            graduation_year_column=graduation_year_column),
+                   skip_future_enrollments=skip_future_enrollments)
+
+
+def semester_rules(per_class, grades=8, classes=4, marks_model=None) -> RuleSet:
+    """The semester generator: balanced classes, leavers replaced every year."""
+    return RuleSet(scoring=SemesterScoring(marks_model),
+                   placement=BalancedPlacement(per_class, classes),
+                   intake=ReplaceLeavers(classes, per_grade=per_class * classes),
+                   termination=ThreeStrikes(final_grade=grades,
+                                            reason="Failed 3× in Grade {grade}",
+                                            graduation_year_column="graduation_year",
+                                            graduation_year_offset=0,
+                                            failed_class="D"))
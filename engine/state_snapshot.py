@@ -0,0 +1,41 @@
+"""
+`student_state_by_year`: one row per (academic_year, enrollment_id) for
+every student the year step scored, taken straight from the vectorized
+state. It records where the student was at the start of the year and
+where the year left them, so "students in grade 5 in 2019" or "grade
+progression since enrollment" are plain filters on one partition instead
+of window / recursive queries over `academic`.
+"""
+import numpy as np
+
+from .backend import PANDAS
+from .rules import CLASS_LABELS
+
+STUDENT_STATE_COLUMNS = ["academic_year", "enrollment_id", "enrollment_year", "grade", "class",
+                         "final_pct", "fail_count", "status", "next_grade", "years_enrolled"]
+
+# outcome of the year; "repeating" keeps the grade, leavers have no next_grade
+_STATUS = np.array(["promoted", "repeating", "graduated", "terminated"], dtype=object)
+
+
+def state_snapshot(year, state, idx, grade, cls, pct, passed, backend=PANDAS):
+    """
+    Rows for the students at `idx`, called after the termination rule has
+    updated `state`; `grade` is their grade before the update.
+    """
+    left = state["terminated"][idx]
+    code = np.where(left, np.where(passed, 2, 3), np.where(passed, 0, 1))
+    enrolled = state["enrollment_year"][idx]
+    next_grade = np.ma.MaskedArray(state["grade"][idx], left)
+    return backend.frame({
+        "academic_year":   np.full(len(idx), year),
+        "enrollment_id":   state["enrollment_id"][idx],
+        "enrollment_year": enrolled,
+        "grade":           grade,
+        "class":           CLASS_LABELS[cls],
+        "final_pct":       pct,
+        "fail_count":      state["fail_count"][idx],
+        "status":          _STATUS[code],
+        "next_grade":      next_grade,
+        "years_enrolled":  year - enrolled + 1,
+    })
@@ -0,0 +1,94 @@
+"""
+Preallocated, columnar population store used by the simulation engine.
+
+The store keeps one NumPy array per column with spare capacity. Unused
+slots are kept with `terminated=True`, so the yearly step skips them
+exactly like students that already left. Intake cohorts are written into
+the next free slots in place; the arrays only grow (by doubling) when
+capacity runs out, which keeps the yearly intake step O(new students)
+amortized instead of copying the whole population every year.
+"""
+import numpy as np
+import pandas as pd
+
+from .backend import PANDAS
+from .population import birth_years
+
+# columns the simulation adds to (and updates on) every student
+TRACKING_COLUMNS = ["grade", "last_pct", "fail_count", "terminated", "class", "ability", "birth_year"]
+
+
+def _column(values) -> np.ndarray:
+    arr = np.asarray(values)
+    if arr.dtype.kind not in "iufb":
+        arr = np.asarray(values, dtype=object)
+    return arr.copy()
+
+
+class StudentStore:
+    def __init__(self, students, capacity: int = 0):
+        """`students`: DataFrame or {column: array}; every column becomes one array."""
+        items = students.items()
+        self.columns = {col: _column(vals.to_numpy() if hasattr(vals, "to_numpy") else vals)
+                        for col, vals in items}
+        self.size = len(next(iter(self.columns.values()))) if self.columns else 0
+        if capacity > self.size:
+            self._grow(capacity - self.size)
+
+    @property
+    def capacity(self) -> int:
+        return len(self.columns["terminated"])
+
+    def __getitem__(self, col) -> np.ndarray:
+        return self.columns[col]
+
+    def _grow(self, k: int):
+        for col, arr in self.columns.items():
+            if arr.dtype.kind in "iufb":
+                pad = np.zeros(k, dtype=arr.dtype)
+            else:
+                pad = np.full(k, None, dtype=object)
+            self.columns[col] = np.concatenate([arr, pad])
+        self.columns["terminated"][-k:] = True
+
+    def append(self, new) -> int:
+        """Write `new` (DataFrame or dict) into the next free slots. Returns rows added."""
+        k = len(new)
+        if not k:
+            return 0
+        if self.size + k > self.capacity:
+            self._grow(max(self.capacity, self.size + k - self.capacity))
+        lo, hi = self.size, self.size + k
+        for col, arr in self.columns.items():
+            vals = new[col]
+            arr[lo:hi] = vals.to_numpy() if hasattr(vals, "to_numpy") else vals
+        self.size = hi
+        return k
+
+    def frame(self, columns=None, backend=PANDAS):
+        """The filled part of the store (every student ever enrolled)."""
+        columns = columns or list(self.columns)
+        return backend.frame({c: self.columns[c][:self.size] for c in columns})
+
+
+def with_tracking(students, marks_model, rng):
+    """
+    Add the tracking columns to a student frame (or {column: array} dict,
+    returned as a new dict): current grade (from starting_grade), last_pct
+    (NaN until scored), fail_count, terminated, class code (-1 until
+    placed), latent ability and birth year. Existing last_pct / fail_count
+    / terminated values are kept.
+    """
+    n = len(students) if isinstance(students, pd.DataFrame) else len(students["student_id"])
+    out = students.copy() if isinstance(students, pd.DataFrame) else dict(students)
+    out["grade"] = np.asarray(students["starting_grade"], dtype=np.int64)
+    out["last_pct"] = (np.asarray(pd.to_numeric(students["last_pct"]), dtype=np.float64)
+                       if "last_pct" in students else np.full(n, np.nan))
+    out["fail_count"] = (np.asarray(students["fail_count"], dtype=np.int64)
+                         if "fail_count" in students else np.zeros(n, dtype=np.int64))
+    out["terminated"] = (np.asarray(students["terminated"], dtype=bool)
+                         if "terminated" in students else np.zeros(n, dtype=bool))
+    out["class"] = np.full(n, -1, dtype=np.int8)
+    out["ability"] = marks_model.draw_ability(n, rng)
+    out["birth_year"] = birth_years(students["birthdate"])
+    return out
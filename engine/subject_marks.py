@@ -0,0 +1,57 @@
+"""
+Long-format `academic_subject_marks` table: one row per
+(academic_year, enrollment_id, semester, subject) with the marks obtained.
+
+The generators keep their wide output by default (`subject_1_marks` …
+`subject_5_marks`, or the "; "-joined semester strings). With
+`marks_format="long"` they emit this table instead, with
+`marks_format="both"` they emit both. `semester` is NULL for the annual
+generators.
+"""
+import numpy as np
+
+from .backend import PANDAS
+
+MARKS_FORMATS = ("wide", "long", "both")
+SUBJECT_MARKS_COLUMNS = ["academic_year", "enrollment_id", "semester", "subject", "marks"]
+
+
+def check_marks_format(marks_format: str) -> str:
+    if marks_format not in MARKS_FORMATS:
+        raise ValueError(f"marks_format must be one of {MARKS_FORMATS}, got {marks_format!r}")
+    return marks_format
+
+
+def marks_matrix_frame(year, enrollment_ids, subjects, marks, semester=None, backend=PANDAS):
+    """
+    Long rows for one cohort: `marks` is an (n_students × n_subjects) matrix
+    whose columns follow `subjects`.
+    """
+    marks = np.asarray(marks)
+    n, k = marks.shape
+    return backend.frame({
+        "academic_year": np.full(n * k, year),
+        "enrollment_id": np.repeat(np.asarray(enrollment_ids), k),
+        "semester":      np.ma.MaskedArray(np.full(n * k, semester or 0), np.full(n * k, semester is None)),
+        "subject":       np.tile(np.asarray(subjects, dtype=object), n),
+        "marks":         marks.ravel(),
+    })
+
+
+class MarksCollector:
+    """Accumulates long-format rows, one cohort matrix at a time."""
+
+    def __init__(self, backend=PANDAS):
+        self.backend = backend
+        self._frames = []
+
+    def add_matrix(self, year, enrollment_ids, subjects, marks, semester=None):
+        self._frames.append(marks_matrix_frame(year, enrollment_ids, subjects, marks, semester,
+                                               self.backend))
+
+    def frame(self):
+        frames = self._frames or [marks_matrix_frame(0, np.empty(0, np.int64), [],
+                                                     np.empty((0, 0), np.int64), backend=self.backend)]
+        if len(frames) == 1:
+            return frames[0]
+        return self.backend.concat(frames, SUBJECT_MARKS_COLUMNS)
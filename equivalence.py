@@ -0,0 +1,412 @@
+#!/usr/bin/env python3
+"""
+equivalence.py
+
+Holds the vectorized engine to the original row-by-row simulations kept
+in reference.py, on identical seeded inputs, for both rule sets (annual:
+generator.py, semester: Academic Data Generator.py).
+
+Exact checks — the randomness is shared, so every row must match:
+  • rules       performance class (90/70/55), class-move eligibility and
+                the Sem 2 gating of the year score, over a grid of
+                percentages; balanced placement against
+                balance_class_distribution on random cohorts
+  • scripted    full runs where both engines take their marks from the
+                same ScriptedMarks (keyed by student and draw) and their
+                remaining draws (first-year class, intake) from equally
+                seeded NumPy generators: academic, graduates and
+                terminated must be identical — promotion at ≥30%, three
+                strikes, placement and intake included
+
+Distribution checks — each engine draws its own marks as in production:
+  pass rates, grade flows (promoted / repeated / graduated / terminated
+  per grade), class shares and sizes and the mean percentage must agree
+  within `z` standard errors.
+
+The reference runs are timed against the engine on the same inputs and
+the speedup reported. Exits non-zero when any check fails (or the
+speedup is below --min-speedup).
+
+    python equivalence.py --students 800 --seed 7 --report equivalence.json
+"""
+import argparse
+import json
+import random
+import time
+from collections import defaultdict
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+import profiling
+import reference
+from engine import (
+    GeneratorContext,
+    annual_rules,
+    generate_initial_student_enrollment,
+    generate_student_details,
+    intake_cohort,
+    semester_rules,
+    simulate,
+)
+from engine.rules import (
+    CLASS_LABELS,
+    PASS_MARK,
+    BalancedPlacement,
+    _can_move,
+    academic_year_score,
+    performance_class,
+)
+from generator import generate_inputs
+
+SUBJECTS = ["Math", "Science", "English", "History", "Geography", "Art", "Music", "PE"]
+_EDGES = [0, 15.5, 29.99, 30, 30.01, 45.5, 54.99, 55, 55.01, 69.99, 70, 70.01, 89.99, 90, 90.01, 100]
+
+
+class Check(NamedTuple):
+    group: str
+    name: str
+    ok: bool
+    detail: str = ""
+
+
+class Run(NamedTuple):
+    academic: pd.DataFrame
+    graduates: pd.DataFrame
+    terminated: pd.DataFrame
+    seconds: float
+
+
+# —————— Shared marks ——————
+
+class ScriptedMarks:
+    """
+    Marks model whose draws are fixed in advance: the n-th draw of student
+    `key` always yields the same marks, whichever engine asks and in
+    whatever order. The engine sees it as a marks model (the student's
+    "ability" is its key); the reference calls `marks(key, max_marks)`.
+    Use one instance per run.
+    """
+
+    def __init__(self, seed=0, p_decent=0.5, pass_mark=PASS_MARK):
+        self.seed, self.p_decent, self.pass_mark = seed, p_decent, pass_mark
+        self._next = 0
+        self._draws = defaultdict(int)
+
+    def draw_ability(self, n, rng):
+        keys = np.arange(self._next, self._next + n, dtype=np.float64)
+        self._next += n
+        return keys
+
+    def marks(self, key, max_marks) -> list:
+        key = int(key)
+        r = np.random.default_rng([self.seed, key, self._draws[key]])
+        self._draws[key] += 1
+        mx = np.asarray(max_marks, dtype=np.int64)
+        floor = mx * self.pass_mark // 100
+        decent = r.random(len(mx)) < self.p_decent
+        u = r.random(len(mx))
+        lo = np.where(decent, floor, 0)
+        hi = np.where(decent, mx, floor - 1)
+        return (lo + (u * (hi - lo + 1)).astype(np.int64)).tolist()
+
+    def draw_marks(self, ability, entry, rng):
+        out = np.zeros((len(ability), len(entry.max_marks)), dtype=np.int64)
+        for i, key in enumerate(ability):
+            out[i] = self.marks(key, entry.max_marks)
+        return out
+
+
+# —————— Inputs and runs ——————
+
+def annual_inputs(students, start_year, seed):
+    grade_df, students_df, _ = generate_inputs(students, start_year, SUBJECTS, seed=seed)
+    return grade_df, students_df
+
+
+def semester_inputs(students, start_year, seed, grades=8, classes=4):
+    ctx = GeneratorContext.create(seed)
+    grade_df = ctx.semester_grade_table(SUBJECTS, SUBJECTS[:3], grades)
+    details = generate_student_details(students, start_year, mult=1000 if students < 1000 else 10000,
+                                       min_age=0, per_year_seq=True, ctx=ctx)
+    enrol = generate_initial_student_enrollment(details, start_year, students, grades, classes, ctx=ctx)
+    return grade_df, enrol.merge(details, on="student_id", how="left"), ctx.pools
+
+
+def _timed(phase, fn):
+    with profiling.phase(phase):
+        t0 = time.perf_counter()
+        out = fn()
+    return Run(*out[:3], time.perf_counter() - t0)
+
+
+def run_annual(grade_df, students_df, start_year, end_year, seed, scripted):
+    """(reference Run, engine Run). Scripted: shared marks and first-year classes."""
+    if scripted:
+        ref_rng = np.random.default_rng(seed)
+        ref_kw = {"draw_marks": ScriptedMarks(seed).marks,
+                  "first_class": lambda: CLASS_LABELS[ref_rng.integers(0, 4)]}
+        rules = annual_rules(marks_model=ScriptedMarks(seed))
+    else:
+        ref_kw = {"rnd": random.Random(seed)}
+        rules = annual_rules()
+    ref = _timed("reference annual", lambda: reference.generate_academic_and_events(
+        students_df, grade_df, start_year, end_year, **ref_kw))
+    new = _timed("engine annual", lambda: simulate(students_df, grade_df, start_year, end_year, rules,
+                                                   rng=np.random.default_rng(seed)))
+    return ref, new
+
+
+def run_semester(grade_df, students_df, pools, start_year, end_year, seed, scripted,
+                 grades=8, classes=4):
+    """(reference Run, engine Run). Scripted: shared marks and intake cohorts."""
+    per_class = len(students_df) // (grades * classes)
+    ref_kw = {"rnd": random.Random(seed)}
+    rules = semester_rules(per_class, grades, classes)
+    if scripted:
+        ref_rng = np.random.default_rng(seed)
+        ref_kw["draw_marks"] = ScriptedMarks(seed).marks
+        ref_kw["new_students"] = lambda required, year, cls: intake_cohort(required, year, cls, pools, ref_rng)
+        rules = semester_rules(per_class, grades, classes, marks_model=ScriptedMarks(seed))
+    ref = _timed("reference semester", lambda: reference.generate_enhanced_academics(
+        students_df, grade_df, start_year, end_year, len(students_df), per_class * classes, per_class,
+        grades, classes, **ref_kw))
+    new = _timed("engine semester", lambda: simulate(students_df, grade_df, start_year, end_year, rules,
+                                                     rng=np.random.default_rng(seed), pools=pools))
+    return ref, new
+
+
+# —————— Exact checks ——————
+
+def _comparable(s: pd.Series) -> np.ndarray:
+    try:
+        return pd.to_numeric(s).astype("Float64").to_numpy(dtype=np.float64, na_value=np.nan)
+    except (ValueError, TypeError):
+        return s.astype(object).where(s.notna(), None).astype(str).to_numpy()
+
+
+def frame_diff(ref: pd.DataFrame, new: pd.DataFrame):
+    """None when the frames hold the same rows, else the first difference."""
+    if not len(ref) and not len(new):
+        return None
+    if list(ref.columns) != list(new.columns):
+        return f"columns {list(ref.columns)} != {list(new.columns)}"
+    if len(ref) != len(new):
+        return f"{len(ref)} rows != {len(new)} rows"
+    for col in ref.columns:
+        a, b = _comparable(ref[col].reset_index(drop=True)), _comparable(new[col].reset_index(drop=True))
+        if a.dtype.kind != b.dtype.kind:
+            return f"{col}: {a.dtype} vs {b.dtype}"
+        same = (a == b) | (pd.isna(a) & pd.isna(b)) if a.dtype.kind == "f" else a == b
+        if not same.all():
+            i = int(np.flatnonzero(~same)[0])
+            return f"{col} row {i}: {a[i]!r} != {b[i]!r} ({int((~same).sum())} rows differ)"
+    return None
+
+
+def rule_checks(seed=0) -> list[Check]:
+    """The rule functions against the originals, value by value."""
+    rng = np.random.default_rng(seed)
+    pct = np.unique(np.concatenate([np.round(np.arange(0, 100.001, 0.01), 2), _EDGES]))
+    checks = []
+
+    got = CLASS_LABELS[performance_class(pct)]
+    want = np.array([reference.get_performance_class(p) for p in pct], dtype=object)
+    bad = pct[got != want]
+    checks.append(Check("rules", "class thresholds 90/70/55", not len(bad),
+                        f"differs at {bad[:5].tolist()}" if len(bad) else f"{len(pct)} percentages"))
+
+    bad = []
+    for t, label in enumerate(CLASS_LABELS):
+        got = _can_move(pct, t)
+        want = np.array([reference.can_move_to_class(p, label) for p in pct])
+        bad += [(label, p) for p in pct[got != want][:3].tolist()]
+    checks.append(Check("rules", "class move eligibility", not bad,
+                        f"differs at {bad[:5]}" if bad else f"{len(pct)} percentages × 4 classes"))
+
+    sem1 = np.concatenate([np.repeat(_EDGES, len(_EDGES) + 1), np.round(rng.uniform(0, 100, 20_000), 2)])
+    sem2 = np.concatenate([np.tile(_EDGES + [None], len(_EDGES)),
+                           np.where(rng.random(20_000) < 0.2, None,
+                                    np.round(rng.uniform(0, 100, 20_000), 2).astype(object))])
+    got = academic_year_score(sem1, np.array([np.nan if s is None else s for s in sem2]))
+    # the originals saw Python floats: round() on np.float64 would be np.round
+    want = np.array([reference.calculate_academic_year_score(float(a), None if b is None else float(b))
+                     for a, b in zip(sem1, sem2)])
+    bad = np.flatnonzero(got != want)
+    checks.append(Check("rules", "year score / Sem 2 gating", not len(bad),
+                        f"differs at {[(sem1[i], sem2[i]) for i in bad[:5]]}" if len(bad)
+                        else f"{len(sem1)} semester pairs"))
+
+    pools = GeneratorContext.create(seed).pools
+    bad = 0
+    for trial in range(200):
+        n, per_class = int(rng.integers(1, 60)), int(rng.integers(1, 16))
+        pcts = np.round(rng.choice([rng.uniform(0, 100), 30.0, 55.0, 70.0, 90.0], size=n)
+                        if trial % 4 == 0 else rng.uniform(0, 100, n), 2)
+        first = pools[0][rng.integers(0, min(len(pools[0]), 8 + trial), size=n)]
+        last = pools[1][rng.integers(0, min(len(pools[1]), 8 + trial), size=n)]
+        last = np.where(rng.random(n) < 0.2, [s.upper() for s in last], last)   # case-insensitive order
+        state = {"grade": np.ones(n, dtype=np.int64), "first_name": first, "last_name": last}
+        got = CLASS_LABELS[BalancedPlacement(per_class).place(state, np.arange(n), pcts, rng)]
+        df = pd.DataFrame({"first_name": first, "last_name": last, "academic_year_percentage": pcts,
+                           "curr_class": "A"})
+        want = reference.balance_class_distribution(df, per_class, list(CLASS_LABELS))["curr_class"]
+        bad += int(not np.array_equal(got, want.to_numpy(dtype=object)))
+    checks.append(Check("rules", "balanced placement", not bad,
+                        f"{bad} of 200 cohorts differ" if bad else "200 random cohorts"))
+    return checks
+
+
+def scripted_checks(mode, ref: Run, new: Run) -> list[Check]:
+    checks = []
+    for name in ("academic", "graduates", "terminated"):
+        diff = frame_diff(getattr(ref, name), getattr(new, name))
+        checks.append(Check(f"{mode} scripted", name, diff is None,
+                            diff or f"{len(getattr(new, name))} identical rows"))
+    return checks
+
+
+# —————— Distribution checks ——————
+
+_COLUMNS = {"annual":   ("grade", "class", "final_percentage"),
+            "semester": ("grade_current", "class_current",
+                         "Total Weighted percentage in current academic year")}
+_FLOWS = ["promoted", "repeated", "graduated", "terminated", "other"]
+
+
+def flow_stats(run: Run, mode, end_year) -> dict:
+    """
+    {stat: ("p", hits, n) | ("mean", mean, var, n)} from a run's tables.
+    Grade flows follow each academic row to the same student's next year
+    (rows of the last year are censored).
+    """
+    grade_col, class_col, pct_col = _COLUMNS[mode]
+    ac = run.academic
+    pct = ac[pct_col].to_numpy(dtype=np.float64)
+    grade = ac[grade_col].to_numpy(dtype=np.int64)
+    stats = {"pass rate": ("p", int((pct >= PASS_MARK).sum()), len(ac)),
+             "mean percentage": ("mean", pct.mean(), pct.var(ddof=1), len(ac))}
+    for g in np.unique(grade):
+        sel = grade == g
+        stats[f"pass rate grade {g}"] = ("p", int((pct[sel] >= PASS_MARK).sum()), int(sel.sum()))
+
+    nxt = ac[["enrollment_id", "academic_year", grade_col]].copy()
+    nxt["academic_year"] -= 1
+    cur = ac[ac.academic_year < end_year][["enrollment_id", "academic_year", grade_col]]
+    flows = cur.merge(nxt, on=["enrollment_id", "academic_year"], how="left", suffixes=("", "_next"))
+    step = flows[f"{grade_col}_next"] - flows[grade_col]
+    gone = flows[f"{grade_col}_next"].isna()
+    outcome = np.select(
+        [~gone & (step == 1), ~gone & (step == 0),
+         gone & flows.enrollment_id.isin(run.graduates.get("enrollment_id", [])),
+         gone & flows.enrollment_id.isin(run.terminated.get("enrollment_id", []))],
+        ["promoted", "repeated", "graduated", "terminated"], default="other")
+    for g in np.unique(flows[grade_col]):
+        sel = (flows[grade_col] == g).to_numpy()
+        for f in _FLOWS:
+            stats[f"grade {g} {f}"] = ("p", int((outcome[sel] == f).sum()), int(sel.sum()))
+
+    for c in CLASS_LABELS:
+        stats[f"class {c} share"] = ("p", int((ac[class_col] == c).sum()), len(ac))
+    sizes = ac.groupby(["academic_year", grade_col, class_col]).size().to_numpy(dtype=np.float64)
+    stats["class size"] = ("mean", sizes.mean(), sizes.var(ddof=1) if len(sizes) > 1 else 0.0, len(sizes))
+    return stats
+
+
+def _agrees(a, b, z):
+    """(ok, reference value, engine value) for one statistic."""
+    if a[0] == "p":
+        (_, k1, n1), (_, k2, n2) = a, b
+        p1, p2 = k1 / n1, k2 / n2
+        p = (k1 + k2) / (n1 + n2)
+        se = np.sqrt(p * (1 - p) * (1 / n1 + 1 / n2))
+        return abs(p1 - p2) <= z * se + 1e-12, p1, p2
+    (_, m1, v1, n1), (_, m2, v2, n2) = a, b
+    se = np.sqrt(v1 / n1 + v2 / n2)
+    return abs(m1 - m2) <= z * se + 1e-9, m1, m2
+
+
+def distribution_checks(mode, ref: Run, new: Run, end_year, z=4.5, min_rows=20) -> list[Check]:
+    a, b = flow_stats(ref, mode, end_year), flow_stats(new, mode, end_year)
+    checks = []
+    for name in sorted(set(a) | set(b)):
+        if name not in a or name not in b:
+            n = (a.get(name) or b.get(name))[-1]
+            if n >= min_rows:
+                checks.append(Check(f"{mode} distribution", name, False,
+                                    f"only in the {'reference' if name in a else 'engine'} ({n} rows)"))
+            continue
+        ok, x, y = _agrees(a[name], b[name], z)
+        checks.append(Check(f"{mode} distribution", name, bool(ok), f"reference {x:.4f}, engine {y:.4f}"))
+    return checks
+
+
+# —————— Harness ——————
+
+def run_equivalence(students=800, semester_students=320, start_year=2012, end_year=2024, seed=7,
+                    z=4.5, log=print) -> tuple[list[Check], dict]:
+    """All checks for both rule sets; returns (checks, {mode: speedup info})."""
+    checks = rule_checks(seed)
+    timings = {}
+
+    log("📐 Annual rules (generator.py)")
+    grade_df, students_df = annual_inputs(students, start_year, seed)
+    checks += scripted_checks("annual", *run_annual(grade_df, students_df, start_year, end_year, seed, True))
+    ref, new = run_annual(grade_df, students_df, start_year, end_year, seed, False)
+    checks += distribution_checks("annual", ref, new, end_year, z)
+    timings["annual"] = (ref.seconds, new.seconds)
+
+    log("📐 Semester rules (Academic Data Generator.py)")
+    grade_df, students_df, pools = semester_inputs(semester_students, start_year, seed)
+    checks += scripted_checks("semester", *run_semester(grade_df, students_df, pools, start_year,
+                                                        end_year, seed, True))
+    ref, new = run_semester(grade_df, students_df, pools, start_year, end_year, seed, False)
+    checks += distribution_checks("semester", ref, new, end_year, z)
+    timings["semester"] = (ref.seconds, new.seconds)
+
+    speedups = {mode: {"reference_seconds": round(r, 4), "engine_seconds": round(e, 4),
+                       "speedup": round(r / e, 1)}
+                for mode, (r, e) in timings.items()}
+    return checks, speedups
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Engine vs reference implementation equivalence harness")
+    ap.add_argument("--students", type=int, default=800, help="annual population")
+    ap.add_argument("--semester-students", type=int, default=320,
+                    help="semester population (divisible by 8 grades × 4 classes)")
+    ap.add_argument("--start-year", type=int, default=2012)
+    ap.add_argument("--end-year", type=int, default=2024)
+    ap.add_argument("--seed", type=int, default=7)
+    ap.add_argument("--z", type=float, default=4.5, help="tolerance of distribution checks, in standard errors")
+    ap.add_argument("--min-speedup", type=float, default=0.0, help="fail when the engine is slower than this")
+    ap.add_argument("--verbose", action="store_true", help="print passing checks too")
+    ap.add_argument("--report", default=None, help="write the JSON report here")
+    profiling.add_argument(ap)
+    args = ap.parse_args()
+
+    with profiling.session(profiling.profile_dir(args.profile)):
+        checks, speedups = run_equivalence(args.students, args.semester_students, args.start_year,
+                                           args.end_year, args.seed, args.z)
+    for c in checks:
+        if args.verbose or not c.ok:
+            print(f"{'✅' if c.ok else '❌'} [{c.group}] {c.name}: {c.detail}")
+    for mode, s in speedups.items():
+        print(f"⏱️  {mode}: reference {s['reference_seconds']:.2f}s, engine {s['engine_seconds']:.3f}s "
+              f"→ {s['speedup']}× faster")
+    slow = [m for m, s in speedups.items() if s["speedup"] < args.min_speedup]
+    failed = [c for c in checks if not c.ok]
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump({"checks": [c._asdict() for c in checks], "speedups": speedups}, f, indent=2)
+    groups = sorted({c.group for c in checks})
+    print(f"✅ {len(checks)} checks passed in {len(groups)} groups" if not failed
+          else f"⚠️  {len(failed)} of {len(checks)} checks failed")
+    for m in slow:
+        print(f"⚠️  {m}: speedup {speedups[m]['speedup']}× below --min-speedup {args.min_speedup}")
+    raise SystemExit(0 if not failed and not slow else 1)
+
+
+if __name__ == "__main__":
+    main()
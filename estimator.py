@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""
+estimator.py
+
+Predicts what a run will cost before it starts: rows per table, output
+size per format, peak memory and runtime.
+
+Row counts and bytes per row come from a pilot run of the same config
+(start year, end year, subjects, engine mode) on about PILOT_STUDENTS
+students.
+Every table except the grade table and the rollups grows with the
+simulated population, so the pilot is scaled by the population ratio
+(see _population). Pilots are cached per config, so only the student
+count changes while the user types it, and re-estimating is arithmetic.
+
+Runtime and peak memory are linear in the rows generated. The
+coefficients come from a calibration benchmark: `python estimator.py
+--calibrate` times and traces generations on this machine and saves the
+fit next to the output cache. Without one, DEFAULT_CALIBRATION is used
+(measured on a 4-core Linux box).
+
+    python estimator.py --students 200000 --start-year 2005 \\
+        --subjects Math,Science,English,Art,Music,PE,History,Geography
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from functools import lru_cache
+from typing import NamedTuple
+
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+
+import engine
+import profiling
+from csv_export import csv_ready, write_options, write_tables
+from engine import ENGINE_VERSION, ROLLUP_TABLES, GeneratorContext, semester_rules
+from generator import generate_all
+from output_cache import DEFAULT_CACHE_DIR
+
+MODES = ("annual", "semester")
+FORMATS = ("memory", "csv", "csv.gz", "csv.zst", "parquet")
+PILOT_STUDENTS = 1024          # rounded up to a multiple of grades × classes in semester mode
+LONG_RUN_SECONDS = 600         # the GUI asks before starting anything longer
+CALIBRATION_PATH = os.path.join(DEFAULT_CACHE_DIR, "estimator_calibration.json")
+
+# seconds / peak bytes = fixed + per_row × generated rows
+DEFAULT_CALIBRATION = {
+    "annual":   {"seconds_fixed": 0.39, "seconds_per_row": 7.3e-7,
+                 "bytes_fixed": 1.8e6, "bytes_per_row": 265},
+    "semester": {"seconds_fixed": 0.49, "seconds_per_row": 5.4e-6,
+                 "bytes_fixed": 0.0, "bytes_per_row": 395},
+    "csv_bytes_per_second": 78e6,
+}
+
+# tables whose size does not depend on the student count
+_FIXED_TABLES = {"grades", *ROLLUP_TABLES}
+
+
+class Estimate(NamedTuple):
+    rows: dict                 # table -> predicted rows
+    bytes: dict                # format -> predicted total bytes
+    peak_memory: int           # bytes held at the peak of generation
+    seconds: float             # generation
+    write_seconds: float       # writing the CSVs
+    available_memory: int      # None when it cannot be determined
+
+    @property
+    def total_seconds(self):
+        return self.seconds + self.write_seconds
+
+    @property
+    def exceeds_memory(self) -> bool:
+        return self.available_memory is not None and self.peak_memory > self.available_memory
+
+    @property
+    def long_run(self) -> bool:
+        return self.total_seconds > LONG_RUN_SECONDS
+
+    def summary(self) -> str:
+        """One line for the GUI / prompts."""
+        rows = sum(r for nm, r in self.rows.items() if nm not in _FIXED_TABLES)
+        line = (f"≈ {rows:,} rows · CSV {_fmt_bytes(self.bytes['csv'])} · "
+                f"peak RAM {_fmt_bytes(self.peak_memory)} · {_fmt_seconds(self.total_seconds)}")
+        if self.exceeds_memory:
+            line += f" ⚠️ exceeds free memory ({_fmt_bytes(self.available_memory)})"
+        elif self.long_run:
+            line += " ⚠️ long run"
+        return line
+
+
+def _fmt_bytes(n) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if n < 1024:
+            return f"{n:.0f} {unit}"
+        n /= 1024
+    return f"{n:.1f} TB"
+
+
+def _fmt_seconds(s) -> str:
+    if s < 1:
+        return "< 1 s"
+    if s < 60:
+        return f"{s:.0f} s"
+    return f"{s / 60:.0f} min" if s < 3600 else f"{s / 3600:.1f} h"
+
+
+def available_memory():
+    """Free physical memory in bytes, or None if it cannot be read."""
+    try:
+        import psutil
+        return psutil.virtual_memory().available
+    except ImportError:
+        pass
+    if sys.platform == "win32":
+        import ctypes
+
+        class _MemoryStatus(ctypes.Structure):
+            _fields_ = [("dwLength", ctypes.c_ulong), ("dwMemoryLoad", ctypes.c_ulong),
+                        ("ullTotalPhys", ctypes.c_ulonglong), ("ullAvailPhys", ctypes.c_ulonglong),
+                        ("ullTotalPageFile", ctypes.c_ulonglong), ("ullAvailPageFile", ctypes.c_ulonglong),
+                        ("ullTotalVirtual", ctypes.c_ulonglong), ("ullAvailVirtual", ctypes.c_ulonglong),
+                        ("ullAvailExtendedVirtual", ctypes.c_ulonglong)]
+        status = _MemoryStatus(dwLength=ctypes.sizeof(_MemoryStatus))
+        if ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status)):
+            return status.ullAvailPhys
+        return None
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+# —————— Runs ——————
+
+@lru_cache(maxsize=1)
+def _warm_context():
+    return GeneratorContext.create(name_pool_seed=0)
+
+
+def _run(mode, n, start_year, end_year, subjects, rollups=False, snapshots=False,
+         ctx=None, grades=8, classes=4) -> dict:
+    """Generate one config the way the GUI (annual) or the semester CLI would."""
+    ctx = ctx or _warm_context().reseed(0)
+    if mode == "annual":
+        return generate_all(n, start_year, subjects, end_year=end_year, rollups=rollups,
+                            snapshots=snapshots, ctx=ctx)
+    per_grade, per_class = engine.calculate_student_distribution(n, grades, classes)
+    grade_df = ctx.semester_grade_table(subjects, subjects[:3], grades)
+    details = engine.generate_student_details(n, start_year, mult=1000 if n < 1000 else 10000,
+                                              min_age=0, per_year_seq=True, ctx=ctx)
+    enrol = engine.generate_initial_student_enrollment(details, start_year, n, grades, classes, ctx=ctx)
+    result = engine.simulate(enrol.merge(details, on="student_id", how="left"), grade_df,
+                             start_year, end_year, semester_rules(per_class, grades, classes),
+                             ctx=ctx, rollups=rollups, snapshots=snapshots)
+    tables = {"grades": grade_df, "students": result.students, "academic_records": result.academic,
+              "graduates": result.graduates, "terminated": result.terminated}
+    if snapshots:
+        tables["student_state_by_year"] = result.student_state
+    return {**tables, **(result.rollups or {})}
+
+
+def _table_bytes(df) -> dict:
+    """Bytes of one table in every format."""
+    table = csv_ready(pa.Table.from_pandas(df, preserve_index=False))
+    buf = pa.BufferOutputStream()
+    pacsv.write_csv(table, buf, write_options(table))
+    csv = buf.getvalue()
+    parquet = pa.BufferOutputStream()
+    pq.write_table(pa.Table.from_pandas(df, preserve_index=False), parquet)
+    return {"memory":  int(df.memory_usage(deep=True).sum()),
+            "csv":     csv.size,
+            "csv.gz":  pa.compress(csv, "gzip").size,
+            "csv.zst": pa.compress(csv, "zstd").size,
+            "parquet": parquet.getvalue().size}
+
+
+def _population(mode, n, start_year):
+    """
+    Rows of the simulated population for `n` requested students. In annual
+    mode student_id = birth_year * 1000 + seq with seq running over the
+    whole batch, so once n exceeds the multiplier IDs collide and the
+    details/enrollment merge duplicates them: every pair whose seq differs
+    by 1000·d and whose birth years differ by d adds a row.
+    """
+    if mode != "annual":
+        return n
+    mult = engine.population._default_multiplier(n)
+    span = (datetime.now().year - 2) - (start_year - 10) + 1   # birth years drawn from
+    return n + 2 * sum(max(0, n - mult * d) * (span - d) / span ** 2 for d in range(1, span))
+
+
+@lru_cache(maxsize=64)
+def _pilot(mode, start_year, end_year, subjects, rollups, snapshots, grades, classes):
+    """(students, {table: (rows, {format: bytes})}) of a pilot run."""
+    n = PILOT_STUDENTS if mode == "annual" else -(-PILOT_STUDENTS // (grades * classes)) * grades * classes
+    tables = _run(mode, n, start_year, end_year, list(subjects), rollups, snapshots,
+                  grades=grades, classes=classes)
+    return n, {nm: (len(df), _table_bytes(df)) for nm, df in tables.items()}
+
+
+# —————— Calibration ——————
+
+def load_calibration(path=CALIBRATION_PATH) -> dict:
+    """Saved calibration for this engine version, else DEFAULT_CALIBRATION."""
+    try:
+        with open(path) as f:
+            cal = json.load(f)
+        if cal.get("engine") == ENGINE_VERSION:
+            return cal
+    except (OSError, ValueError):
+        pass
+    return DEFAULT_CALIBRATION
+
+
+def _peak_rss():
+    """Peak resident set size of this process in bytes (None without `resource`)."""
+    try:
+        import resource
+    except ImportError:   # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _benchmark(mode, n, years, subjects, repeats):
+    """(rows, best seconds, peak bytes) of one size; runs in a fresh process."""
+    _run(mode, PILOT_STUDENTS, *years, subjects)   # warm-up: imports, first-call overheads
+    base = _peak_rss()
+    if base is None:
+        tracemalloc.start()
+    seconds, tables = float("inf"), None
+    for _ in range(repeats):
+        tables = None   # don't hold the previous run's tables through the peak
+        # a fresh context, so the fixed cost includes drawing the name pools
+        t0 = time.perf_counter()
+        tables = _run(mode, n, *years, subjects, ctx=GeneratorContext.create(0))
+        seconds = min(seconds, time.perf_counter() - t0)
+    if base is None:
+        # Python objects plus the Arrow buffers backing pandas' string columns
+        peak = tracemalloc.get_traced_memory()[1] + pa.default_memory_pool().max_memory()
+        tracemalloc.stop()
+    else:
+        peak = _peak_rss() - base
+    rows = sum(len(df) for nm, df in tables.items() if nm not in _FIXED_TABLES)
+    return rows, seconds, peak
+
+
+def calibrate(sizes=(4_096, 65_536), repeats=2, path=CALIBRATION_PATH, log=print) -> dict:
+    """Benchmark both modes at two sizes, fit the linear model and save it."""
+    years = (datetime.now().year - 12, datetime.now().year)
+    subjects = ["Math", "Science", "English", "Art", "Music", "PE", "History", "Geography"]
+    cal = {"engine": ENGINE_VERSION}
+    for mode in MODES:
+        points = []
+        for n in sizes:
+            # one process per point so the peak RSS belongs to that run alone
+            with ProcessPoolExecutor(max_workers=1) as pool:
+                rows, seconds, peak = pool.submit(_benchmark, mode, n, years, subjects, repeats).result()
+            points.append((rows, seconds, peak))
+            log(f"⏱️ {mode} {n:,} students: {rows:,} rows, {seconds:.2f} s, peak {_fmt_bytes(peak)}")
+        (r0, s0, m0), (r1, s1, m1) = points
+        s_slope, m_slope = max(0.0, (s1 - s0) / (r1 - r0)), max(0.0, (m1 - m0) / (r1 - r0))
+        cal[mode] = {"seconds_fixed": max(0.0, s0 - s_slope * r0), "seconds_per_row": s_slope,
+                     "bytes_fixed": max(0.0, m0 - m_slope * r0), "bytes_per_row": m_slope}
+    tables = _run("annual", sizes[-1], *years, subjects)
+    with tempfile.TemporaryDirectory() as tmp:
+        t0 = time.perf_counter()
+        paths = write_tables(tables, tmp)
+        written = sum(os.path.getsize(p) for p in paths.values())
+        cal["csv_bytes_per_second"] = written / (time.perf_counter() - t0)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(cal, f, indent=2)
+    return cal
+
+
+# —————— Estimate ——————
+
+def estimate(students, start_year, subjects, end_year=None, mode="annual", rollups=False,
+             snapshots=False, grades=8, classes=4, calibration=None) -> Estimate:
+    """
+    Predicted rows, bytes, peak memory and runtime for one configuration
+    (`grades` / `classes` only matter in semester mode).
+    """
+    if mode not in MODES:
+        raise ValueError(f"mode must be one of {MODES}, got {mode!r}")
+    end_year = end_year or datetime.now().year
+    cal = calibration or load_calibration()
+    n_pilot, pilot = _pilot(mode, start_year, end_year, tuple(subjects), bool(rollups),
+                            bool(snapshots), grades, classes)
+
+    scale = _population(mode, students, start_year) / _population(mode, n_pilot, start_year)
+    rows, size = {}, dict.fromkeys(FORMATS, 0)
+    for nm, (n, b) in pilot.items():
+        f = 1 if nm in _FIXED_TABLES else scale
+        rows[nm] = round(n * f)
+        for fmt in FORMATS:
+            size[fmt] += round(b[fmt] * f)
+    generated = sum(r for nm, r in rows.items() if nm not in _FIXED_TABLES)
+    c = cal[mode]
+    return Estimate(rows=rows,
+                    bytes=size,
+                    peak_memory=int(c["bytes_fixed"] + c["bytes_per_row"] * generated),
+                    seconds=c["seconds_fixed"] + c["seconds_per_row"] * generated,
+                    write_seconds=size["csv"] / cal["csv_bytes_per_second"],
+                    available_memory=available_memory())
+
+
+def confirm(est: Estimate, ask=input) -> bool:
+    """Print the estimate for a CLI run; ask before one that is flagged."""
+    print(f"📏 Estimate: {est.summary()}")
+    if not (est.exceeds_memory or est.long_run):
+        return True
+    return ask("Continue anyway? [y/N] ").strip().lower() == "y"
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Estimate rows, size, memory and runtime of a run.")
+    ap.add_argument("--students", type=int)
+    ap.add_argument("--start-year", type=int)
+    ap.add_argument("--end-year", type=int, default=None)
+    ap.add_argument("--subjects", help="comma-separated subject names")
+    ap.add_argument("--mode", choices=MODES, default="annual")
+    ap.add_argument("--rollups", action="store_true")
+    ap.add_argument("--student-state", action="store_true")
+    ap.add_argument("--calibrate", action="store_true",
+                    help=f"benchmark this machine and save the fit to {CALIBRATION_PATH}")
+    profiling.add_argument(ap)
+    args = ap.parse_args()
+    if (args.students is not None or not args.calibrate) and (args.students is None or args.start_year is None or not args.subjects):
+        ap.error("--students, --start-year and --subjects are required")
+
+    with profiling.session(profiling.profile_dir(args.profile)):
+        if args.calibrate:
+            with profiling.phase("calibrate"):
+                calibrate()
+            print(f"✅ Calibration saved to {CALIBRATION_PATH}")
+            if args.students is None:
+                return
+        with profiling.phase("estimate"):
+            est = estimate(args.students, args.start_year,
+                           [s.strip() for s in args.subjects.split(",") if s.strip()],
+                           args.end_year, args.mode, args.rollups, args.student_state)
+    for nm, r in est.rows.items():
+        print(f"  {nm:<24}{r:>14,} rows")
+    for fmt in FORMATS:
+        print(f"  {fmt:<24}{_fmt_bytes(est.bytes[fmt]):>14}")
+    print(f"  peak memory: {_fmt_bytes(est.peak_memory)}"
+          + (f" of {_fmt_bytes(est.available_memory)} free" if est.available_memory else ""))
+    print(f"  runtime: {_fmt_seconds(est.seconds)} generate + {_fmt_seconds(est.write_seconds)} CSV")
+    print(est.summary())
+
+
+if __name__ == "__main__":
+    main()
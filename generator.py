@@ -23,148 +23,144 @@ for module, pkg in _dependencies.items():
         subprocess.check_call([sys.executable, "-m", "pip", "install", pkg])
         _installed_now.append(pkg)
 
-import json
-import random
-import sys
 from datetime import datetime
-import pandas as pd
-import tkinter as tk
-from tkinter import ttk,messagebox,filedialog
-from faker import Faker
-from mimesis import Datetime
-from google.cloud import bigquery
-from google.api_core.exceptions import Conflict
 
-fake = Faker()
-dt   = Datetime()
+import numpy as np
+import pyarrow as pa
 
+import profiling
+from engine import (
+    GeneratorContext,
+    annual_rules,
+    build_name_pools,
+    generate_grade_table,
+    generate_student_details,
+    generate_student_enrollment,
+    generate_subject_counts,
+    iter_simulation,
+    simulate,
+)
+from engine.attendance import AttendanceWriter
+from engine.backend import get_backend, to_arrow
 
 
 # —————— Core generation functions  ——————
+# Population builders come straight from the engine; the annual simulation
+# keeps its original signature and tuple return.
+
+def generate_academic_and_events(students_df, grade_df, start_year, end_year,
+                                 marks_format="wide", rng=None):
+    """
+    Returns (academic, graduates, terminated). With marks_format "long" or
+    "both" a fourth academic_subject_marks table is returned as well, and
+    "long" drops the subject_N_marks columns from academic.
+    """
+    result = simulate(students_df, grade_df, start_year, end_year,
+                      annual_rules(), rng=rng, marks_format=marks_format)
+    out = (result.academic, result.graduates, result.terminated)
+    if marks_format!="wide":
+        out += (result.subject_marks,)
+    return out
+
+
+def iter_academic_and_events(students_df, grade_df, start_year, end_year,
+                             marks_format="wide", rng=None):
+    """
+    generate_academic_and_events() one year at a time: yields an
+    engine.YearBatch per year (academic, graduates, terminated,
+    subject_marks and the student_state snapshot for that year only).
+    """
+    return iter_simulation(students_df, grade_df, start_year, end_year,
+                           annual_rules(), rng=rng, marks_format=marks_format, snapshots=True)
+
+
+TABLES = ["grades", "students", "academic", "graduates", "terminated"]
+
+
+def _join_students(enr_df, det_df) -> pa.Table:
+    """enr_df ⋈ det_df on student_id as an Arrow hash join, in enrollment order like DataFrame.merge."""
+    enr = to_arrow(enr_df).append_column("_row", pa.array(np.arange(len(enr_df))))
+    det = to_arrow(det_df).append_column("_det_row", pa.array(np.arange(len(det_df))))
+    joined = (enr.join(det, "student_id")
+                 .sort_by([("_row", "ascending"), ("_det_row", "ascending")])
+                 .drop_columns(["_row", "_det_row"]))
+    n = joined.num_rows
+    return (joined.append_column("last_pct", pa.nulls(n))        # all None, as in the pandas path
+                  .append_column("fail_count", pa.array(np.zeros(n, dtype=np.int64)))
+                  .append_column("terminated", pa.array(np.zeros(n, dtype=bool))))
+
+
+def generate_inputs(students, start_year, subjects, seed=None, name_pool_seed=None, pools=None,
+                    ctx=None, backend="pandas"):
+    """
+    (grade_df, students_df, rng) for one configuration: everything the
+    simulation needs, with `rng` positioned to continue the seeded run.
+    Draws from `ctx` (an engine.GeneratorContext) when given, else from a
+    new context for `seed`. With backend "arrow" / "polars" students_df is
+    joined in Arrow and returned as that backend's table.
+    """
+    ctx = ctx or GeneratorContext.create(seed, name_pool_seed, pools)
+    grade_df = ctx.grade_table(subjects)
+    det_df   = generate_student_details(students, start_year, ctx=ctx)
+    enr_df   = generate_student_enrollment(det_df, start_year, students, ctx=ctx)
+    if backend == "pandas":
+        students_df = enr_df.merge(det_df, on="student_id")\
+                            .assign(last_pct=None, fail_count=0, terminated=False)
+    else:
+        students_df = get_backend(backend).finish(_join_students(enr_df, det_df))
+    return grade_df, students_df, ctx.rng
+
+
+def generate_all(students, start_year, subjects, end_year=None, seed=None,
+                 name_pool_seed=None, pools=None, rollups=False, snapshots=False,
+                 on_year=None, on_inputs=None, ctx=None, backend="pandas", attendance=None):
+    """
+    The five tables for one configuration, as {name: DataFrame}, plus the
+    engine.rollups summary tables when `rollups` is set and
+    student_state_by_year when `snapshots` is set. With a seed the output
+    is fully reproducible (and therefore cacheable).
+
+    Names come from `pools` when given (it must have been built with
+    build_name_pools(seed=name_pool_seed)), else from a pool built here
+    with `name_pool_seed` (default: `seed`). `on_year` is passed on to
+    engine.simulate; `on_inputs(grade_df, students_df)` is called before
+    the simulation starts. Concurrent runs in one process each need their
+    own `ctx` (e.g. warm_ctx.reseed(seed)); by default one is created here.
+
+    `backend` "arrow" or "polars" returns pyarrow Tables / polars DataFrames
+    instead (see engine.backend), with identical contents for a seed;
+    csv_export and OutputCache take them as they are.
+
+    `attendance`, a directory, streams the engine.attendance table there
+    as Parquet partitions while the simulation runs (it is not returned).
+    """
+    end_year = end_year or datetime.now().year
+    out = get_backend(backend)
+    with profiling.phase("inputs"):
+        ctx = ctx or GeneratorContext.create(seed, name_pool_seed, pools)
+        grade_df, students_df, _ = generate_inputs(students, start_year, subjects, ctx=ctx,
+                                                   backend=backend)
+        grades = out.finish(out.from_pandas(grade_df))
+    if on_inputs:
+        on_inputs(grades, students_df)
+    writer = AttendanceWriter(attendance, seed=ctx.seed) if attendance else None
+
+    def year_done(batch):
+        if writer:
+            writer.add_batch(batch)
+        if on_year:
+            on_year(batch)
 
-def generate_subject_counts():
-    return {g: (3 if g <= 3 else random.randint(3, 5)) for g in range(1, 9)}
-
-def generate_grade_table(subjects):
-    rows = []
-    for grade, total in generate_subject_counts().items():
-        mandatory = subjects[:3]
-        extras    = random.sample(subjects[3:], total - 3)
-        for subj in mandatory + extras:
-            rows.append({"grade":grade,"subject":subj,"min_marks":0,"max_marks":100})
-    return pd.DataFrame(rows)
-
-def generate_student_details(n, school_start):
-    rows, seq = [], 1
-    current = datetime.now().year
-    earliest = school_start - 10
-    mult = 1000 if n>=1000 else 100
-    for _ in range(n):
-        bd = dt.date(start=earliest,end=current-2)  # never born <2 years ago
-        yr = bd.year
-        sid = yr*mult + seq; seq+=1
-        rows.append({"student_id":sid,
-                     "first_name":fake.first_name(),
-                     "last_name": fake.last_name(),
-                     "birthdate": bd})
-    return pd.DataFrame(rows)
-
-def generate_student_enrollment(student_details_df, school_start, n):
-    rows, seq = [], 1
-    current = datetime.now().year
-    mult = 1000 if n>=1000 else 100
-    for _,st in student_details_df.iterrows():
-        by = st.birthdate.year
-        if by < (school_start-2):
-            status="transfer-in"
-        else:
-            status=random.choice(["new","transfer-in"])
-        if status=="new":
-            ey = max(by+2, school_start)
-            grade=1
-        else:
-            e_min = max(school_start, by+3)
-            e_max = min(current, by+10)
-            if e_min<=e_max:
-                ey = random.randint(e_min,e_max)
-            else:
-                status="new"; ey=max(by+2,school_start); grade=1
-            age=ey-by; grade=max(1,min(age-2,8))
-        eid = ey*mult + seq; seq+=1
-        rows.append({"student_id":st.student_id,
-                     "enrollment_id":eid,
-                     "enrollment_status":status,
-                     "enrollment_year":ey,
-                     "starting_grade":grade})
-    return pd.DataFrame(rows)
-
-def generate_academic_and_events(students_df, grade_df, start_year, end_year):
-    academic,grads,term = [],[],[]
-    studs = students_df.copy()
-    for year in range(start_year, end_year + 1):
-        for idx, st in studs.iterrows():
-            grade = st["starting_grade"]
-            prev = st["last_pct"]
-            enrol_id = st["enrollment_id"]
-            if st["enrollment_year"] > year:
-                continue
-            else:
-                # class
-                enrol_id+=1
-                if prev is None: cls=random.choice(["A","B","C","D"])
-                elif prev<30:    cls="D"
-                elif prev>=90:   cls="A"
-                elif prev>=70:   cls="B"
-                elif prev>=55:   cls="C"
-                else:            cls="D"
-                # simulate marks
-                subs=grade_df[grade_df.grade==grade]
-                msum=subs.max_marks.sum()
-                marks=subs.max_marks.apply(lambda m: random.randint(0,m)).tolist()
-                pct=round(sum(marks)/msum*100,2)
-                # record
-                rec={"academic_year":year,"enrollment_id":st.enrollment_id,
-                     "grade":grade,"class":cls,"final_percentage":pct}
-                for i in range(5):
-                    rec[f"subject_{i+1}_marks"]=marks[i] if i<len(marks) else None
-                academic.append(rec)
-                # grad/fail/term
-                if grade==8:
-                    if pct>=30:
-                        age=year-st.birthdate.year
-                        grads.append({"enrollment_id":st.enrollment_id,
-                                      "first_name":st.first_name,
-                                      "last_name":st.last_name,
-                                      "final_pct":pct,
-                                      "age":age,
-                                      "Graduation Year": year+1})
-                        studs.at[idx,"terminated"]=True
-                    else:
-                        studs.at[idx,"fail_count"]+=1
-                        studs.at[idx,"last_pct"]=pct
-                        if studs.at[idx,"fail_count"]>=3:
-                            term.append({"enrollment_id":st.enrollment_id,
-                                         "first_name":st.first_name,
-                                         "last_name":st.last_name,
-                                         "grade":grade,"academic_year":year,
-                                         "reason":f"Failed 3× in grade {grade}"})
-                            studs.at[idx,"terminated"]=True
-                else:
-                    if pct>=30:
-                        studs.at[idx,"starting_grade"]+=1
-                        studs.at[idx,"fail_count"]=0
-                        studs.at[idx,"last_pct"]=pct
-                    else:
-                        studs.at[idx,"fail_count"]+=1
-                        studs.at[idx,"last_pct"]=pct
-                        if studs.at[idx,"fail_count"]>=3:
-                            term.append({"enrollment_id":st.enrollment_id,
-                                         "first_name":st.first_name,
-                                         "last_name":st.last_name,
-                                         "grade":grade,"academic_year":year,
-                                         "reason":f"Failed 3× in grade {grade}"})
-                            studs.at[idx,"terminated"]=True
-        studs=studs[~studs.terminated]
-    return (pd.DataFrame(academic),
-            pd.DataFrame(grads),
-            pd.DataFrame(term))
+    with profiling.phase("simulate"):
+        try:
+            result = simulate(students_df, grade_df, start_year, end_year, annual_rules(),
+                              ctx=ctx, rollups=rollups, snapshots=snapshots or bool(writer),
+                              on_year=year_done, backend=backend)
+        finally:
+            if writer:
+                writer.close()
+    tables = dict(zip(TABLES, (grades, students_df, result.academic,
+                               result.graduates, result.terminated)))
+    if snapshots:
+        tables["student_state_by_year"] = result.student_state
+    return {**tables, **(result.rollups or {})}
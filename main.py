@@ -1,6 +1,9 @@
 # main.py
+import profiling
 from ui import SchoolRecordsApp
 
 if __name__ == "__main__":
-    app = SchoolRecordsApp()
-    app.mainloop()
+    # python main.py --profile [DIR]: every Generate / Upload is profiled, reports written on exit
+    with profiling.session(profiling.profile_arg()):
+        app = SchoolRecordsApp()
+        app.mainloop()
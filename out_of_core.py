@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+out_of_core.py
+
+Out-of-core variant of the annual simulation for national-scale runs
+(tens of millions of students). Student state lives in memory-mapped
+typed arrays under a work directory, every year is processed in
+fixed-size chunks, and the five tables are appended to CSV files as they
+are produced, so peak memory is bounded by `mem_budget_mb` rather than by
+the population size.
+
+The yearly step is the engine's own (`engine.simulate_year` with
+`engine.annual_rules`, the same rules as the GUI), run on one chunk of
+students at a time:
+  • class from last year's percentage (random on first year)
+  • promotion at >=30%, graduation after passing grade 8
+  • termination after 3 failures in the same grade
+"""
+import argparse
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import profiling
+from engine import (
+    FEATURE_FORMATS,
+    ROLLUP_TABLES,
+    AttendanceWriter,
+    FeatureMatrix,
+    GeneratorContext,
+    LatentAbilityMarks,
+    RollupCollector,
+    UniformMarks,
+    annual_rules,
+    as_curriculum,
+    generate_student_details,
+    generate_student_enrollment,
+    parse_difficulty,
+    simulate_year,
+)
+from engine.subject_marks import check_marks_format
+
+# rough per-row cost of one chunk: state slices, mark matrix, the
+# academic DataFrame and its CSV rendering
+_BYTES_PER_ROW = 640
+_MIN_CHUNK     = 10_000
+
+# memmapped student state: column -> dtype
+_STATE_COLUMNS = {
+    "enrollment_id":   np.int64,
+    "enrollment_year": np.int16,
+    "birth_year":      np.int16,
+    "grade":           np.int8,
+    "last_pct":        np.float64,   # NaN until the first academic year
+    "fail_count":      np.int8,
+    "terminated":      np.bool_,
+    "ability":         np.float32,   # latent ability from the marks model
+    "first_name":      np.int32,     # index into the first-name pool
+    "last_name":       np.int32,     # index into the last-name pool
+}
+# columns simulate_year updates and that are written back after each chunk
+_MUTABLE = ["grade", "last_pct", "fail_count", "terminated"]
+
+
+def chunk_rows_for_budget(mem_budget_mb: int) -> int:
+    """Number of students processed at once for a given memory budget."""
+    return max(_MIN_CHUNK, int(mem_budget_mb * 1024 * 1024) // _BYTES_PER_ROW)
+
+
+def open_state(work_dir: str, n: int, mode: str = "w+") -> dict:
+    """Open (or create with mode='w+') the memmapped student state."""
+    os.makedirs(work_dir, exist_ok=True)
+    return {col: np.memmap(os.path.join(work_dir, f"{col}.dat"),
+                           dtype=dtype, mode=mode, shape=(n,))
+            for col, dtype in _STATE_COLUMNS.items()}
+
+
+def _append_csv(df: pd.DataFrame, path: str):
+    header = not os.path.exists(path)
+    df.to_csv(path, mode="a", header=header, index=False)
+
+
+def _id_multiplier(n: int) -> int:
+    # year * mult + seq stays unique only if seq never reaches mult
+    return 10 ** max(3, len(str(n)))
+
+
+def build_population(n, school_start, state, pools, out_dir, chunk, rng,
+                     marks_model=None):
+    """
+    engine.generate_student_details + generate_student_enrollment, chunk by
+    chunk. Fills the memmapped state and streams students.csv.
+    """
+    mult = _id_multiplier(n)
+    first_pool, last_pool = pools
+    marks_model = marks_model or UniformMarks()
+    path = os.path.join(out_dir, "students.csv")
+
+    for lo in range(0, n, chunk):
+        hi  = min(n, lo + chunk)
+        det = generate_student_details(hi - lo, school_start, rng, pools,
+                                       mult=mult, seq_start=lo + 1)
+        enr = generate_student_enrollment(det, school_start, n, rng,
+                                          mult=mult, seq_start=lo + 1)
+
+        state["enrollment_id"][lo:hi]   = enr.enrollment_id.to_numpy()
+        state["enrollment_year"][lo:hi] = enr.enrollment_year.to_numpy()
+        state["birth_year"][lo:hi]      = det.student_id.to_numpy() // mult
+        state["grade"][lo:hi]           = enr.starting_grade.to_numpy()
+        state["last_pct"][lo:hi]        = np.nan
+        state["fail_count"][lo:hi]      = 0
+        state["terminated"][lo:hi]      = False
+        state["ability"][lo:hi]         = marks_model.draw_ability(hi - lo, rng)
+        state["first_name"][lo:hi]      = pd.Categorical(det.first_name, categories=first_pool).codes
+        state["last_name"][lo:hi]       = pd.Categorical(det.last_name, categories=last_pool).codes
+
+        _append_csv(enr.merge(det, on="student_id"), path)
+
+
+def _chunk_state(state, lo, hi, pools):
+    """In-memory engine state for rows lo..hi of the memmapped state."""
+    first_pool, last_pool = pools
+    cs = {col: state[col][lo:hi].astype(np.int64)
+          for col in ("enrollment_id", "enrollment_year", "birth_year", "grade", "fail_count")}
+    for col in ("last_pct", "terminated", "ability"):
+        cs[col] = np.array(state[col][lo:hi])
+    cs["first_name"] = first_pool[state["first_name"][lo:hi]]
+    cs["last_name"]  = last_pool[state["last_name"][lo:hi]]
+    cs["class"]      = np.full(hi - lo, -1, dtype=np.int8)
+    return cs
+
+
+def _simulate_chunk(year, lo, hi, state, curriculum, pools, out_dir, rng,
+                    rules, marks_format="wide", rollups=None, snapshots=False,
+                    features=None, attendance=None):
+    cs = _chunk_state(state, lo, hi, pools)
+    batch = simulate_year(cs, year, curriculum, rules, rng, marks_format,
+                          rollups=rollups is not None, snapshots=snapshots or attendance is not None,
+                          features=features, row_offset=lo)
+    if not batch.active:
+        return
+    if rollups is not None:
+        rollups.add(batch.rollups)
+    if attendance is not None:
+        attendance.add_batch(batch)
+    for col in _MUTABLE:
+        state[col][lo:hi] = cs[col]
+
+    _append_csv(batch.academic, os.path.join(out_dir, "academic.csv"))
+    if batch.subject_marks is not None:
+        _append_csv(batch.subject_marks, os.path.join(out_dir, "academic_subject_marks.csv"))
+    if snapshots:
+        _append_csv(batch.student_state, os.path.join(out_dir, "student_state_by_year.csv"))
+    if len(batch.graduates):
+        _append_csv(batch.graduates, os.path.join(out_dir, "graduates.csv"))
+    if len(batch.terminated):
+        _append_csv(batch.terminated, os.path.join(out_dir, "terminated.csv"))
+
+
+def simulate_out_of_core(n, school_start, grade_df, out_dir, end_year=None,
+                         mem_budget_mb=1024, work_dir=None, seed=None,
+                         marks_format="wide", marks_model=None, rollups=False,
+                         snapshots=False, features=None, ctx=None, attendance=False):
+    """
+    Generate all five tables for `n` students without holding them in RAM.
+
+    Writes grades.csv, students.csv, academic.csv, graduates.csv and
+    terminated.csv to `out_dir` (plus academic_subject_marks.csv for the
+    "long"/"both" marks formats); student state is memmapped under
+    `work_dir` (default: `out_dir/_state`). `marks_model` is a model from
+    engine.marks_model (default UniformMarks). With `rollups`, the
+    engine.rollups summary tables are accumulated chunk by chunk and written
+    at the end; `snapshots` streams student_state_by_year.csv. `features`
+    ("npy" or "arrow") writes the engine.features matrix to
+    `out_dir/features`, filled in place in a memmapped .npy. `attendance`
+    streams the daily engine.attendance table to `out_dir/attendance`
+    (Parquet, partitioned by year/month) chunk by chunk. Draws come from
+    `ctx` (an engine.GeneratorContext), by default one for `seed`.
+    Returns the output paths.
+    """
+    check_marks_format(marks_format)
+    marks_model = marks_model or UniformMarks()
+    rules = annual_rules(marks_model)
+    end_year = end_year or datetime.now().year
+    work_dir = work_dir or os.path.join(out_dir, "_state")
+    os.makedirs(out_dir, exist_ok=True)
+    tables = ["grades", "students", "academic", "graduates", "terminated"]
+    if marks_format != "wide":
+        tables.append("academic_subject_marks")
+    if snapshots:
+        tables.append("student_state_by_year")
+    if rollups:
+        tables += ROLLUP_TABLES
+    for nm in tables:
+        p = os.path.join(out_dir, f"{nm}.csv")
+        if os.path.exists(p):
+            os.remove(p)
+
+    ctx    = ctx or GeneratorContext.create(seed)
+    rng    = ctx.rng
+    chunk  = chunk_rows_for_budget(mem_budget_mb)
+    pools  = ctx.pools
+    state  = open_state(work_dir, n)
+    curriculum = as_curriculum(grade_df)
+    collector  = RollupCollector() if rollups else None
+    fm = None
+    if features:
+        if features not in FEATURE_FORMATS:
+            raise ValueError(f"features must be one of {FEATURE_FORMATS}, got {features!r}")
+        # npy: build straight into the output file; arrow: memmap under work_dir, convert at the end
+        fm_dir = os.path.join(out_dir if features == "npy" else work_dir, "features")
+        fm = FeatureMatrix(school_start, end_year, n, path=fm_dir)
+    # an attendance row is a small fraction of a chunk row: a chunk-sized batch per writer thread
+    att = (AttendanceWriter(os.path.join(out_dir, "attendance"), seed=ctx.seed, batch_rows=chunk)
+           if attendance else None)
+
+    with profiling.phase("population"):
+        grade_df.to_csv(os.path.join(out_dir, "grades.csv"), index=False)
+        build_population(n, school_start, state, pools, out_dir, chunk, rng, marks_model)
+
+    for year in range(school_start, end_year + 1):
+        with profiling.phase("simulate"):
+            for lo in range(0, n, chunk):
+                _simulate_chunk(year, lo, min(n, lo + chunk),
+                                state, curriculum, pools, out_dir, rng,
+                                rules, marks_format, collector, snapshots, fm, att)
+            for arr in state.values():
+                arr.flush()
+        print(f"📅 {year} done")
+
+    with profiling.phase("finish"):
+        if att:
+            rows = sum(att.close().values())
+            print(f"🗓️ attendance: {rows:,} rows")
+        # graduates / terminated may legitimately be empty
+        for nm, cols in [("graduates", rules.termination.graduate_columns()),
+                         ("terminated", rules.termination.terminated_columns)]:
+            p = os.path.join(out_dir, f"{nm}.csv")
+            if not os.path.exists(p):
+                pd.DataFrame(columns=cols).to_csv(p, index=False)
+        if collector:
+            for nm, df in collector.tables().items():
+                df.to_csv(os.path.join(out_dir, f"{nm}.csv"), index=False)
+        if fm:
+            for lo in range(0, n, chunk):
+                hi = min(n, lo + chunk)
+                fm.finish(state["enrollment_year"][lo:hi], state["birth_year"][lo:hi], lo)
+            fm.save(os.path.join(out_dir, "features"), state["enrollment_id"], features)
+    paths = {nm: os.path.join(out_dir, f"{nm}.csv") for nm in tables}
+    if attendance:
+        paths["attendance"] = os.path.join(out_dir, "attendance")
+    return paths
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Out-of-core school records generator")
+    ap.add_argument("--students", type=int, required=True)
+    ap.add_argument("--start-year", type=int, required=True)
+    ap.add_argument("--subjects", required=True,
+                    help="comma-separated subject names (first 3 are mandatory)")
+    ap.add_argument("--out-dir", default=".")
+    ap.add_argument("--work-dir", default=None)
+    ap.add_argument("--mem-budget-mb", type=int, default=1024)
+    ap.add_argument("--seed", type=int, default=None)
+    ap.add_argument("--marks-format", choices=["wide", "long", "both"], default="wide")
+    ap.add_argument("--marks-model", choices=["uniform", "latent"], default="uniform")
+    ap.add_argument("--ability-dist", choices=["normal", "t", "uniform"], default="normal")
+    ap.add_argument("--difficulty", default="",
+                    help="latent model subject difficulty, e.g. 'Math=5,Art=-3'")
+    ap.add_argument("--rollups", action="store_true",
+                    help="also write grade_year_summary, class_year_summary and cohort_progression")
+    ap.add_argument("--student-state", action="store_true",
+                    help="also write student_state_by_year")
+    ap.add_argument("--features", choices=FEATURE_FORMATS, default=None,
+                    help="also export the per-student ML feature matrix to OUT_DIR/features")
+    ap.add_argument("--attendance", action="store_true",
+                    help="also stream daily attendance to OUT_DIR/attendance (Parquet by year/month)")
+    profiling.add_argument(ap)
+    args = ap.parse_args()
+
+    subjects = [s.strip() for s in args.subjects.split(",") if s.strip()]
+    ctx = GeneratorContext.create(args.seed)
+    grade_df = ctx.grade_table(subjects)
+    marks_model = (LatentAbilityMarks(difficulty=parse_difficulty(args.difficulty),
+                                      ability_dist=args.ability_dist)
+                   if args.marks_model == "latent" else UniformMarks())
+    with profiling.session(profiling.profile_dir(args.profile)):
+        simulate_out_of_core(args.students, args.start_year, grade_df, args.out_dir,
+                             mem_budget_mb=args.mem_budget_mb,
+                             work_dir=args.work_dir, seed=args.seed,
+                             marks_format=args.marks_format, marks_model=marks_model,
+                             rollups=args.rollups, snapshots=args.student_state,
+                             features=args.features, ctx=ctx, attendance=args.attendance)
+    print("✅ CSVs written: grades, students, academic, graduates, terminated")
+
+
+if __name__ == "__main__":
+    main()
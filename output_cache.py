@@ -0,0 +1,138 @@
+# output_cache.py
+"""
+Content-addressed on-disk cache of generated tables.
+
+An entry is keyed by the SHA-256 of the full generation config (student
+count, years, subjects, seed, ...) plus engine.ENGINE_VERSION, and holds
+one Parquet file per table. A hit touches the entry; when the cache grows
+past `max_bytes` the least recently used entries are removed first.
+
+Only seeded configurations are worth caching: without a seed the same
+config legitimately produces a different dataset every time.
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+from engine import ENGINE_VERSION
+from engine.backend import to_arrow
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "school_records")
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+_MANIFEST = "tables.json"
+
+
+def config_key(config: dict) -> str:
+    """Stable hash of a generation config and the engine version."""
+    blob = json.dumps({"engine": ENGINE_VERSION, **config}, sort_keys=True, default=str)
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+
+def _dir_size(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+
+
+class OutputCache:
+    def __init__(self, root: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        os.makedirs(root, exist_ok=True)
+
+    def _entry(self, key: str) -> str:
+        return os.path.join(self.root, key)
+
+    def _complete(self, path: str) -> bool:
+        return os.path.isfile(os.path.join(path, _MANIFEST))
+
+    def _entries(self):
+        return [self._entry(k) for k in os.listdir(self.root)
+                if os.path.isfile(os.path.join(self._entry(k), _MANIFEST))]
+
+    def __contains__(self, config: dict) -> bool:
+        return os.path.isfile(os.path.join(self._entry(config_key(config)), _MANIFEST))
+
+    def get(self, config: dict):
+        """{table name: DataFrame} for a cached config, or None on a miss."""
+        path = self._entry(config_key(config))
+        manifest = os.path.join(path, _MANIFEST)
+        if not os.path.isfile(manifest):
+            return None
+        with open(manifest) as f:
+            names = json.load(f)["tables"]
+        tables = {nm: pd.read_parquet(os.path.join(path, f"{nm}.parquet")) for nm in names}
+        os.utime(path)   # mark as recently used
+        return tables
+
+    def table_path(self, config: dict, name: str):
+        """Parquet file of one cached table (for streaming it), or None on a miss."""
+        path = os.path.join(self._entry(config_key(config)), f"{name}.parquet")
+        if config not in self or not os.path.isfile(path):
+            return None
+        os.utime(self._entry(config_key(config)))
+        return path
+
+    def put(self, config: dict, tables: dict):
+        """
+        Store `tables` ({name: DataFrame}, or any engine.backend table) for
+        `config` unless a complete entry already holds them, then evict down
+        to max_bytes. Safe to call concurrently for the same config.
+        """
+        path = self._entry(config_key(config))
+        tmp = tempfile.mkdtemp(dir=self.root, prefix=".tmp-")
+        try:
+            for nm, df in tables.items():
+                if isinstance(df, pd.DataFrame):
+                    df.to_parquet(os.path.join(tmp, f"{nm}.parquet"), index=False)
+                else:
+                    pq.write_table(to_arrow(df), os.path.join(tmp, f"{nm}.parquet"))
+            with open(os.path.join(tmp, _MANIFEST), "w") as f:
+                json.dump({"engine": ENGINE_VERSION, "config": config,
+                           "tables": list(tables)}, f, indent=2, default=str)
+            # a key fixes the contents: an entry already complete (e.g. from a concurrent
+            # put of the same config) is kept as it is, so get() never sees it missing
+            if not self._complete(path):
+                if os.path.isdir(path):
+                    # leftover of an interrupted put / eviction: move it aside, then remove it
+                    aside = tempfile.mkdtemp(dir=self.root, prefix=".old-")
+                    try:
+                        os.replace(path, aside)
+                    except FileNotFoundError:
+                        pass
+                    shutil.rmtree(aside, ignore_errors=True)
+                try:
+                    os.replace(tmp, path)
+                except OSError:
+                    if not self._complete(path):   # not just a concurrent put that got there first
+                        raise
+        finally:
+            if os.path.isdir(tmp):
+                shutil.rmtree(tmp)
+        self.evict(keep=path)
+
+    def evict(self, keep=None):
+        """Drop least recently used entries (never `keep`) until the cache fits in max_bytes."""
+        if self.max_bytes is None:   # unbounded store (e.g. a sweep's output directory)
+            return
+        entries = sorted(self._entries(), key=os.path.getmtime)
+        sizes = {p: _dir_size(p) for p in entries}
+        total = sum(sizes.values())
+        for p in entries:
+            if total <= self.max_bytes:
+                break
+            if p == keep:
+                continue
+            shutil.rmtree(p, ignore_errors=True)
+            total -= sizes[p]
+
+    def get_or_build(self, config: dict, build):
+        """Cached tables for `config`, or `build()` (-> {name: DataFrame}) stored on a miss."""
+        tables = self.get(config)
+        if tables is None:
+            tables = build()
+            self.put(config, tables)
+        return tables
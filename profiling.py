@@ -0,0 +1,286 @@
+# profiling.py
+"""
+Built-in profiling mode.
+
+Every entry point takes `--profile [DIR]` (or the SCHOOL_RECORDS_PROFILE
+environment variable, set to a directory) and runs inside a profiling
+session; the generation code marks its phases with
+
+    with profiling.phase("simulate"):
+        ...
+
+which costs nothing when no session is active. During a session each
+phase records, in its thread, a cProfile profile and the tracemalloc
+allocations it leaves behind, while a sampler thread takes wall-clock
+stacks of every thread every `interval` seconds. Allocation tracing is
+switched on only while a phase runs: it slows allocation-heavy Python
+code (Faker name pools, the row-by-row reference rules) several-fold,
+so profiled wall times are for comparing phases, not for benchmarks. Phases that run several
+times (one per request, per chunk…) are merged under their name.
+
+Written to the run directory (default ./profiles/<timestamp>) per phase:
+
+  <phase>.prof          cProfile stats (pstats, snakeviz, gprof2dot, flameprof)
+  <phase>.folded        sampled stacks, "frame;frame;… count" – the collapsed
+                        format of flamegraph.pl, inferno and speedscope
+  <phase>.alloc.folded  net bytes allocated, by allocation stack (same format)
+  <phase>.txt           top functions by cumulative / own time, top allocating lines
+
+plus summary.json with calls, wall time, net and peak traced memory per
+phase. A phase nested in another one on the same thread is folded into
+the outer phase; the stacks of threads outside any phase (e.g. writer or
+upload pools) are counted in the most recently started phase.
+"""
+import argparse
+import cProfile
+import io
+import json
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+
+ENV_VAR = "SCHOOL_RECORDS_PROFILE"
+PROFILE_ROOT = "profiles"
+
+_current = None
+
+
+def _forget_session():
+    # a forked child (e.g. a process pool worker) is not profiled; its copy of the
+    # session has no sampler and may hold a lock taken by the parent's sampler
+    global _current
+    _current = None
+
+
+os.register_at_fork(after_in_child=_forget_session)
+
+
+class _Phase:
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+        self.peak = 0
+        self.profiles = []
+        self.stacks = Counter()
+        self.allocs = Counter()      # allocation traceback -> net bytes
+
+
+def _frame_label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(";", ",")
+
+
+def _in_profiler(frame) -> bool:
+    """Whether the thread is running this module's code (entering / leaving a phase)."""
+    while frame is not None:
+        if frame.f_code.co_filename == __file__:
+            return True
+        frame = frame.f_back
+    return False
+
+
+def _fold(frame) -> str:
+    stack = []
+    while frame is not None:
+        stack.append(_frame_label(frame.f_code))
+        frame = frame.f_back
+    return ";".join(reversed(stack))
+
+
+class Profiler:
+    def __init__(self, run_dir, interval=0.005, frames=8, top=30):
+        self.run_dir, self.interval, self.frames, self.top = run_dir, interval, frames, top
+        self.phases = {}
+        self._active = {}            # thread ident -> phase name
+        self._tracers = 0            # phases (incl. their bookkeeping) that need tracemalloc
+        self._latest = None
+        self._lock = threading.Lock()
+        # tracing slows every allocation down, so it only runs while a phase does
+        self._own_tracemalloc = not tracemalloc.is_tracing()
+        self._filters = [tracemalloc.Filter(False, tracemalloc.__file__),
+                         tracemalloc.Filter(False, __file__)]
+        self._stop = threading.Event()
+        self._sampler = threading.Thread(target=self._sample, name="profiling-sampler", daemon=True)
+        self._sampler.start()
+
+    # —————— Recording ——————
+
+    def _sample(self):
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            with self._lock:
+                if not self._active:
+                    continue
+                active, latest = dict(self._active), self._latest
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me or _in_profiler(frame):
+                    continue
+                stack = f"{names.get(ident, ident)};{_fold(frame)}"
+                self.phases[active.get(ident, latest)].stacks[stack] += 1
+
+    def _snapshot(self):
+        return tracemalloc.take_snapshot().filter_traces(self._filters)
+
+    @contextmanager
+    def phase(self, name):
+        ident = threading.get_ident()
+        with self._lock:
+            if ident in self._active:          # nested: counted in the outer phase
+                nested = True
+            else:
+                nested = False
+                ph = self.phases.setdefault(name, _Phase())
+                if not self._tracers and self._own_tracemalloc:
+                    tracemalloc.start(self.frames)
+                self._tracers += 1
+        if nested:
+            yield
+            return
+
+        # the thread joins the phase only after the snapshot: the profiler's own work is not sampled
+        before = self._snapshot()
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        with self._lock:
+            self._active[ident] = self._latest = name
+        prof = cProfile.Profile()
+        try:
+            prof.enable()
+        except ValueError:                     # another profiler is active (Python 3.12+)
+            prof = None
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - t0
+            if prof is not None:
+                prof.disable()
+            peak = tracemalloc.get_traced_memory()[1] - base
+            with self._lock:
+                del self._active[ident]
+                if self._latest == name and self._active:
+                    self._latest = next(reversed(self._active.values()))
+            diff = self._snapshot().compare_to(before, "traceback")
+            with self._lock:
+                self._tracers -= 1
+                if not self._tracers and self._own_tracemalloc:
+                    tracemalloc.stop()
+                ph.calls += 1
+                ph.seconds += seconds
+                ph.peak = max(ph.peak, peak)
+                if prof is not None:
+                    ph.profiles.append(prof)
+                for stat in diff:
+                    if stat.size_diff:
+                        ph.allocs[stat.traceback] += stat.size_diff
+
+    # —————— Reports ——————
+
+    def _write_phase(self, name, ph) -> dict:
+        slug = re.sub(r"[^\w.-]+", "_", name).strip("_") or "phase"
+        base = os.path.join(self.run_dir, slug)
+        out = io.StringIO()
+        if ph.profiles:
+            stats = pstats.Stats(ph.profiles[0], stream=out)
+            for p in ph.profiles[1:]:
+                stats.add(p)
+            stats.dump_stats(base + ".prof")
+            for key in ("cumulative", "tottime"):
+                out.write(f"# top {self.top} by {key}\n")
+                stats.sort_stats(key).print_stats(self.top)
+
+        with open(base + ".folded", "w", encoding="utf-8") as f:
+            for stack, n in ph.stacks.most_common():
+                f.write(f"{stack} {n}\n")
+
+        by_line = Counter()
+        with open(base + ".alloc.folded", "w", encoding="utf-8") as f:
+            for tb, size in ph.allocs.most_common():
+                by_line[f"{tb[-1].filename}:{tb[-1].lineno}"] += size
+                if size > 0:
+                    frames = (f"{os.path.basename(fr.filename)}:{fr.lineno}".replace(";", ",") for fr in tb)
+                    f.write(f"{';'.join(frames)} {size}\n")
+        out.write(f"# top {self.top} allocating lines (net bytes)\n")
+        for line, size in by_line.most_common(self.top):
+            out.write(f"{size:>14,}  {line}\n")
+        with open(base + ".txt", "w", encoding="utf-8") as f:
+            f.write(out.getvalue())
+
+        return {"calls": ph.calls, "seconds": round(ph.seconds, 4),
+                "net_bytes": sum(ph.allocs.values()), "peak_bytes": ph.peak,
+                "samples": sum(ph.stacks.values()), "files": slug}
+
+    def close(self) -> str:
+        """Stop recording and write the reports; returns the run directory."""
+        self._stop.set()
+        self._sampler.join()
+        os.makedirs(self.run_dir, exist_ok=True)
+        summary = {"created": datetime.now().isoformat(timespec="seconds"),
+                   "argv": sys.argv,
+                   "interval": self.interval,
+                   "phases": {nm: self._write_phase(nm, ph) for nm, ph in self.phases.items()}}
+        with open(os.path.join(self.run_dir, "summary.json"), "w") as f:
+            json.dump(summary, f, indent=2)
+        return self.run_dir
+
+
+# —————— Sessions ——————
+
+def default_run_dir(root=PROFILE_ROOT) -> str:
+    return os.path.join(root, datetime.now().strftime("%Y%m%d-%H%M%S"))
+
+
+def profile_dir(value=None):
+    """
+    Run directory for a `--profile` value: the given directory, a fresh
+    default one for a bare `--profile`, else $SCHOOL_RECORDS_PROFILE, else
+    None (profiling off).
+    """
+    if value is None:
+        value = os.environ.get(ENV_VAR) or None
+    if value is None:
+        return None
+    return value or default_run_dir()
+
+
+def add_argument(ap: argparse.ArgumentParser):
+    ap.add_argument("--profile", nargs="?", const="", default=None, metavar="DIR",
+                    help=f"write cProfile / allocation / flame graph reports per phase to DIR "
+                         f"(default {PROFILE_ROOT}/<timestamp>; also ${ENV_VAR})")
+
+
+def profile_arg(argv=None):
+    """profile_dir() from `--profile` in argv, for entry points without an argparse CLI."""
+    ap = argparse.ArgumentParser(add_help=False)
+    add_argument(ap)
+    return profile_dir(ap.parse_known_args(argv)[0].profile)
+
+
+@contextmanager
+def session(run_dir, log=print):
+    """
+    Profile everything inside the block into `run_dir`; a no-op when
+    `run_dir` is None or a session is already running.
+    """
+    global _current
+    if run_dir is None or _current is not None:
+        yield _current
+        return
+    _current = Profiler(run_dir)
+    try:
+        yield _current
+    finally:
+        prof, _current = _current, None
+        log(f"🔬 Profile written to {prof.close()}")
+
+
+def phase(name):
+    """Context manager marking a phase of the active session (no-op without one)."""
+    return _current.phase(name) if _current is not None else nullcontext()
@@ -0,0 +1,468 @@
+# reference.py
+"""
+Reference oracles: the original row-by-row simulations, kept as they
+were before the engine rewrite so equivalence.py can hold the engine to
+them.
+
+  • generate_academic_and_events  – the annual loop of generator.py
+  • generate_enhanced_academics   – the semester loop of
+                                    Academic Data Generator.py, with
+                                    balance_class_distribution and
+                                    calculate_academic_year_score
+
+The rule code is unchanged. Only the sources of randomness are passed
+in instead of read from module globals (`rnd`, a random.Random, by
+default), and the per-student progress prints are gone:
+
+  draw_marks(key, max_marks) -> list of marks, one per subject
+  first_class()              -> class of a student without a prior year
+  new_students(required, year, classes) -> intake DataFrame
+
+`key` is the student's row in the population (intake rows continue the
+numbering), so a harness can hand both engines the same marks.
+Do not "optimize" this module: it is the specification.
+"""
+import random
+from datetime import datetime
+
+import pandas as pd
+from faker import Faker
+
+
+# —————— Original draws ——————
+
+def uniform_marks(rnd):
+    """The annual generator's marks: randint(0, max) per subject."""
+    return lambda key, max_marks: [rnd.randint(0, m) for m in max_marks]
+
+
+def split_marks(rnd):
+    """The semester generator's marks: 75% in 30–100, otherwise 0–29."""
+    def draw(key, max_marks):
+        marks = []
+        for _ in max_marks:
+            if rnd.random() < 0.75:
+                marks.append(rnd.randint(30, 100))
+            else:
+                marks.append(rnd.randint(0, 29))
+        return marks
+    return draw
+
+
+# —————— Annual (generator.py) ——————
+
+def generate_academic_and_events(students_df, grade_df, start_year, end_year,
+                                 draw_marks=None, first_class=None, rnd=None):
+    rnd = rnd or random.Random()
+    draw_marks = draw_marks or uniform_marks(rnd)
+    first_class = first_class or (lambda: rnd.choice(["A", "B", "C", "D"]))
+    academic,grads,term = [],[],[]
+    studs = students_df.copy()
+    for year in range(start_year, end_year + 1):
+        for idx, st in studs.iterrows():
+            grade = st["starting_grade"]
+            prev = st["last_pct"]
+            if st["enrollment_year"] > year:
+                continue
+            else:
+                # class
+                if prev is None: cls=first_class()
+                elif prev<30:    cls="D"
+                elif prev>=90:   cls="A"
+                elif prev>=70:   cls="B"
+                elif prev>=55:   cls="C"
+                else:            cls="D"
+                # simulate marks
+                subs=grade_df[grade_df.grade==grade]
+                msum=subs.max_marks.sum()
+                marks=draw_marks(idx, subs.max_marks.tolist())
+                pct=round(sum(marks)/msum*100,2)
+                # record
+                rec={"academic_year":year,"enrollment_id":st.enrollment_id,
+                     "grade":grade,"class":cls,"final_percentage":pct}
+                for i in range(5):
+                    rec[f"subject_{i+1}_marks"]=marks[i] if i<len(marks) else None
+                academic.append(rec)
+                # grad/fail/term
+                if grade==8:
+                    if pct>=30:
+                        age=year-st.birthdate.year
+                        grads.append({"enrollment_id":st.enrollment_id,
+                                      "first_name":st.first_name,
+                                      "last_name":st.last_name,
+                                      "final_pct":pct,
+                                      "age":age,
+                                      "Graduation Year": year+1})
+                        studs.at[idx,"terminated"]=True
+                    else:
+                        studs.at[idx,"fail_count"]+=1
+                        studs.at[idx,"last_pct"]=pct
+                        if studs.at[idx,"fail_count"]>=3:
+                            term.append({"enrollment_id":st.enrollment_id,
+                                         "first_name":st.first_name,
+                                         "last_name":st.last_name,
+                                         "grade":grade,"academic_year":year,
+                                         "reason":f"Failed 3× in grade {grade}"})
+                            studs.at[idx,"terminated"]=True
+                else:
+                    if pct>=30:
+                        studs.at[idx,"starting_grade"]+=1
+                        studs.at[idx,"fail_count"]=0
+                        studs.at[idx,"last_pct"]=pct
+                    else:
+                        studs.at[idx,"fail_count"]+=1
+                        studs.at[idx,"last_pct"]=pct
+                        if studs.at[idx,"fail_count"]>=3:
+                            term.append({"enrollment_id":st.enrollment_id,
+                                         "first_name":st.first_name,
+                                         "last_name":st.last_name,
+                                         "grade":grade,"academic_year":year,
+                                         "reason":f"Failed 3× in grade {grade}"})
+                            studs.at[idx,"terminated"]=True
+        studs=studs[~studs.terminated]
+    return (pd.DataFrame(academic),
+            pd.DataFrame(grads),
+            pd.DataFrame(term))
+
+
+# —————— Semester (Academic Data Generator.py) ——————
+
+def get_performance_class(percentage: float) -> str:
+    """Get class based on performance"""
+    if percentage >= 90:
+        return "A"
+    elif percentage >= 70:
+        return "B"
+    elif percentage >= 55:
+        return "C"
+    else:
+        return "D"
+
+
+def can_move_to_class(percentage: float, target_class: str) -> bool:
+    """Check if student with given percentage can be moved to target class"""
+    if target_class == "A":
+        return percentage >= 30
+    elif target_class == "B":
+        return percentage >= 30 and percentage < 90
+    elif target_class == "C":
+        return percentage >= 30 and percentage < 70
+    elif target_class == "D":
+        return percentage < 55
+    return False
+
+
+def balance_class_distribution(students_in_grade: pd.DataFrame, target_per_class: int,
+                               class_labels: list) -> pd.DataFrame:
+    """
+    PROVEN: Balance class distribution maintaining equal numbers per class
+    while respecting performance constraints and using alphabetical ordering
+    """
+    students = students_in_grade.copy()
+
+    # Step 1: Initial performance-based assignment
+    for idx, student in students.iterrows():
+        academic_pct = student.get('academic_year_percentage', student.get('last_pct', 50))
+        performance_class = get_performance_class(academic_pct)
+        students.at[idx, 'curr_class'] = performance_class
+
+    # Step 2: Balance classes using alphabetical ordering
+    for target_class in class_labels:
+        current_count = len(students[students['curr_class'] == target_class])
+        needed = target_per_class - current_count
+
+        if needed > 0:
+            eligible_students = []
+            class_hierarchy = {"A": 4, "B": 3, "C": 2, "D": 1}
+
+            for idx, student in students.iterrows():
+                curr_class = student['curr_class']
+                academic_pct = student.get('academic_year_percentage', student.get('last_pct', 50))
+
+                if curr_class == target_class:
+                    continue
+
+                if can_move_to_class(academic_pct, target_class):
+                    if class_hierarchy.get(target_class, 0) > class_hierarchy.get(curr_class, 0):
+                        full_name = f"{student['first_name']} {student['last_name']}"
+                        eligible_students.append((idx, full_name, academic_pct))
+
+            # Sort alphabetically and move
+            eligible_students.sort(key=lambda x: x[1].lower())
+            moved = 0
+            for idx, full_name, pct in eligible_students:
+                if moved >= needed:
+                    break
+                students.at[idx, 'curr_class'] = target_class
+                moved += 1
+
+    return students
+
+
+def add_new_students(required: int, year: int, classes: int = 4, rnd=None, fake=None) -> pd.DataFrame:
+    """ENHANCED: Add new students with balanced class distribution"""
+    if required == 0:
+        return pd.DataFrame()
+    rnd = rnd or random.Random()
+    fake = fake or Faker()
+
+    rows, uid0 = [], year * 10000 + 9000
+    class_labels = ["A", "B", "C", "D"][:classes]
+
+    # Distribute evenly across classes
+    per_class = required // classes
+    remainder = required % classes
+
+    counter = 0
+    for i, cls in enumerate(class_labels):
+        class_count = per_class + (1 if i < remainder else 0)
+        for _ in range(class_count):
+            counter += 1
+            sid = uid0 + counter
+            rows.append(
+                {"student_id": sid,
+                 "enrollment_id": sid,
+                 "first_name": fake.first_name(),
+                 "last_name": fake.last_name(),
+                 "birthdate": datetime(year - 2, rnd.randint(1, 12),
+                                       rnd.randint(1, 28)).date(),
+                 "enrollment_status": "new",
+                 "enrollment_year": year,
+                 "starting_grade": 1,
+                 "starting_class": cls}
+            )
+
+    return pd.DataFrame(rows)
+
+
+def generate_semester_performance(grade: int, semester: int, grade_df: pd.DataFrame,
+                                  draw_marks, key) -> tuple[list[str], list[int], float]:
+    """Generate performance for a specific semester"""
+    semester_subjects = grade_df[
+        (grade_df.grade == grade) & (grade_df.semester == semester)
+        ]['subject'].tolist()
+
+    if not semester_subjects:
+        # Fallback if no subjects found
+        semester_subjects = ["Subject1", "Subject2", "Subject3"]
+
+    # Generate marks for each subject
+    marks = draw_marks(key, [100] * len(semester_subjects))
+
+    # Calculate semester percentage
+    semester_percentage = sum(marks) / len(marks) if marks else 0
+
+    return semester_subjects, marks, round(semester_percentage, 2)
+
+
+def calculate_academic_year_score(sem1_percentage: float, sem2_percentage: float = None) -> float:
+    """
+    Calculate academic year score based on semester performance rules:
+    - If sem1 < 30%, academic score = sem1 score
+    - If sem1 >= 30% and sem2 < 30%, academic score = sem2 score
+    - If both >= 30%, academic score = average of both
+    """
+    if sem1_percentage < 30:
+        return sem1_percentage
+    elif sem2_percentage is None:
+        return sem1_percentage
+    elif sem2_percentage < 30:
+        return sem2_percentage
+    else:
+        return round((sem1_percentage + sem2_percentage) / 2, 2)
+
+
+def generate_enhanced_academics(students_df: pd.DataFrame, grade_df: pd.DataFrame,
+                                start_year: int, end_year: int,
+                                total_pop: int, per_grade: int, per_class: int,
+                                grades: int = 8, classes: int = 4,
+                                draw_marks=None, new_students=None, rnd=None):
+    """Enhanced academic simulation with semester logic"""
+    rnd = rnd or random.Random()
+    draw_marks = draw_marks or split_marks(rnd)
+    if new_students is None:
+        fake = Faker()
+        fake.seed_instance(rnd.getrandbits(32))
+        new_students = lambda required, year, classes: add_new_students(required, year, classes, rnd, fake)
+
+    academic_records = []
+    graduates = []
+    terminated = []
+    students = students_df.copy()
+
+    # Initialize tracking fields
+    students["academic_year_percentage"] = None
+    students["semester1_percentage"] = None
+    students["semester2_percentage"] = None
+    students["fail_count"] = 0
+    students["terminated"] = False
+    students["curr_class"] = students["starting_class"]
+
+    class_labels = ["A", "B", "C", "D"][:classes]
+
+    for year in range(start_year, end_year + 1):
+        # Process semester-wise academics
+        semester_data = {}
+
+        for idx, student in students.iterrows():
+            if student.terminated:
+                continue
+
+            student_id = student.enrollment_id
+            grade = student.starting_grade
+
+            # SEMESTER 1
+            sem1_subjects, sem1_marks, sem1_pct = generate_semester_performance(grade, 1, grade_df,
+                                                                                draw_marks, idx)
+            students.at[idx, "semester1_percentage"] = sem1_pct
+
+            # SEMESTER 2 - Only if Semester 1 >= 30%
+            sem2_subjects, sem2_marks, sem2_pct = [], [], None
+            if sem1_pct >= 30:
+                sem2_subjects, sem2_marks, sem2_pct = generate_semester_performance(grade, 2, grade_df,
+                                                                                    draw_marks, idx)
+                students.at[idx, "semester2_percentage"] = sem2_pct
+            else:
+                students.at[idx, "semester2_percentage"] = None
+
+            # Calculate academic year score based on rules
+            academic_year_score = calculate_academic_year_score(sem1_pct, sem2_pct)
+            students.at[idx, "academic_year_percentage"] = academic_year_score
+
+            # Store semester data for record generation
+            semester_data[student_id] = {
+                'sem1_subjects': sem1_subjects,
+                'sem1_marks': sem1_marks,
+                'sem1_percentage': sem1_pct,
+                'sem2_subjects': sem2_subjects,
+                'sem2_marks': sem2_marks,
+                'sem2_percentage': sem2_pct,
+                'academic_year_percentage': academic_year_score
+            }
+
+        # Balance class distributions based on academic year scores
+        for current_grade in range(1, grades + 1):
+            grade_students = students[
+                (~students.terminated) &
+                (students.starting_grade == current_grade)
+                ]
+
+            if len(grade_students) > 0:
+                balanced_students = balance_class_distribution(
+                    grade_students, per_class, class_labels
+                )
+
+                # Update the main dataframe with balanced classes
+                for idx in balanced_students.index:
+                    students.at[idx, 'curr_class'] = balanced_students.at[idx, 'curr_class']
+
+        # Generate comprehensive academic records
+        for idx, student in students.iterrows():
+            if student.terminated:
+                continue
+
+            student_id = student.enrollment_id
+            grade = student.starting_grade
+            class_assigned = student.curr_class
+            data = semester_data.get(student_id, {})
+
+            # Create comprehensive academic record
+            record = {
+                "academic_year": year,
+                "enrollment_id": student_id,
+                "grade_current": grade,
+                "class_current": class_assigned,
+
+                # Semester 1 details
+                "Sem 1 Subjects": "; ".join(data.get('sem1_subjects', [])),
+                "Sem 1 Scores": "; ".join(map(str, data.get('sem1_marks', []))),
+                "Sem 1 Percentage": data.get('sem1_percentage', 0),
+                "Active backlogs until sem 1": 0,  # Simplified for now
+                "cleared backlogs in Sem 1": 0,
+
+                # Semester 2 details
+                "Sem 2 subjects": "; ".join(data.get('sem2_subjects', [])),
+                "Sem 2 Scores": "; ".join(map(str, data.get('sem2_marks', []))),
+                "Sem 2 Percentage": data.get('sem2_percentage') if data.get('sem2_percentage') is not None else 0,
+                "Active backlogs until sem 2": 0,  # Simplified for now
+                "cleared backlogs in Sem 2": 0,
+
+                # Academic year summary
+                "Total Weighted percentage in current academic year": data.get('academic_year_percentage', 0),
+                "Next year projected grade": grade + 1 if data.get('academic_year_percentage',
+                                                                   0) >= 30 and grade < grades else grade,
+                "Next year projected class": get_performance_class(data.get('academic_year_percentage', 0))
+            }
+
+            academic_records.append(record)
+
+        # Handle progression/graduation/termination based on academic year scores
+        leavers = 0
+        for idx, student in students.iterrows():
+            if student.terminated:
+                continue
+
+            student_id = student.enrollment_id
+            grade = student.starting_grade
+            academic_pct = student.academic_year_percentage
+
+            # Progression logic based on academic year percentage
+            if grade == grades:  # Final grade
+                if academic_pct >= 30:  # Graduate
+                    graduates.append({
+                        "enrollment_id": student_id,
+                        "first_name": student.first_name,
+                        "last_name": student.last_name,
+                        "final_pct": academic_pct,
+                        "age": year - student.birthdate.year,
+                        "graduation_year": year
+                    })
+                    students.at[idx, "terminated"] = True
+                    leavers += 1
+                else:  # Failed final grade
+                    students.at[idx, "fail_count"] += 1
+                    # Set class to D for failed students
+                    students.at[idx, "curr_class"] = "D"
+                    if students.at[idx, "fail_count"] >= 3:
+                        terminated.append({
+                            "enrollment_id": student_id,
+                            "first_name": student.first_name,
+                            "last_name": student.last_name,
+                            "grade": grade,
+                            "academic_year": year,
+                            "reason": f"Failed 3× in Grade {grade}"
+                        })
+                        students.at[idx, "terminated"] = True
+                        leavers += 1
+            else:  # Grades 1 to (final-1)
+                if academic_pct >= 30:  # Promote
+                    students.at[idx, "starting_grade"] += 1
+                    students.at[idx, "fail_count"] = 0
+                else:  # Repeat grade in class D
+                    students.at[idx, "fail_count"] += 1
+                    students.at[idx, "curr_class"] = "D"  # Failed students go to D class
+                    if students.at[idx, "fail_count"] >= 3:
+                        terminated.append({
+                            "enrollment_id": student_id,
+                            "first_name": student.first_name,
+                            "last_name": student.last_name,
+                            "grade": grade,
+                            "academic_year": year,
+                            "reason": f"Failed 3× in Grade {grade}"
+                        })
+                        students.at[idx, "terminated"] = True
+                        leavers += 1
+
+        # Maintain population with balanced new students
+        if leavers and year < end_year:
+            new = new_students(leavers, year + 1, classes)
+            if not new.empty:
+                new[["academic_year_percentage", "semester1_percentage", "semester2_percentage", "fail_count",
+                     "terminated"]] = [None, None, None, 0, False]
+                new["curr_class"] = new["starting_class"]
+                students = pd.concat([students, new], ignore_index=True)
+
+    return (pd.DataFrame(academic_records),
+            pd.DataFrame(graduates),
+            pd.DataFrame(terminated),
+            students[["student_id", "first_name", "last_name", "birthdate"]].drop_duplicates())
@@ -23,151 +23,36 @@ for module, pkg in _dependencies.items():
         subprocess.check_call([sys.executable, "-m", "pip", "install", pkg])
         _installed_now.append(pkg)
 
-import json
-import random
-import sys
 from datetime import datetime
-import pandas as pd
 import tkinter as tk
 from tkinter import ttk,messagebox,filedialog
-from faker import Faker
-from mimesis import Datetime
 from google.cloud import bigquery
-from google.api_core.exceptions import Conflict
-
-fake = Faker()
-dt   = Datetime()
-
-
-
-# —————— Core generation functions (as before) ——————
-
-def generate_subject_counts():
-    return {g: (3 if g <= 3 else random.randint(3, 5)) for g in range(1, 9)}
-
-def generate_grade_table(subjects):
-    rows = []
-    for grade, total in generate_subject_counts().items():
-        mandatory = subjects[:3]
-        extras    = random.sample(subjects[3:], total - 3)
-        for subj in mandatory + extras:
-            rows.append({"grade":grade,"subject":subj,"min_marks":0,"max_marks":100})
-    return pd.DataFrame(rows)
-
-def generate_student_details(n, school_start):
-    rows, seq = [], 1
-    current = datetime.now().year
-    earliest = school_start - 10
-    mult = 1000 if n>=1000 else 100
-    for _ in range(n):
-        bd = dt.date(start=earliest,end=current-2)  # never born <2 years ago
-        yr = bd.year
-        sid = yr*mult + seq; seq+=1
-        rows.append({"student_id":sid,
-                     "first_name":fake.first_name(),
-                     "last_name": fake.last_name(),
-                     "birthdate": bd})
-    return pd.DataFrame(rows)
-
-def generate_student_enrollment(student_details_df, school_start, n):
-    rows, seq = [], 1
-    current = datetime.now().year
-    mult = 1000 if n>=1000 else 100
-    for _,st in student_details_df.iterrows():
-        by = st.birthdate.year
-        if by < (school_start-2):
-            status="transfer-in"
-        else:
-            status=random.choice(["new","transfer-in"])
-        if status=="new":
-            ey = max(by+2, school_start)
-            grade=1
-        else:
-            e_min = max(school_start, by+3)
-            e_max = min(current, by+10)
-            if e_min<=e_max:
-                ey = random.randint(e_min,e_max)
-            else:
-                status="new"; ey=max(by+2,school_start); grade=1
-            age=ey-by; grade=max(1,min(age-2,8))
-        eid = ey*mult + seq; seq+=1
-        rows.append({"student_id":st.student_id,
-                     "enrollment_id":eid,
-                     "enrollment_status":status,
-                     "enrollment_year":ey,
-                     "starting_grade":grade})
-    return pd.DataFrame(rows)
-
-def generate_academic_and_events(students_df, grade_df, start_year, end_year):
-    academic,grads,term = [],[],[]
-    studs = students_df.copy()
-    for year in range(start_year, end_year+1):
-        for idx,st in studs.iterrows():
-            grade = st.starting_grade
-            prev = st.last_pct
-            # class
-            if prev is None: cls=random.choice(["A","B","C","D"])
-            elif prev<30:    cls="D"
-            elif prev>=90:   cls="A"
-            elif prev>=70:   cls="B"
-            elif prev>=55:   cls="C"
-            else:            cls="D"
-            # simulate marks
-            subs=grade_df[grade_df.grade==grade]
-            msum=subs.max_marks.sum()
-            marks=subs.max_marks.apply(lambda m: random.randint(0,m)).tolist()
-            pct=round(sum(marks)/msum*100,2)
-            # record
-            rec={"academic_year":year,"enrollment_id":st.enrollment_id,
-                 "grade":grade,"class":cls,"final_percentage":pct}
-            for i in range(5):
-                rec[f"subject_{i+1}_marks"]=marks[i] if i<len(marks) else None
-            academic.append(rec)
-            # grad/fail/term
-            if grade==8:
-                if pct>=30:
-                    age=year-st.birthdate.year
-                    grads.append({"enrollment_id":st.enrollment_id,
-                                  "first_name":st.first_name,
-                                  "last_name":st.last_name,
-                                  "final_pct":pct,"age":age})
-                    studs.at[idx,"terminated"]=True
-                else:
-                    studs.at[idx,"fail_count"]+=1
-                    studs.at[idx,"last_pct"]=pct
-                    if studs.at[idx,"fail_count"]>=3:
-                        term.append({"enrollment_id":st.enrollment_id,
-                                     "first_name":st.first_name,
-                                     "last_name":st.last_name,
-                                     "grade":grade,"academic_year":year,
-                                     "reason":f"Failed 3× in grade {grade}"})
-                        studs.at[idx,"terminated"]=True
-            else:
-                if pct>=30:
-                    studs.at[idx,"starting_grade"]+=1
-                    studs.at[idx,"fail_count"]=0
-                    studs.at[idx,"last_pct"]=pct
-                else:
-                    studs.at[idx,"fail_count"]+=1
-                    studs.at[idx,"last_pct"]=pct
-                    if studs.at[idx,"fail_count"]>=3:
-                        term.append({"enrollment_id":st.enrollment_id,
-                                     "first_name":st.first_name,
-                                     "last_name":st.last_name,
-                                     "grade":grade,"academic_year":year,
-                                     "reason":f"Failed 3× in grade {grade}"})
-                        studs.at[idx,"terminated"]=True
-        studs=studs[~studs.terminated]
-    return (pd.DataFrame(academic),
-            pd.DataFrame(grads),
-            pd.DataFrame(term))
+
+import profiling
+from bq_schema import load_job_config
+from engine import (
+    GeneratorContext,
+    annual_rules,
+    generate_student_details,
+    generate_student_enrollment,
+    simulate,
+)
+
+# this app records students from the first simulated year, enrolled or not,
+# and its graduates table has no graduation-year column
+RULES = annual_rules(skip_future_enrollments=False, graduation_year_column=None)
+
+
+# —————— Core generation functions (engine) ——————
+
+def generate_academic_and_events(students_df, grade_df, start_year, end_year, ctx=None):
+    result = simulate(students_df, grade_df, start_year, end_year, RULES, ctx=ctx)
+    return result.academic, result.graduates, result.terminated
 
 def upload_df_to_bq(df, project_id, dataset_id, table_name):
     client = bigquery.Client(project=project_id)
     table_id = f"{project_id}.{dataset_id}.{table_name}"
-    job_config = bigquery.LoadJobConfig(
-        write_disposition=bigquery.WriteDisposition.WRITE_TRUNCATE
-    )
+    job_config = load_job_config(table_name, df)
     job = client.load_table_from_dataframe(df, table_id, job_config=job_config)
     job.result()
 
@@ -196,16 +81,17 @@ def upload_all_to_bq(grade_df, students_df, academic_df, grads_df, term_df,
         job = client.load_table_from_dataframe(
             df,
             table_ref,
-            job_config=bigquery.LoadJobConfig(write_disposition="WRITE_TRUNCATE")
+            job_config=load_job_config(table_name, df)
         )
         job.result()
         print(f"Uploaded {len(df)} rows to {table_ref}")
 
-    _upload(grade_df,    "grades")
-    _upload(students_df, "students")
-    _upload(academic_df, "academic")
-    _upload(grads_df,    "graduates")
-    _upload(term_df,     "terminated")
+    with profiling.phase("upload"):
+        _upload(grade_df,    "grades")
+        _upload(students_df, "students")
+        _upload(academic_df, "academic")
+        _upload(grads_df,    "graduates")
+        _upload(term_df,     "terminated")
 
 
 class App(tk.Tk):
@@ -249,26 +135,30 @@ class App(tk.Tk):
         start = int(self.e_start.get())
         subs  = [s.strip() for s in self.t_subjects.get("1.0", tk.END).splitlines() if s.strip()]
 
-        grade_df = generate_grade_table(subs)
-        det_df   = generate_student_details(n, start)
-        enr_df   = generate_student_enrollment(det_df, start, n)
-        students = (enr_df
-                    .merge(det_df, on="student_id")
-                    .assign(last_pct=None, fail_count=0, terminated=False))
-        acad_df, grads_df, term_df = generate_academic_and_events(
-            students, grade_df, start, datetime.now().year
-        )
+        with profiling.phase("inputs"):
+            ctx      = GeneratorContext.create()
+            grade_df = ctx.grade_table(subs)
+            det_df   = generate_student_details(n, start, ctx=ctx)
+            enr_df   = generate_student_enrollment(det_df, start, n, ctx=ctx)
+            students = (enr_df
+                        .merge(det_df, on="student_id")
+                        .assign(last_pct=None, fail_count=0, terminated=False))
+        with profiling.phase("simulate"):
+            acad_df, grads_df, term_df = generate_academic_and_events(
+                students, grade_df, start, datetime.now().year, ctx
+            )
         return grade_df, students, acad_df, grads_df, term_df
 
     def on_generate(self):
         try:
             grade_df, students_df, acad_df, grads_df, term_df = self.generate_all()
-            grade_df.to_csv("grades.csv", index=False)
-            students_df.drop(columns=["last_pct","fail_count","terminated"])\
-                       .to_csv("students.csv", index=False)
-            acad_df.to_csv("academic.csv", index=False)
-            grads_df.to_csv("graduates.csv", index=False)
-            term_df.to_csv("terminated.csv", index=False)
+            with profiling.phase("write_csv"):
+                grade_df.to_csv("grades.csv", index=False)
+                students_df.drop(columns=["last_pct","fail_count","terminated"])\
+                           .to_csv("students.csv", index=False)
+                acad_df.to_csv("academic.csv", index=False)
+                grads_df.to_csv("graduates.csv", index=False)
+                term_df.to_csv("terminated.csv", index=False)
             self.status.config(text="✅ CSVs generated.")
         except Exception as e:
             messagebox.showerror("Error", str(e))
@@ -353,4 +243,6 @@ class App(tk.Tk):
             messagebox.showerror("Error", str(e))
 # build window
 if __name__ == "__main__":
-    App().mainloop()
\ No newline at end of file
+    # --profile [DIR]: every Generate / Upload is profiled, reports written on exit
+    with profiling.session(profiling.profile_arg()):
+        App().mainloop()
\ No newline at end of file
@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+"""
+service.py
+
+Local HTTP service that generates a table on demand and streams it back
+while it is being generated.
+
+    POST /generate
+    {"num_students": 5000, "school_start": 2010,
+     "subjects": ["Math", "Science", ...],        (or one name per line)
+     "end_year": 2024, "seed": 7,                  (optional)
+     "rollups": false, "snapshots": false,         (optional)
+     "table": "academic",                          (default)
+     "format": "csv"}                              (csv | arrow)
+
+The first three fields are the ones of questions.json. The response
+status and headers go out as soon as the spec is validated, then the
+table follows in HTTP chunks: CSV (header once, then rows) or an Arrow
+IPC stream (application/vnd.apache.arrow.stream). `academic` and
+`student_state_by_year` arrive year by year as the simulation steps;
+`grades` and `students` as soon as the population exists.
+
+Generations run on a bounded worker pool (--workers); a generation hands
+its batches to the request through a small queue, so a slow client slows
+its own generation down instead of piling up memory, and a client that
+disconnects cancels it, also while its job still waits for a worker.
+Every generation gets its own GeneratorContext, with the Faker name pools
+kept warm per seed. Without caching, a generation steps through the years
+keeping only what the requested table needs (graduates / terminated and
+the rollups are only complete at the end); a seeded spec is stored in the
+OutputCache (the same entries the GUI uses), which needs every table, and
+repeats stream straight from the cached Parquet file. X-Cache: hit | miss
+says which path served a request.
+
+    python service.py --port 8765 --workers 4
+"""
+import argparse
+import json
+import queue
+import select
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+
+import profiling
+from csv_export import csv_ready, write_options
+from engine import ROLLUP_TABLES, GeneratorContext, annual_rules, iter_simulation
+from engine.backend import PANDAS
+from generator import TABLES, generate_all, generate_inputs
+from output_cache import OutputCache
+
+FORMATS = {"csv": "text/csv; charset=utf-8", "arrow": "application/vnd.apache.arrow.stream"}
+BATCH_ROWS = 65_536
+POLL_SECONDS = 0.5            # how often a waiting request checks its client is still there
+_DONE = object()
+
+
+class _Cancelled(Exception):
+    pass
+
+
+# —————— Job spec ——————
+
+def parse_spec(spec: dict) -> tuple[dict, str, str]:
+    """(generate_all config, table, format) from a request body; ValueError if invalid."""
+    missing = [k for k in ("num_students", "school_start", "subjects") if k not in spec]
+    if missing:
+        raise ValueError(f"missing fields: {missing}")
+    subjects = spec["subjects"]
+    if isinstance(subjects, str):
+        subjects = subjects.splitlines()
+    subjects = [s.strip() for s in subjects if s.strip()]
+    seed = spec.get("seed")
+    config = {"students":   int(spec["num_students"]),
+              "start_year": int(spec["school_start"]),
+              "end_year":   int(spec.get("end_year") or datetime.now().year),
+              "subjects":   subjects,
+              "seed":       None if seed is None else int(seed),
+              "rollups":    bool(spec.get("rollups", False)),
+              "snapshots":  bool(spec.get("snapshots", False))}
+    if config["students"] <= 0 or not subjects or config["end_year"] < config["start_year"]:
+        raise ValueError("need num_students > 0, at least one subject and end_year >= school_start")
+    table, fmt = spec.get("table", "academic"), spec.get("format", "csv")
+    tables = TABLES + ["student_state_by_year"] * config["snapshots"] + ROLLUP_TABLES * config["rollups"]
+    if table not in tables:
+        raise ValueError(f"table must be one of {tables}, got {table!r}")
+    if fmt not in FORMATS:
+        raise ValueError(f"format must be one of {list(FORMATS)}, got {fmt!r}")
+    return config, table, fmt
+
+
+# —————— Generation ——————
+
+@lru_cache(maxsize=32)
+def _warm_context(name_pool_seed):
+    return GeneratorContext.create(name_pool_seed=name_pool_seed)
+
+
+def _stream_table(config, table, ctx, put):
+    """
+    The run generate_all(**config, ctx=ctx) makes, year by year, passing
+    only `table` to `put` (in batches where the table comes in batches)
+    and keeping nothing else between years.
+    """
+    grade_df, students_df, _ = generate_inputs(config["students"], config["start_year"],
+                                               config["subjects"], ctx=ctx)
+    if table in ("grades", "students"):
+        return put(grade_df if table == "grades" else students_df)
+    sim = iter_simulation(students_df, grade_df, config["start_year"], config["end_year"],
+                          annual_rules(), ctx=ctx, rollups=config["rollups"],
+                          snapshots=table == "student_state_by_year")
+    events = []
+    for batch in sim:
+        if table == "academic":
+            put(batch.academic)
+        elif table == "student_state_by_year":
+            put(batch.student_state)
+        elif table in ("graduates", "terminated"):
+            events.append(getattr(batch, table))
+    termination = sim.rules.termination
+    if table == "graduates":
+        put(PANDAS.concat(events, termination.graduate_columns()))
+    elif table == "terminated":
+        put(PANDAS.concat(events, termination.terminated_columns))
+    elif table in ROLLUP_TABLES:
+        put(sim.rollup_tables()[table])
+
+
+def _generate(config, table, out: queue.Queue, cancelled: threading.Event, cache):
+    """Worker: generate the run, putting the requested table's batches on `out`."""
+    def put(df):
+        while not cancelled.is_set():
+            try:
+                return out.put(df, timeout=POLL_SECONDS)
+            except queue.Full:
+                pass
+        raise _Cancelled
+
+    if cancelled.is_set():
+        return   # the client left while the job was waiting for a worker
+
+    def on_inputs(grade_df, students_df):
+        if table in ("grades", "students"):
+            put(grade_df if table == "grades" else students_df)
+
+    def on_year(batch):
+        if table == "academic":
+            put(batch.academic)
+        elif table == "student_state_by_year":
+            put(batch.student_state)
+
+    try:
+        ctx = _warm_context(config["seed"]).reseed(config["seed"])   # own RNGs, shared name pools
+        if cache is None or config["seed"] is None:
+            _stream_table(config, table, ctx, put)
+            return put(_DONE)
+        # the cache entry needs every table, so this run keeps them all
+        tables = generate_all(**config, on_year=on_year, on_inputs=on_inputs, ctx=ctx)
+        if table not in ("grades", "students", "academic", "student_state_by_year"):
+            put(tables[table])
+        elif table == "academic" and tables["academic"].empty:
+            put(tables["academic"])   # no year produced rows: still send the header
+        # cache first, so a repeat of this spec sent right after the response is a hit
+        cache.put(config, tables)
+        put(_DONE)
+    except _Cancelled:
+        pass
+    except Exception as e:
+        try:
+            put(e)
+        except _Cancelled:
+            pass
+
+
+# —————— Encoding ——————
+
+class _ChunkedWriter:
+    """File-like object writing each write() as one HTTP/1.1 chunk."""
+
+    def __init__(self, wfile):
+        self.wfile = wfile
+        self.closed = False
+
+    def write(self, data):
+        data = bytes(data)
+        if data:
+            self.wfile.write(b"%X\r\n%s\r\n" % (len(data), data))
+        return len(data)
+
+    def flush(self):
+        self.wfile.flush()
+
+    def finish(self):
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+
+class _Encoder:
+    """Turns a sequence of Arrow tables into one CSV or Arrow IPC stream."""
+
+    def __init__(self, sink: _ChunkedWriter, fmt: str):
+        self.sink, self.fmt = sink, fmt
+        self.schema = None
+        self.writer = None
+        self.header = True
+
+    def write(self, table: pa.Table):
+        if self.schema is None:
+            self.schema = table.schema.remove_metadata()
+            if self.fmt == "arrow":
+                self.writer = pa.ipc.new_stream(self.sink, self.schema)
+        elif table.schema.remove_metadata() != self.schema:
+            table = table.cast(self.schema)   # e.g. an all-null column in the first batch
+        for batch in table.to_batches(max_chunksize=BATCH_ROWS):
+            if self.fmt == "arrow":
+                self.writer.write_batch(batch)
+            else:
+                buf = pa.BufferOutputStream()
+                pacsv.write_csv(csv_ready(pa.Table.from_batches([batch])), buf,
+                                write_options(table, include_header=self.header))
+                self.header = False
+                self.sink.write(buf.getvalue())
+            self.sink.flush()
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+# —————— HTTP ——————
+
+class GenerationHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "SchoolRecords/1.0"
+
+    def _error(self, status, message):
+        body = json.dumps({"error": message}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _client_gone(self) -> bool:
+        """Whether the client closed the connection (it sends nothing while it waits)."""
+        try:
+            readable, _, _ = select.select([self.connection], [], [], 0)
+            return bool(readable) and not self.connection.recv(1, socket.MSG_PEEK)
+        except OSError:
+            return True
+
+    def do_POST(self):
+        if self.path != "/generate":
+            return self._error(404, f"unknown path {self.path}")
+        try:
+            spec = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            config, table, fmt = parse_spec(spec)
+        except (ValueError, TypeError) as e:
+            return self._error(400, str(e))
+
+        cache = self.server.cache
+        cached = cache.table_path(config, table) if cache is not None and config["seed"] is not None else None
+        self.send_response(200)
+        self.send_header("Content-Type", FORMATS[fmt])
+        self.send_header("Transfer-Encoding", "chunked")
+        self.send_header("X-Cache", "hit" if cached else "miss")
+        self.end_headers()
+        self.wfile.flush()
+
+        sink = _ChunkedWriter(self.wfile)
+        encoder = _Encoder(sink, fmt)
+        cancelled = threading.Event()
+        job = None
+        try:
+            if cached:
+                pf = pq.ParquetFile(cached)
+                for batch in pf.iter_batches(batch_size=BATCH_ROWS):
+                    encoder.write(pa.Table.from_batches([batch]))
+                if pf.metadata.num_rows == 0:
+                    encoder.write(pf.schema_arrow.empty_table())
+            else:
+                out = queue.Queue(maxsize=self.server.queue_size)
+                job = self.server.pool.submit(_generate, config, table, out, cancelled, cache)
+                while True:
+                    try:
+                        item = out.get(timeout=POLL_SECONDS)
+                    except queue.Empty:
+                        # nothing to write, so a disconnect would go unnoticed: check for it
+                        if self._client_gone():
+                            raise ConnectionResetError("client disconnected")
+                        continue
+                    if item is _DONE:
+                        break
+                    if isinstance(item, Exception):
+                        raise item
+                    encoder.write(pa.Table.from_pandas(item, preserve_index=False))
+            encoder.close()
+            sink.finish()
+        except (BrokenPipeError, ConnectionResetError):
+            cancelled.set()   # client went away: stop generating
+            if job is not None:
+                job.cancel()
+            self.close_connection = True
+        except Exception as e:
+            cancelled.set()
+            self.log_error("generation failed: %s", e)
+            self.close_connection = True   # no final chunk: the client sees a truncated body
+
+    def do_GET(self):
+        if self.path == "/health":
+            body = b'{"status": "ok"}'
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        else:
+            self._error(404, f"unknown path {self.path}")
+
+
+class GenerationServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, workers=4, cache=None, queue_size=2):
+        super().__init__(address, GenerationHandler)
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="generate")
+        self.cache = cache
+        self.queue_size = queue_size
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Local HTTP service streaming generated school records.")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--workers", type=int, default=4, help="concurrent generations")
+    ap.add_argument("--cache-dir", default=None, help="OutputCache directory (default: ~/.cache/school_records)")
+    ap.add_argument("--no-cache", action="store_true")
+    profiling.add_argument(ap)
+    args = ap.parse_args()
+
+    cache = None if args.no_cache else (OutputCache(args.cache_dir) if args.cache_dir else OutputCache())
+    server = GenerationServer((args.host, args.port), workers=args.workers, cache=cache)
+    print(f"🌐 Serving on http://{args.host}:{args.port}/generate ({args.workers} workers)")
+    with profiling.session(profiling.profile_dir(args.profile)):
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+sweep.py
+
+Batch runner for parameter sweeps (student counts × start years × subject
+sets × seeds). Scenarios run on a pool of warm worker processes: imports,
+Faker and the name pools are set up once per worker and reused for every
+scenario it runs. Each scenario's tables go into an OutputCache-layout
+store under --out-dir (one directory per config hash), so a re-run skips
+everything already produced. sweep_manifest.json records what was
+produced, and how long it took. With --profile DIR, each scenario's
+profiling reports go to DIR/<first 12 characters of its config hash>.
+
+Grid spec (JSON); every key takes a single value or a list of values:
+
+    {"students":   [1000, 10000],
+     "start_year": [2005, 2010],
+     "subjects":   [["Math", "Science", "English", "Art", "Music", "PE"]],
+     "seed":       [1, 2, 3],
+     "end_year":   2024,
+     "name_pool_seed": 0,
+     "rollups":    true,
+     "snapshots":  false}
+"""
+import argparse
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+import profiling
+from engine.backend import BACKENDS
+from output_cache import OutputCache, config_key
+
+_GRID_KEYS = ["students", "start_year", "subjects", "seed", "end_year", "name_pool_seed", "rollups",
+              "snapshots"]
+_MANIFEST  = "sweep_manifest.json"
+
+# per-worker state, filled by _warm()
+_STORE = None
+_PROFILE_ROOT = None
+_BACKEND = "pandas"
+_CONTEXTS = {}   # name_pool_seed -> warm engine.GeneratorContext
+
+
+def expand_grid(spec: dict) -> list[dict]:
+    """Cartesian product of the grid spec, as generate_all() configs."""
+    unknown = set(spec) - set(_GRID_KEYS)
+    if unknown:
+        raise ValueError(f"Unknown grid keys: {sorted(unknown)}")
+    spec = {"end_year": datetime.now().year, "name_pool_seed": 0, **spec}
+    axes = {}
+    for k in (k for k in _GRID_KEYS if k in spec):
+        v = spec[k]
+        # a list of subject *lists* is an axis; a flat list of names is one value
+        single = not isinstance(v, list) or (k == "subjects" and not isinstance(v[0], list))
+        axes[k] = [v] if single else v
+    return [dict(zip(axes, combo)) for combo in itertools.product(*axes.values())]
+
+
+def _warm(out_dir: str, profile_root: str = None, backend: str = "pandas"):
+    global _STORE, _PROFILE_ROOT, _BACKEND
+    import generator   # noqa: F401  (pays the pandas/Faker import once per worker)
+    _STORE = OutputCache(out_dir, max_bytes=None)
+    _PROFILE_ROOT = profile_root
+    _BACKEND = backend
+
+
+def _context(name_pool_seed, seed):
+    """Fresh context for `seed`, reusing this worker's warm name pools."""
+    from engine import GeneratorContext
+    if name_pool_seed not in _CONTEXTS:
+        _CONTEXTS[name_pool_seed] = GeneratorContext.create(name_pool_seed=name_pool_seed)
+    return _CONTEXTS[name_pool_seed].reseed(seed)
+
+
+def run_scenario(config: dict) -> dict:
+    """Generate one scenario into the store; returns its manifest record."""
+    from generator import generate_all
+    t0 = time.perf_counter()
+    run_dir = os.path.join(_PROFILE_ROOT, config_key(config)[:12]) if _PROFILE_ROOT else None
+    with profiling.session(run_dir, log=lambda _: None):
+        tables = generate_all(**config, ctx=_context(config["name_pool_seed"], config.get("seed")),
+                              backend=_BACKEND)
+        with profiling.phase("store"):
+            _STORE.put(config, tables)
+    return {"key": config_key(config), "config": config, "status": "generated",
+            "seconds": round(time.perf_counter() - t0, 3),
+            "rows": {nm: len(df) for nm, df in tables.items()}}
+
+
+def _load_manifest(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return {r["key"]: r for r in json.load(f)["scenarios"]}
+
+
+def run_sweep(spec: dict, out_dir: str, workers: int = None, log=print,
+              profile_root: str = None, backend: str = "pandas") -> list[dict]:
+    """
+    Run every scenario of `spec` not yet in `out_dir`; returns the manifest
+    records. With `profile_root`, every scenario is profiled (profiling.py).
+    `backend` (engine.backend) only changes how the tables are built and
+    stored, not their contents.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    store = OutputCache(out_dir, max_bytes=None)
+    manifest_path = os.path.join(out_dir, _MANIFEST)
+    records = _load_manifest(manifest_path)
+
+    todo = []
+    for cfg in expand_grid(spec):
+        key = config_key(cfg)
+        if cfg in store:
+            records.setdefault(key, {"key": key, "config": cfg, "status": "generated"})
+            log(f"⏭️  {key[:12]} already in store")
+        else:
+            todo.append(cfg)
+
+    t0 = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_warm,
+                             initargs=(out_dir, profile_root, backend)) as pool:
+        futures = {pool.submit(run_scenario, cfg): cfg for cfg in todo}
+        for fut in as_completed(futures):
+            cfg = futures[fut]
+            try:
+                rec = fut.result()
+                log(f"✅ {rec['key'][:12]} {rec['seconds']:.2f}s {rec['rows']}")
+            except Exception as e:
+                rec = {"key": config_key(cfg), "config": cfg, "status": "failed", "error": str(e)}
+                log(f"❌ {rec['key'][:12]} {e}")
+            records[rec["key"]] = rec
+
+    with open(manifest_path, "w") as f:
+        json.dump({"updated": datetime.now().isoformat(timespec="seconds"),
+                   "wall_seconds": round(time.perf_counter() - t0, 3),
+                   "scenarios": list(records.values())}, f, indent=2)
+    return list(records.values())
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Parameter sweep runner for the school records generator")
+    ap.add_argument("grid", help="grid spec JSON file")
+    ap.add_argument("--out-dir", default="sweep_output")
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--backend", choices=BACKENDS, default="pandas",
+                    help="build tables as pandas, Arrow or polars frames (same output)")
+    profiling.add_argument(ap)
+    args = ap.parse_args()
+
+    with open(args.grid) as f:
+        spec = json.load(f)
+    records = run_sweep(spec, args.out_dir, args.workers,
+                        profile_root=profiling.profile_dir(args.profile), backend=args.backend)
+    failed = sum(r["status"] == "failed" for r in records)
+    print(f"📦 {len(records) - failed} scenarios in {args.out_dir}, {failed} failed")
+
+
+if __name__ == "__main__":
+    main()
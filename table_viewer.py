@@ -0,0 +1,237 @@
+# table_viewer.py
+"""
+Virtualized table viewer for the GUI.
+
+A VirtualTable is a ttk.Treeview holding only the rows that fit on
+screen: scrolling rewrites the values of those few items from a row
+source instead of inserting the whole table into Tk. A source has
+`columns`, `len()` and `rows(start, stop)`:
+
+  • DataFrameSource – an in-memory DataFrame (the preview)
+  • CsvSource       – a CSV on disk, via a sparse index of line offsets
+                      built in one pass over the file
+  • ParquetSource   – a Parquet file on disk, read one row group at a time
+
+so a full dataset written by the generators can be paged through from
+disk at the cost of the visible page.
+"""
+import csv
+import io
+import os
+import tkinter as tk
+from collections import OrderedDict
+from tkinter import ttk
+
+import numpy as np
+import pandas as pd
+
+PAGE_ROWS = 25
+_CELL_CHARS = 40
+
+
+# —————— Row sources ——————
+
+class DataFrameSource:
+    def __init__(self, df):
+        self.df = df
+        self.columns = [str(c) for c in df.columns]
+
+    def __len__(self):
+        return len(self.df)
+
+    def rows(self, start, stop):
+        return list(self.df.iloc[start:stop].itertuples(index=False, name=None))
+
+
+class CsvSource:
+    """
+    Rows of an uncompressed CSV by position. Opening scans the file once
+    and keeps the byte offset of every `stride`-th row (8 bytes per
+    `stride` rows); a page seeks to the nearest indexed row and reads
+    forward. Assumes no quoted newlines, which the generators never write.
+    """
+
+    def __init__(self, path, stride=1024, block=1 << 24):
+        self.path, self.stride = path, stride
+        with open(path, newline="", encoding="utf-8") as f:
+            self.columns = next(csv.reader(f))
+        with open(path, "rb") as f:
+            pos = len(f.readline())          # data starts after the header
+            offsets, seen, last = [pos], 0, b"\n"
+            while chunk := f.read(block):
+                nl = np.flatnonzero(np.frombuffer(chunk, dtype=np.uint8) == 10)
+                # the g-th data newline starts row g + 1; keep rows that are multiples of stride
+                offsets.extend((pos + nl[(stride - 1 - seen) % stride::stride] + 1).tolist())
+                seen += len(nl)
+                pos += len(chunk)
+                last = chunk[-1:]
+        self._len = seen + (last != b"\n")   # a last row without a trailing newline
+        self.offsets = np.asarray([o for o in offsets if o < pos], dtype=np.int64)
+
+    def __len__(self):
+        return self._len
+
+    def rows(self, start, stop):
+        stop = min(stop, self._len)
+        if start >= stop:
+            return []
+        k = start // self.stride
+        with open(self.path, "rb") as f:
+            f.seek(int(self.offsets[k]))
+            for _ in range(start - k * self.stride):
+                f.readline()
+            lines = [f.readline().decode("utf-8") for _ in range(stop - start)]
+        return [tuple(r) for r in csv.reader(io.StringIO("".join(lines)))]
+
+
+class ParquetSource:
+    """Rows of a Parquet file by position; the last few row groups read are kept."""
+
+    def __init__(self, path, cached_groups=2):
+        import pyarrow.parquet as pq
+        self.file = pq.ParquetFile(path)
+        self.columns = self.file.schema_arrow.names
+        sizes = [self.file.metadata.row_group(i).num_rows for i in range(self.file.num_row_groups)]
+        self.starts = np.concatenate([[0], np.cumsum(sizes)]).astype(np.int64)
+        self._cache = OrderedDict()
+        self._cached_groups = cached_groups
+
+    def __len__(self):
+        return int(self.starts[-1])
+
+    def _group(self, i):
+        if i not in self._cache:
+            self._cache[i] = self.file.read_row_group(i)
+            if len(self._cache) > self._cached_groups:
+                self._cache.popitem(last=False)
+        self._cache.move_to_end(i)
+        return self._cache[i]
+
+    def rows(self, start, stop):
+        stop = min(stop, len(self))
+        out = []
+        while start < stop:
+            g = int(np.searchsorted(self.starts, start, side="right")) - 1
+            lo = start - int(self.starts[g])
+            take = min(stop, int(self.starts[g + 1])) - start
+            part = self._group(g).slice(lo, take)
+            out.extend(zip(*(col.to_pylist() for col in part.columns)))
+            start += take
+        return out
+
+
+def open_source(path):
+    """Source for a .csv or .parquet file; None for other (e.g. compressed) files."""
+    if path.endswith(".parquet"):
+        return ParquetSource(path)
+    if path.endswith(".csv"):
+        return CsvSource(path)
+    return None
+
+
+def directory_sources(path) -> dict:
+    """{table name: source} for every CSV / Parquet table in a directory."""
+    sources = {}
+    for fn in sorted(os.listdir(path)):
+        src = open_source(os.path.join(path, fn))
+        if src is not None:
+            sources[fn.rsplit(".", 1)[0]] = src
+    return sources
+
+
+# —————— Widgets ——————
+
+def _cell(v) -> str:
+    if v is None or (not isinstance(v, str) and pd.isna(v)):
+        return ""
+    s = str(v)
+    return s if len(s) <= _CELL_CHARS else s[:_CELL_CHARS - 1] + "…"
+
+
+class VirtualTable(ttk.Frame):
+    """Treeview over a row source, holding only `page_rows` items."""
+
+    def __init__(self, master, source, page_rows=PAGE_ROWS):
+        super().__init__(master)
+        self.source, self.page_rows, self.top = source, page_rows, 0
+        cols = list(source.columns)
+        self.tree = ttk.Treeview(self, columns=cols, show="headings", height=page_rows,
+                                 selectmode="browse")
+        first = source.rows(0, page_rows)
+        for i, c in enumerate(cols):
+            longest = max([len(c)] + [len(_cell(r[i])) for r in first])
+            self.tree.heading(c, text=c)
+            self.tree.column(c, width=min(240, max(60, 8 * longest)), stretch=False)
+        self.items = [self.tree.insert("", "end", values=()) for _ in range(page_rows)]
+
+        self.vbar = ttk.Scrollbar(self, orient="vertical", command=self._on_scrollbar)
+        hbar = ttk.Scrollbar(self, orient="horizontal", command=self.tree.xview)
+        self.tree.configure(xscrollcommand=hbar.set)
+        self.tree.grid(row=0, column=0, sticky="nsew")
+        self.vbar.grid(row=0, column=1, sticky="ns")
+        hbar.grid(row=1, column=0, sticky="ew")
+        self.position = ttk.Label(self, text="")
+        self.position.grid(row=2, column=0, sticky="w")
+        self.columnconfigure(0, weight=1)
+        self.rowconfigure(0, weight=1)
+
+        for w in (self.tree, self.vbar):
+            w.bind("<MouseWheel>", lambda e: self.scroll(-1 if e.delta > 0 else 1, "units"))
+            w.bind("<Button-4>", lambda e: self.scroll(-1, "units"))
+            w.bind("<Button-5>", lambda e: self.scroll(1, "units"))
+        self.tree.bind("<Prior>", lambda e: self.scroll(-1, "pages"))
+        self.tree.bind("<Next>", lambda e: self.scroll(1, "pages"))
+        self.tree.bind("<Home>", lambda e: self.show(0))
+        self.tree.bind("<End>", lambda e: self.show(len(self.source)))
+        self.show(0, first)
+
+    def _on_scrollbar(self, action, amount, unit=None):
+        if action == "moveto":
+            self.show(int(float(amount) * len(self.source)))
+        else:
+            self.scroll(int(amount), unit)
+
+    def scroll(self, amount, unit):
+        step = 3 if unit == "units" else self.page_rows
+        self.show(self.top + amount * step)
+        return "break"
+
+    def show(self, top, rows=None):
+        """Fill the visible items with rows top..top+page_rows."""
+        n = len(self.source)
+        self.top = max(0, min(top, n - self.page_rows))
+        rows = rows if rows is not None else self.source.rows(self.top, self.top + self.page_rows)
+        for item, i in zip(self.items, range(self.page_rows)):
+            self.tree.item(item, values=[_cell(v) for v in rows[i]] if i < len(rows) else ())
+        if n:
+            self.vbar.set(self.top / n, min(1.0, (self.top + self.page_rows) / n))
+            last = min(n, self.top + self.page_rows)
+            self.position.config(text=f"rows {self.top + 1:,}–{last:,} of {n:,}")
+        else:
+            self.vbar.set(0, 1)
+            self.position.config(text="no rows")
+        return "break"
+
+
+class TableViewer(tk.Toplevel):
+    """One tab per table; tabs are built when first selected."""
+
+    def __init__(self, master, sources: dict, title="Tables"):
+        super().__init__(master)
+        self.title(title)
+        self.sources = sources
+        self.notebook = ttk.Notebook(self)
+        self.notebook.pack(fill="both", expand=True, padx=8, pady=8)
+        self.frames = {}
+        for name in sources:
+            frame = ttk.Frame(self.notebook)
+            self.notebook.add(frame, text=name)
+            self.frames[str(frame)] = (name, frame)
+        self.notebook.bind("<<NotebookTabChanged>>", self._on_tab)
+        if sources:
+            self._on_tab()
+
+    def _on_tab(self, _event=None):
+        name, frame = self.frames[self.notebook.select()]
+        if not frame.winfo_children():
+            VirtualTable(frame, self.sources[name]).pack(fill="both", expand=True)
@@ -0,0 +1,26 @@
+import os
+import sys
+
+import pytest
+
+# the generators are top-level scripts, not a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SUBJECTS = ["Math", "English", "Science", "History", "Geography", "Art", "Music", "Biology",
+            "Chemistry", "Physics"]
+
+
+@pytest.fixture(scope="session")
+def subjects():
+    """The ten subjects every generator test school teaches."""
+    return list(SUBJECTS)
+
+
+@pytest.fixture
+def make_inputs(subjects):
+    """generate_inputs for a small school: (grade_df, students_df, rng)."""
+    from generator import generate_inputs
+
+    def make(seed, students=60, start_year=2015):
+        return generate_inputs(students, start_year, subjects, seed)
+    return make
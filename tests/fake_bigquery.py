@@ -0,0 +1,120 @@
+"""In-memory stand-in for the parts of bigquery.Client the loaders use."""
+from types import SimpleNamespace
+
+import pandas as pd
+from google.api_core import exceptions
+
+
+def _layout(obj):
+    part = obj.range_partitioning
+    part = part and (part.field, part.range_.start, part.range_.end, part.range_.interval)
+    return part or None, list(obj.clustering_fields or [])
+
+
+class FakeJob:
+    """A DONE job, or a RUNNING one that applies its load (or fails) once it finishes."""
+
+    def __init__(self, error=None, running=None):
+        self.error, self._running = error, running
+        self.state = "RUNNING" if running else "DONE"
+        self.error_result = None if error is None else {"reason": str(error)}
+
+    def finish(self):
+        if self.state == "RUNNING":
+            self.state = "DONE"
+            if self.error is None:
+                self._running()
+
+    def result(self):
+        self.finish()
+        if self.error is not None:
+            raise self.error
+        return self
+
+
+class FakeClient:
+    """
+    Tables are SimpleNamespaces holding their layout and a DataFrame.
+    `fail` maps a load target (or "copy") to a list of errors raised by the
+    next jobs on it, one per job; an entry ("applied", error) loads the
+    data first and then reports the error, like a job that timed out
+    client-side but succeeded, and ("running", error[, job_error]) leaves
+    the job RUNNING server-side: it loads (or fails with `job_error`) when
+    waited for, or at the latest before the next copy job.
+    """
+
+    def __init__(self):
+        self.tables, self.jobs, self.fail, self.loads = {}, {}, {}, []
+        self.datasets = set()
+
+    # datasets
+    def get_dataset(self, ref):
+        if ref not in self.datasets:
+            raise exceptions.NotFound(ref)
+
+    def create_dataset(self, ref):
+        self.datasets.add(ref)
+
+    # tables
+    def get_table(self, ref):
+        if ref not in self.tables:
+            raise exceptions.NotFound(ref)
+        return self.tables[ref]
+
+    def create_table(self, table, exists_ok=False):
+        ref = f"{table.project}.{table.dataset_id}.{table.table_id}"
+        if ref in self.tables and not exists_ok:
+            raise exceptions.Conflict(ref)
+        self.tables.setdefault(ref, self._new(table, pd.DataFrame()))
+
+    def delete_table(self, ref, not_found_ok=False):
+        if ref not in self.tables and not not_found_ok:
+            raise exceptions.NotFound(ref)
+        self.tables.pop(ref, None)
+
+    @staticmethod
+    def _new(layout, data):
+        return SimpleNamespace(range_partitioning=layout.range_partitioning,
+                               clustering_fields=layout.clustering_fields,
+                               time_partitioning=None, data=data)
+
+    def _write(self, ref, df, cfg, disposition):
+        table = self.tables.get(ref)
+        if table is None:
+            self.tables[ref] = self._new(cfg, df.reset_index(drop=True))
+            return
+        if _layout(table) != _layout(cfg) and disposition == "WRITE_TRUNCATE":
+            raise exceptions.BadRequest(f"Cannot replace a table with a different partitioning spec: {ref}")
+        table.data = (df if disposition == "WRITE_TRUNCATE"
+                      else pd.concat([table.data, df])).reset_index(drop=True)
+
+    def _run(self, target, job_id, apply):
+        plan = self.fail.get(target) or []
+        error = plan.pop(0) if plan else None
+        if isinstance(error, tuple) and error[0] == "running":
+            self.jobs[job_id] = FakeJob(error[2] if len(error) > 2 else None, running=apply)
+            return FakeJob(error[1])
+        applied = error is None or isinstance(error, tuple)
+        if applied:
+            apply()
+            error = error and error[1]
+        self.jobs[job_id] = FakeJob(None if applied else error)
+        return FakeJob(error)
+
+    # jobs
+    def load_table_from_dataframe(self, df, ref, job_config=None, job_id=None):
+        job_id = job_id or f"load_{len(self.jobs)}"
+        self.loads.append((ref, len(df), job_id))
+        return self._run(ref, job_id, lambda: self._write(ref, df, job_config, job_config.write_disposition))
+
+    def copy_table(self, src, dst, job_config=None):
+        for job in self.jobs.values():
+            job.finish()                  # the server finishes what was still running
+        source = self.tables[src]
+        return self._run("copy", f"copy_{len(self.jobs)}",
+                         lambda: self._write(dst, source.data, source, job_config.write_disposition))
+
+    def get_job(self, job_id):
+        if job_id not in self.jobs:
+            raise exceptions.NotFound(job_id)
+        return self.jobs[job_id]
@@ -0,0 +1,43 @@
+import os
+
+import numpy as np
+import pyarrow.parquet as pq
+
+from engine.attendance import AttendanceWriter, school_days
+
+
+def test_school_days_follow_the_academic_year():
+    days = school_days(2015)
+    assert days[0] >= np.datetime64("2015-09-01") and days[-1] <= np.datetime64("2016-06-30")
+    months = set(days.astype("datetime64[M]").astype(int) % 12 + 1)
+    assert months == {9, 10, 11, 12, 1, 2, 3, 4, 5, 6}
+    assert np.datetime64("2015-12-24") not in days and np.datetime64("2016-01-01") not in days
+
+
+def _write(out_dir, years, seed=1):
+    with AttendanceWriter(out_dir, seed=seed, workers=2) as w:
+        for year in years:
+            w.add_year(year, np.arange(5), np.full(5, 70.0))
+    return w.rows
+
+
+def test_partitions_are_keyed_on_academic_year(tmp_path):
+    rows = _write(str(tmp_path), [2015])
+    assert "year=2015/month=01" in rows and "year=2016/month=01" not in rows
+    jan = pq.read_table(tmp_path / "year=2015" / "month=01" / "part-0.parquet")
+    assert {d.year for d in jan.column("date").to_pylist()} == {2016}
+
+
+def test_rerun_replaces_only_its_own_years(tmp_path):
+    _write(str(tmp_path), [2015, 2016])
+    (tmp_path / "notes.txt").write_text("keep")
+    stale = tmp_path / "year=2016" / "month=13"        # a file no run would write again
+    stale.mkdir()
+    rows = _write(str(tmp_path), [2016], seed=2)
+
+    assert (tmp_path / "year=2015" / "month=09" / "part-0.parquet").exists()
+    assert (tmp_path / "notes.txt").exists()
+    assert not stale.exists()
+    total = sum(pq.read_table(tmp_path / "year=2016" / month / "part-0.parquet").num_rows
+                for month in os.listdir(tmp_path / "year=2016"))
+    assert total == sum(rows.values()) == 5 * len(school_days(2016))
@@ -0,0 +1,114 @@
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+from google.api_core import exceptions
+
+import bigquery_loader
+from bq_schema import load_job_config, replace_if_layout_differs
+from fake_bigquery import FakeClient
+
+REF = "proj.ds.academic"
+
+
+def _academic(n):
+    return pd.DataFrame({"academic_year": [2015 + i % 5 for i in range(n)],
+                         "enrollment_id": range(n), "grade": [1 + i % 10 for i in range(n)],
+                         "final_pct": [50.0 + i % 50 for i in range(n)]})
+
+
+def _unpartitioned():
+    return SimpleNamespace(range_partitioning=None, clustering_fields=None,
+                           time_partitioning=None, data=pd.DataFrame())
+
+
+def test_same_layout_is_kept():
+    client, df = FakeClient(), _academic(10)
+    cfg = load_job_config("academic", df)
+    client.tables[REF] = client._new(cfg, df)
+    assert not replace_if_layout_differs(client, REF, cfg)
+    assert not replace_if_layout_differs(client, "proj.ds.missing", cfg)
+    assert REF in client.tables
+
+
+@pytest.mark.parametrize("chunk_rows", [1_000, 7], ids=["single", "chunked"])
+def test_unpartitioned_table_is_recreated(tmp_path, chunk_rows):
+    client, df = FakeClient(), _academic(20)
+    client.tables[REF] = _unpartitioned()      # from an upload before the layouts existed
+    uploads = {"grade_df": df.iloc[:0], "students_df": pd.DataFrame(
+        {"enrollment_id": [1], "last_pct": [0.0], "fail_count": [0], "terminated": [False]}),
+        "academic_df": df, "grads_df": df.iloc[:0], "term_df": df.iloc[:0]}
+    bigquery_loader.upload_all_to_bq(**uploads, project_id="proj", dataset_id="ds", key=None,
+                                     client=client, chunk_rows=chunk_rows, backoff=0,
+                                     manifest_dir=str(tmp_path))
+    table = client.tables[REF]
+    assert table.range_partitioning.field == "academic_year"
+    assert table.clustering_fields == ["enrollment_id", "grade"]
+    assert len(table.data) == 20
+
+
+# —————— chunked_load: retry and resume ——————
+
+def _staging(df, chunk_rows):
+    return f"{REF}__staging_{bigquery_loader._fingerprint(df, chunk_rows)}"
+
+
+def _load(client, df, tmp_path, chunk_rows=10, **kwargs):
+    bigquery_loader.chunked_load(client, df, REF, "academic", chunk_rows=chunk_rows, max_workers=1,
+                                 backoff=0, manifest_dir=str(tmp_path), **kwargs)
+
+
+def _loaded(client):
+    return client.tables[REF].data.sort_values("enrollment_id", ignore_index=True)
+
+
+def test_transient_errors_are_retried(tmp_path):
+    client, df = FakeClient(), _academic(35)
+    client.fail[_staging(df, 10)] = [exceptions.ServiceUnavailable("503"),
+                                     ("applied", exceptions.ServiceUnavailable("timeout"))]
+    _load(client, df, tmp_path)
+    # the second failure had in fact been applied: its chunk is not loaded twice
+    pd.testing.assert_frame_equal(_loaded(client), df)
+    assert len(client.loads) == 5
+    assert _staging(df, 10) not in client.tables and not list(tmp_path.iterdir())
+
+
+@pytest.mark.parametrize("job_error", [None, exceptions.BadRequest("bad chunk")],
+                         ids=["finishes", "fails"])
+def test_timed_out_job_still_running_is_waited_for(tmp_path, job_error):
+    client, df = FakeClient(), _academic(35)
+    running = ("running", TimeoutError("read timed out")) + ((job_error,) if job_error else ())
+    client.fail[_staging(df, 10)] = [running]
+    _load(client, df, tmp_path)
+    # resubmitted only when the running job failed; never loaded twice
+    assert len(client.loads) == (5 if job_error else 4)
+    pd.testing.assert_frame_equal(_loaded(client), df)
+
+
+def test_failed_chunks_resume_from_the_manifest(tmp_path):
+    client, df = FakeClient(), _academic(35)
+    client.fail[_staging(df, 10)] = [exceptions.ServiceUnavailable("503")] * 2
+    with pytest.raises(RuntimeError, match="1/4 chunks"):
+        _load(client, df, tmp_path, retries=1)
+    assert REF not in client.tables and len(list(tmp_path.iterdir())) == 1
+
+    client.loads.clear()
+    _load(client, df, tmp_path, retries=1)
+    assert [rows for _, rows, _ in client.loads] == [10]     # only the failed chunk again
+    pd.testing.assert_frame_equal(_loaded(client), df)
+
+
+def test_changed_data_does_not_resume(tmp_path):
+    client, df = FakeClient(), _academic(3000)
+    client.fail[_staging(df, 1000)] = [exceptions.ServiceUnavailable("503")] * 2
+    with pytest.raises(RuntimeError):
+        _load(client, df, tmp_path, chunk_rows=1000, retries=1)
+
+    changed = df.copy()
+    changed.loc[1717, "final_pct"] = 99.5                    # one value, in a chunk already loaded
+    client.loads.clear()
+    _load(client, changed, tmp_path, chunk_rows=1000, retries=1)
+    assert len(client.loads) == 3
+    pd.testing.assert_frame_equal(_loaded(client), changed)
+    # the first run's staging table went with its manifest
+    assert list(client.tables) == [REF]
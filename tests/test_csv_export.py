@@ -0,0 +1,47 @@
+import gzip
+import os
+import stat
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+import csv_export
+
+TABLE = pd.DataFrame({
+    "student_id": [1, 2, 3, 4],
+    "name": ["Ann", "Bo", "Cy", "Di"],
+    "final_pct": [81.25, 70.0, np.nan, 1e-05],
+    "passed": [True, False, True, True],
+    "sem2": pd.array([55, None, 60, 61], dtype="Int64"),
+})
+
+
+def _read(path):
+    return gzip.open(path).read() if path.endswith(".gz") else open(path, "rb").read()
+
+
+@pytest.mark.parametrize("compression", [None, "gzip"])
+@pytest.mark.parametrize("table", [TABLE, pa.Table.from_pandas(TABLE, preserve_index=False)],
+                         ids=["pandas", "arrow"])
+def test_bytes_match_pandas(tmp_path, table, compression):
+    paths = csv_export.write_tables({"t": table}, str(tmp_path), compression)
+    assert _read(paths["t"]) == TABLE.to_csv(index=False).encode()
+
+
+def test_values_that_need_quotes(tmp_path):
+    df = pd.DataFrame({"name": ['Smith, Jo', 'say "hi"', "line\nbreak", ""], "n": [1.0, 2.5, 3.0, 4.0]})
+    path = csv_export.write_csv(df, str(tmp_path / "q.csv"))
+    assert _read(path) == df.to_csv(index=False).encode()
+    assert pd.read_csv(path, keep_default_na=False).equals(df)
+
+
+def test_file_mode_follows_umask(tmp_path):
+    # not mkstemp's 0600: the mode a plain open() gives
+    path = csv_export.write_csv(TABLE, str(tmp_path / "t.csv"))
+    with open(tmp_path / "plain.csv", "w"):
+        pass
+    mode = lambda p: stat.S_IMODE(os.stat(p).st_mode)
+    assert mode(path) == mode(tmp_path / "plain.csv")
+    assert not [p for p in os.listdir(tmp_path) if p.startswith(".tmp-")]
@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from engine import annual_rules, iter_simulation, simulate, to_pandas
+from engine.backend import ArrowBackend
+from generator import generate_all
+
+
+@pytest.fixture
+def inputs(make_inputs):
+    grade_df, students_df, _ = make_inputs(3)
+    return students_df, grade_df
+
+
+def _run(inputs, how, **kwargs):
+    students_df, grade_df = inputs
+    rng = np.random.default_rng(3)
+    if how == "iter":
+        return list(iter_simulation(students_df, grade_df, 2015, 2018, annual_rules(), rng=rng, **kwargs))
+    seen = []
+    simulate(students_df, grade_df, 2015, 2018, annual_rules(), rng=rng, on_year=seen.append, **kwargs)
+    return seen
+
+
+def test_snapshots_default_is_the_same(inputs):
+    for how in ("iter", "simulate"):
+        assert all(b.student_state is None for b in _run(inputs, how))
+        assert all(len(b.student_state) for b in _run(inputs, how, snapshots=True))
+
+
+def test_on_year_gets_finished_batches(inputs, monkeypatch):
+    # stands in for polars, whose finish() is the only one that converts
+    monkeypatch.setattr(ArrowBackend, "finish", lambda self, table: table.to_pandas())
+    iterated = _run(inputs, "iter", backend="arrow", snapshots=True)
+    called = _run(inputs, "simulate", backend="arrow", snapshots=True)
+    assert len(iterated) == len(called) == 4
+    for a, b in zip(iterated, called):
+        for field in ("academic", "graduates", "terminated", "student_state"):
+            assert isinstance(getattr(b, field), pd.DataFrame)
+            pd.testing.assert_frame_equal(getattr(a, field), getattr(b, field))
+
+
+def test_backends_give_the_same_frames(subjects):
+    kwargs = dict(end_year=2017, seed=4, rollups=True, snapshots=True)
+    expected = generate_all(300, 2013, subjects, **kwargs)
+    tables = generate_all(300, 2013, subjects, backend="arrow", **kwargs)
+    assert tables.keys() == expected.keys()
+    for name, df in expected.items():
+        pd.testing.assert_frame_equal(to_pandas(tables[name]), df, obj=name)
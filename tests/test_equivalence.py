@@ -0,0 +1,56 @@
+import pandas as pd
+import pytest
+
+import equivalence as eq
+
+START, END, SEED = 2012, 2016, 7
+
+
+def test_rule_checks_pass():
+    checks = eq.rule_checks(SEED)
+    assert checks and [c for c in checks if not c.ok] == []
+
+
+@pytest.fixture(scope="module")
+def annual():
+    grade_df, students_df = eq.annual_inputs(120, START, SEED)
+    return eq.run_annual(grade_df, students_df, START, END, SEED, scripted=True)
+
+
+@pytest.fixture(scope="module")
+def semester():
+    # 320 students: 10 per class over 8 grades × 4 classes
+    grade_df, students_df, pools = eq.semester_inputs(320, START, SEED)
+    return eq.run_semester(grade_df, students_df, pools, START, END, SEED, scripted=True)
+
+
+@pytest.mark.parametrize("mode", ["annual", "semester"])
+def test_scripted_runs_are_identical(mode, request):
+    ref, new = request.getfixturevalue(mode)
+    assert len(new.academic)
+    checks = eq.scripted_checks(mode, ref, new)
+    assert [c for c in checks if not c.ok] == []
+
+
+def test_scripted_checks_catch_a_difference(annual):
+    ref, new = annual
+    academic = new.academic.copy()
+    academic.loc[3, "final_percentage"] += 0.5
+    checks = eq.scripted_checks("annual", ref, new._replace(academic=academic))
+    failed = [c for c in checks if not c.ok]
+    assert [c.name for c in failed] == ["academic"] and "row 3" in failed[0].detail
+
+
+def test_distribution_checks_pass_on_production_draws():
+    grade_df, students_df = eq.annual_inputs(200, START, SEED)
+    ref, new = eq.run_annual(grade_df, students_df, START, END, SEED, scripted=False)
+    checks = eq.distribution_checks("annual", ref, new, END)
+    assert checks and [c for c in checks if not c.ok] == []
+
+
+def test_frame_diff():
+    a = pd.DataFrame({"id": [1, 2], "pct": [50.0, None]})
+    assert eq.frame_diff(a, a.copy()) is None
+    assert eq.frame_diff(a, a.iloc[:1]) == "2 rows != 1 rows"
+    assert "columns" in eq.frame_diff(a, a[["pct", "id"]])
+    assert eq.frame_diff(a, a.assign(pct=[50.0, 1.0])).startswith("pct row 1")
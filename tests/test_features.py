@@ -0,0 +1,22 @@
+import numpy as np
+import pyarrow as pa
+
+from engine import annual_rules, simulate
+
+
+def test_arrow_file_is_written_in_batches_and_matches_npy(tmp_path, make_inputs):
+    grade_df, students_df, rng = make_inputs(4)
+    result = simulate(students_df, grade_df, 2015, 2018, annual_rules(), rng=rng, features=True)
+    fm, ids = result.features, result.students["enrollment_id"].to_numpy()
+    fm.save(str(tmp_path / "npy"), ids, "npy")
+    paths = fm.save(str(tmp_path / "arrow"), ids, "arrow", batch_rows=25)
+
+    reader = pa.ipc.open_file(pa.memory_map(paths["features"]))
+    assert reader.num_record_batches == -(-len(ids) // 25)
+    table = reader.read_all()
+    X = np.load(tmp_path / "npy" / "features.npy", mmap_mode="r")
+    assert table.column_names[2:] == fm.columns
+    np.testing.assert_array_equal(table.column("enrollment_id").to_numpy(), ids)
+    np.testing.assert_array_equal(table.column("label").to_numpy(),
+                                  np.load(tmp_path / "npy" / "labels.npy"))
+    np.testing.assert_array_equal(np.column_stack([table.column(c).to_numpy() for c in fm.columns]), X)
@@ -0,0 +1,43 @@
+import os
+import threading
+
+import pandas as pd
+
+from output_cache import OutputCache
+
+CONFIG = {"students": 10, "start_year": 2020, "seed": 1}
+TABLES = {"academic": pd.DataFrame({"enrollment_id": range(1000), "final_percentage": 55.5})}
+
+
+def test_concurrent_puts_of_one_key(tmp_path):
+    cache = OutputCache(str(tmp_path), max_bytes=None)
+    start, errors, misses = threading.Barrier(8), [], []
+
+    def put():
+        start.wait()
+        try:
+            for _ in range(10):
+                cache.put(CONFIG, TABLES)
+                if cache.get(CONFIG) is None:
+                    misses.append(1)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=put) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == [] and misses == []
+    pd.testing.assert_frame_equal(cache.get(CONFIG)["academic"], TABLES["academic"])
+    assert [p for p in os.listdir(tmp_path) if p.startswith(".")] == []
+
+
+def test_incomplete_entry_is_replaced(tmp_path):
+    cache = OutputCache(str(tmp_path), max_bytes=None)
+    cache.put(CONFIG, TABLES)
+    entry = os.path.dirname(cache.table_path(CONFIG, "academic"))
+    os.remove(os.path.join(entry, "tables.json"))             # e.g. an interrupted eviction
+    assert cache.get(CONFIG) is None
+    cache.put(CONFIG, TABLES)
+    pd.testing.assert_frame_equal(cache.get(CONFIG)["academic"], TABLES["academic"])
@@ -0,0 +1,84 @@
+import queue
+import threading
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+import pipeline
+from engine import annual_rules, simulate
+
+
+@pytest.fixture
+def args(subjects):
+    return dict(students=60, start_year=2015, subjects=subjects, end_year=2019, seed=11)
+
+
+class MemorySink:
+    def __init__(self, gate=None, fail_on=None):
+        self.loads, self.gate, self.fail_on = [], gate, fail_on
+        self.entered = threading.Event()
+
+    def load(self, table, df, append):
+        self.entered.set()
+        if self.gate is not None:
+            self.gate.wait()
+        if table == self.fail_on:
+            raise RuntimeError(f"cannot load {table}")
+        self.loads.append((table, df, append))
+
+    def close(self):
+        pass
+
+    def table(self, name):
+        return pd.concat([df for t, df, _ in self.loads if t == name], ignore_index=True)
+
+
+def test_streamed_tables_match_simulate(args, make_inputs):
+    sink = MemorySink()
+    stats = pipeline.generate_and_upload(sink=sink, log=lambda *_: None, **args)
+
+    grade_df, students_df, rng = make_inputs(11)
+    result = simulate(students_df, grade_df, 2015, 2019, annual_rules(), rng=rng)
+    for name in ("academic", "graduates", "terminated"):
+        pd.testing.assert_frame_equal(sink.table(name), getattr(result, name), check_dtype=False)
+        assert stats["rows"].get(name, 0) == len(getattr(result, name))
+    # first batch of a table truncates, the rest append
+    academic = [append for t, _, append in sink.loads if t == "academic"]
+    assert academic == [False] + [True] * (len(academic) - 1)
+
+
+def test_slow_sink_holds_back_the_simulation(args, monkeypatch):
+    gate, stalled, queues = threading.Event(), threading.Event(), []
+    sink = MemorySink(gate)
+
+    class WatchedQueue(queue.Queue):
+        def __init__(self, maxsize):
+            super().__init__(maxsize)
+            queues.append(self)
+
+        def put(self, item):
+            # the loader is stuck in its first load, so a full queue stays full
+            if sink.entered.is_set() and self.full():
+                stalled.set()
+            super().put(item)
+
+    monkeypatch.setattr(pipeline, "queue", SimpleNamespace(Queue=WatchedQueue))
+    years = []
+    t = threading.Thread(target=pipeline.generate_and_upload,
+                         kwargs=dict(sink=sink, queue_size=2, log=years.append, **args), daemon=True)
+    t.start()
+    assert stalled.wait(10)
+    # the loader holds grades; students and the first year fill the queue; the second year waits
+    assert queues[0].qsize() == queues[0].maxsize == 2
+    assert len(years) == 1 and not sink.loads and t.is_alive()
+    gate.set()
+    t.join(10)
+    assert not t.is_alive() and len(years) == 5
+
+
+def test_sink_error_is_raised_without_deadlock(args):
+    sink = MemorySink(fail_on="academic")
+    with pytest.raises(RuntimeError, match="cannot load academic"):
+        pipeline.generate_and_upload(sink=sink, queue_size=1, log=lambda *_: None, **args)
+    assert [t for t, _, _ in sink.loads] == ["grades", "students"]
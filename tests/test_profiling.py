@@ -0,0 +1,31 @@
+import json
+import os
+
+import profiling
+
+
+def _busy(n=5_000):
+    # live allocations make every tracemalloc snapshot and diff take a while
+    kept = [(i, str(i)) for i in range(n)]
+    sum(i * i for i in range(100_000))
+    return kept
+
+
+def test_profiler_work_is_not_sampled(tmp_path):
+    run_dir = str(tmp_path / "run")
+    with profiling.session(run_dir, log=lambda *_: None):
+        for _ in range(3):
+            with profiling.phase("simulate"):
+                kept = _busy()
+            del kept
+    folded = open(os.path.join(run_dir, "simulate.folded"), encoding="utf-8").read().splitlines()
+    assert folded, "no samples taken"
+    assert not [line for line in folded if "(profiling.py:" in line]
+    summary = json.load(open(os.path.join(run_dir, "summary.json")))
+    assert summary["phases"]["simulate"]["calls"] == 3
+
+
+def test_no_session_is_a_no_op():
+    with profiling.phase("anything"):
+        pass
+    assert profiling.profile_dir(None) is None or os.environ.get(profiling.ENV_VAR)
@@ -0,0 +1,172 @@
+import json
+import queue
+import socket
+import threading
+import time
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+import service
+
+CONFIG = {"students": 10, "start_year": 2020, "end_year": 2024, "subjects": ["Math"],
+          "seed": 7, "rollups": False, "snapshots": False}
+
+
+class FakeCache:
+    def __init__(self):
+        self.puts = []
+
+    def put(self, config, tables):
+        time.sleep(0.2)                   # a Parquet write takes a while
+        self.puts.append(config)
+
+
+@pytest.fixture
+def fake_generation(monkeypatch):
+    """generate_all / _stream_table stand-ins: one academic batch per year, or an error after the first."""
+    state = {"fail": False}
+
+    def generate_all(on_year=None, on_inputs=None, ctx=None, **config):
+        frames = []
+        for year in range(config["start_year"], config["end_year"] + 1):
+            df = pd.DataFrame({"academic_year": [year], "enrollment_id": [year]})
+            frames.append(df)
+            on_year(SimpleNamespace(academic=df, student_state=None))
+            if state["fail"]:
+                raise RuntimeError("boom")
+        return {"academic": pd.concat(frames, ignore_index=True)}
+
+    def stream_table(config, table, ctx, put):
+        generate_all(on_year=lambda batch: put(batch.academic), **config)
+
+    monkeypatch.setattr(service, "generate_all", generate_all)
+    monkeypatch.setattr(service, "_stream_table", stream_table)
+    monkeypatch.setattr(service, "_warm_context", lambda seed: SimpleNamespace(reseed=lambda s: None))
+    return state
+
+
+def _start(out, cancelled, cache=None, config=CONFIG):
+    t = threading.Thread(target=service._generate, args=(config, "academic", out, cancelled, cache),
+                         daemon=True)
+    t.start()
+    return t
+
+
+def _wait_full(out):
+    for _ in range(100):
+        if out.full():
+            return
+        time.sleep(0.01)
+    raise AssertionError("worker never filled the queue")
+
+
+def test_batches_are_streamed_then_done(fake_generation):
+    out, cache = queue.Queue(maxsize=2), FakeCache()
+    t = _start(out, threading.Event(), cache)
+    items = []
+    while (item := out.get(timeout=5)) is not service._DONE:
+        items.append(item)
+    # the cache entry exists by the time the response is complete
+    assert cache.puts == [CONFIG]
+    t.join(5)
+    assert [df.academic_year[0] for df in items] == [2020, 2021, 2022, 2023, 2024]
+
+
+@pytest.mark.parametrize("end_year", [2021, 2024])
+def test_disconnect_with_full_queue_releases_worker(fake_generation, end_year):
+    # 2021: the two batches fill the queue exactly and the worker blocks on _DONE
+    out, cancelled = queue.Queue(maxsize=2), threading.Event()
+    t = _start(out, cancelled, None, {**CONFIG, "end_year": end_year})
+    _wait_full(out)
+    cancelled.set()                       # the client went away; nobody reads `out` any more
+    t.join(5)
+    assert not t.is_alive()
+
+
+def test_error_is_delivered_and_cancellable(fake_generation):
+    fake_generation["fail"] = True
+    out = queue.Queue(maxsize=2)
+    t = _start(out, threading.Event())
+    items = [out.get(timeout=5), out.get(timeout=5)]
+    assert isinstance(items[-1], RuntimeError)
+    t.join(5)
+    assert not t.is_alive()
+
+    # same error with a full queue and a client that is gone: the worker still exits
+    out, cancelled = queue.Queue(maxsize=1), threading.Event()
+    t = _start(out, cancelled)
+    _wait_full(out)
+    cancelled.set()
+    t.join(5)
+    assert not t.is_alive()
+
+
+def test_parse_spec_rejects_unknown_table():
+    with pytest.raises(ValueError):
+        service.parse_spec({"num_students": 10, "school_start": 2020, "subjects": ["Math"],
+                            "table": "nope"})
+
+
+def test_streamed_table_matches_generate_all(subjects):
+    config = {"students": 60, "start_year": 2015, "end_year": 2018, "seed": 3, "rollups": True,
+              "snapshots": True, "subjects": subjects}
+    full = service.generate_all(**config, ctx=service._warm_context(3).reseed(3))
+    for table, expected in full.items():
+        parts = []
+        service._stream_table(config, table, service._warm_context(3).reseed(3), parts.append)
+        got = pd.concat(parts, ignore_index=True)
+        pd.testing.assert_frame_equal(got, expected.reset_index(drop=True), check_dtype=False, obj=table)
+
+
+def _request(port):
+    body = json.dumps({"num_students": 10, "school_start": 2020, "subjects": ["Math"]}).encode()
+    sock = socket.create_connection(("127.0.0.1", port), timeout=5)
+    sock.sendall(b"POST /generate HTTP/1.1\r\nHost: x\r\nContent-Type: application/json\r\n"
+                 b"Content-Length: %d\r\n\r\n%s" % (len(body), body))
+    assert sock.recv(12) == b"HTTP/1.1 200"
+    return sock
+
+
+def test_client_leaving_while_queued_is_noticed(monkeypatch):
+    monkeypatch.setattr(service, "POLL_SECONDS", 0.05)
+    gate, jobs, finished = threading.Event(), [], []
+
+    def stream_table(config, table, ctx, put):
+        jobs.append(config)
+        gate.wait(5)                          # the only worker is busy until released
+        put(pd.DataFrame({"enrollment_id": [1]}))
+
+    do_post = service.GenerationHandler.do_POST
+
+    def tracked(handler):
+        do_post(handler)
+        finished.append(handler.client_address)
+
+    monkeypatch.setattr(service, "_stream_table", stream_table)
+    monkeypatch.setattr(service, "_warm_context", lambda seed: SimpleNamespace(reseed=lambda s: None))
+    monkeypatch.setattr(service.GenerationHandler, "do_POST", tracked)
+    server = service.GenerationServer(("127.0.0.1", 0), workers=1)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        busy = _request(server.server_address[1])
+        waiting = _request(server.server_address[1])
+        waiting.close()                       # gives up while its job is still queued
+        for _ in range(100):
+            if finished:
+                break
+            time.sleep(0.02)
+        assert len(finished) == 1 and not gate.is_set()
+
+        gate.set()
+        busy.settimeout(5)
+        data = b""
+        while not data.endswith(b"0\r\n\r\n"):
+            data += busy.recv(4096)
+        busy.close()
+        time.sleep(0.2)
+        assert len(jobs) == 1                 # the abandoned job never ran
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,19 @@
+import pytest
+
+from csv_export import write_tables
+from generator import generate_all
+from validate import validate_dataset
+
+
+@pytest.fixture(scope="module")
+def tables(subjects):
+    return generate_all(60, 2015, subjects, end_year=2019, seed=5)
+
+
+@pytest.mark.parametrize("compression", ["gzip", "zstd"])
+def test_compressed_csv_is_found_and_read(tmp_path, tables, compression):
+    write_tables(tables, str(tmp_path / "plain"))
+    write_tables(tables, str(tmp_path / "packed"), compression)
+    plain = validate_dataset(str(tmp_path / "plain"), chunk_rows=100)
+    packed = validate_dataset(str(tmp_path / "packed"), chunk_rows=100)
+    assert plain.ok and packed.to_dict() == plain.to_dict()
@@ -1,20 +1,33 @@
 # ui.py
+import threading
+import time
 import tkinter as tk
+from functools import lru_cache
 from tkinter import ttk, messagebox, filedialog
-from generator import (
-    generate_grade_table,
-    generate_student_details,
-    generate_student_enrollment,
-    generate_academic_and_events
-)
+from generator import TABLES, generate_all
 from bigquery_loader import upload_all_to_bq
-import pandas as pd
+from output_cache import OutputCache
+from csv_export import write_tables
+from pipeline import BigQuerySink, generate_and_upload
+from estimator import estimate
+from engine import GeneratorContext
+from table_viewer import DataFrameSource, TableViewer, directory_sources
 from datetime import datetime
 
+PREVIEW_STUDENTS = 200
+
+
+@lru_cache(maxsize=8)
+def _warm_context(seed):
+    # name pools are the slow part of a small run; keep them per seed across previews
+    return GeneratorContext.create(name_pool_seed=seed)
+
+
 class SchoolRecordsApp(tk.Tk):
     def __init__(self):
         super().__init__()
         self.title("School Records Generator")
+        self._estimate, self._est_job, self._est_gen = None, None, 0
         self._build_ui()
 
     def _build_ui(self):
@@ -31,22 +44,139 @@ class SchoolRecordsApp(tk.Tk):
         self.t_subs = tk.Text(frm, width=30, height=8)
         self.t_subs.grid(row=2, column=1)
 
+        ttk.Label(frm, text="Seed (optional, enables cache):").grid(row=3, column=0, sticky="w")
+        self.e_seed = ttk.Entry(frm); self.e_seed.grid(row=3, column=1)
+
+        self.v_rollups = tk.BooleanVar(value=False)
+        ttk.Checkbutton(frm, text="Also produce rollup tables", variable=self.v_rollups)\
+            .grid(row=4, column=0, columnspan=2, sticky="w")
+
+        self.v_snapshots = tk.BooleanVar(value=False)
+        ttk.Checkbutton(frm, text="Also produce student_state_by_year", variable=self.v_snapshots)\
+            .grid(row=5, column=0, columnspan=2, sticky="w")
+
+        ttk.Label(frm, text="Output folder:").grid(row=6, column=0, sticky="w")
+        self.e_out = ttk.Entry(frm); self.e_out.grid(row=6, column=1)
+        self.e_out.insert(0, ".")
+        ttk.Button(frm, text="Browse…", command=self._browse_out_dir).grid(row=6, column=2)
+
+        ttk.Label(frm, text="Compression:").grid(row=7, column=0, sticky="w")
+        self.c_compression = ttk.Combobox(frm, values=["none", "gzip", "zstd"], state="readonly")
+        self.c_compression.set("none"); self.c_compression.grid(row=7, column=1)
+
+        self.l_estimate = ttk.Label(frm, text="", wraplength=360)
+        self.l_estimate.grid(row=8, column=0, columnspan=3, sticky="w", pady=(8, 0))
+
         ttk.Button(frm, text="Generate CSVs", command=self._generate_csvs)\
-            .grid(row=3, column=0, columnspan=2, pady=10, sticky="ew")
+            .grid(row=9, column=0, columnspan=2, pady=10, sticky="ew")
 
         ttk.Button(frm, text="Upload to BigQuery", command=self._open_upload_dialog)\
-            .grid(row=4, column=0, columnspan=2, pady=10, sticky="ew")
+            .grid(row=10, column=0, columnspan=2, pady=10, sticky="ew")
+
+        ttk.Button(frm, text=f"Preview ({PREVIEW_STUDENTS} students)", command=self._preview)\
+            .grid(row=11, column=0, pady=(0, 10), sticky="ew")
+        ttk.Button(frm, text="View output folder", command=self._view_output)\
+            .grid(row=11, column=1, pady=(0, 10), sticky="ew")
 
         self.status = ttk.Label(frm, text="", foreground="green")
-        self.status.grid(row=5, column=0, columnspan=2)
+        self.status.grid(row=12, column=0, columnspan=2)
+
+        # live run-size estimate, refreshed shortly after the inputs change
+        for w in (self.e_students, self.e_start, self.t_subs):
+            w.bind("<KeyRelease>", self._schedule_estimate)
+        self.v_rollups.trace_add("write", self._schedule_estimate)
+        self.v_snapshots.trace_add("write", self._schedule_estimate)
+
+    def _browse_out_dir(self):
+        p = filedialog.askdirectory()
+        if p: self.e_out.delete(0,tk.END); self.e_out.insert(0,p)
+
+    def _schedule_estimate(self, *_):
+        self._estimate = None
+        if self._est_job:
+            self.after_cancel(self._est_job)
+        self._est_job = self.after(400, self._start_estimate)
+
+    def _start_estimate(self):
+        self._est_job, self._estimate = None, None
+        self._est_gen += 1
+        try:
+            c = self._config()
+        except ValueError:
+            return self.l_estimate.config(text="")
+        if c["students"] <= 0 or len(c["subjects"]) < 5:
+            return self.l_estimate.config(text="")
+        self.l_estimate.config(text="Estimating…", foreground="gray")
+        # the first estimate for a config runs a small pilot: keep it off the Tk thread
+        result = {}
+        def _work():
+            try:
+                result["est"] = estimate(c["students"], c["start_year"], c["subjects"], c["end_year"],
+                                         rollups=c["rollups"], snapshots=c["snapshots"])
+            except Exception as e:
+                result["error"] = e
+        worker = threading.Thread(target=_work, daemon=True)
+        worker.start()
+        self._poll_estimate(worker, result, self._est_gen)
+
+    def _poll_estimate(self, worker, result, gen):
+        if worker.is_alive():
+            return self.after(100, self._poll_estimate, worker, result, gen)
+        if gen != self._est_gen:
+            return   # inputs changed meanwhile
+        est = result.get("est")
+        self._estimate = est
+        if est is None:
+            return self.l_estimate.config(text="")
+        warn = est.exceeds_memory or est.long_run
+        self.l_estimate.config(text=est.summary(), foreground="red" if warn else "gray")
+
+    def _confirm_run(self):
+        """Ask before a run the estimator flags as too big or too long (cache hits are free)."""
+        config = self._config()
+        if config["seed"] is not None and config in OutputCache():
+            return True
+        est = self._estimate or estimate(config["students"], config["start_year"],
+                                         config["subjects"], config["end_year"],
+                                         rollups=config["rollups"], snapshots=config["snapshots"])
+        if not (est.exceeds_memory or est.long_run):
+            return True
+        return messagebox.askyesno("Large run", f"This run is estimated at:\n\n{est.summary()}\n\nContinue?")
+
+    def _preview(self):
+        """Small seeded sample of the current config, all years, in the table viewer."""
+        try:
+            config = self._config()
+            seed = config["seed"] if config["seed"] is not None else 0
+            config.update(students=min(PREVIEW_STUDENTS, config["students"]), seed=seed)
+            t0 = time.perf_counter()
+            tables = generate_all(**config, ctx=_warm_context(seed).reseed(seed))
+            TableViewer(self, {nm: DataFrameSource(df) for nm, df in tables.items()},
+                        title=f"Preview – {config['students']} students, seed {seed}")
+            self.status.config(text=f"👀 Preview generated in {time.perf_counter() - t0:.2f}s.")
+        except Exception as e:
+            messagebox.showerror("Preview Error", str(e))
+
+    def _view_output(self):
+        """Page through the CSV / Parquet tables in the output folder, straight from disk."""
+        out_dir = self.e_out.get().strip() or "."
+        try:
+            sources = directory_sources(out_dir)
+            if not sources:
+                return messagebox.showinfo("View output", f"No .csv or .parquet tables in {out_dir}.")
+            TableViewer(self, sources, title=f"Output – {out_dir}")
+        except Exception as e:
+            messagebox.showerror("View Error", str(e))
 
     def _generate_csvs(self):
         try:
-            dfs = self._make_all_dfs()
-            names = ["grades","students","academic","graduates","terminated"]
-            for df, nm in zip(dfs, names):
-                df.to_csv(f"{nm}.csv", index=False)
-            self.status.config(text="✅ CSVs generated.")
+            if not self._confirm_run():
+                return
+            compression = self.c_compression.get()
+            out_dir = self.e_out.get().strip() or "."
+            write_tables(self._make_all_dfs(), out_dir,
+                         None if compression == "none" else compression)
+            self.status.config(text=f"✅ CSVs generated in {out_dir}.")
         except Exception as e:
             messagebox.showerror("Error", str(e))
 
@@ -69,26 +199,47 @@ class SchoolRecordsApp(tk.Tk):
             p = filedialog.askopenfilename(filetypes=[("JSON","*.json")])
             if p: entry.delete(0,tk.END); entry.insert(0,p)
 
+        stream = tk.BooleanVar(value=False)
+        ttk.Checkbutton(frm2, text="Upload each year while generating (five tables only)",
+                        variable=stream).grid(row=3, column=0, columnspan=3, sticky="w")
+
         def _do_upload():
             try:
-                dfs = self._make_all_dfs()
-                upload_all_to_bq(*dfs, key=key.get().strip(),project_id= pid.get().strip(),dataset_id= did.get().strip())
+                if not self._confirm_run():
+                    return
+                if stream.get():
+                    c = self._config()
+                    sink = BigQuerySink(pid.get().strip(), did.get().strip(), key=key.get().strip())
+                    generate_and_upload(c["students"], c["start_year"], c["subjects"], sink,
+                                        end_year=c["end_year"], seed=c["seed"])
+                else:
+                    tables = self._make_all_dfs()
+                    extra = {nm: df for nm, df in tables.items() if nm not in TABLES}
+                    upload_all_to_bq(*(tables[nm] for nm in TABLES), key=key.get().strip(),project_id= pid.get().strip(),dataset_id= did.get().strip(),
+                                     extra_tables=extra)
                 messagebox.showinfo("Success", "Uploaded!")
                 dlg.destroy()
             except Exception as e:
                 messagebox.showerror("Upload Error", str(e))
 
         ttk.Button(frm2, text="Upload", command=_do_upload)\
-            .grid(row=3, column=0, columnspan=3, sticky="ew", pady=10)
+            .grid(row=4, column=0, columnspan=3, sticky="ew", pady=10)
+
+    def _config(self):
+        seed = self.e_seed.get().strip()
+        return {"students":   int(self.e_students.get()),
+                "start_year": int(self.e_start.get()),
+                "end_year":   datetime.now().year,
+                "subjects":   [s.strip() for s in self.t_subs.get("1.0",tk.END).splitlines() if s.strip()],
+                "seed":       int(seed) if seed else None,
+                "rollups":    self.v_rollups.get(),
+                "snapshots":  self.v_snapshots.get()}
 
     def _make_all_dfs(self):
-        n     = int(self.e_students.get())
-        start = int(self.e_start.get())
-        subs  = [s.strip() for s in self.t_subs.get("1.0",tk.END).splitlines() if s.strip()]
-        grade_df = generate_grade_table(subs)
-        det_df   = generate_student_details(n, start)
-        enr_df   = generate_student_enrollment(det_df, start, n)
-        students = enr_df.merge(det_df, on="student_id")\
-                         .assign(last_pct=None, fail_count=0, terminated=False)
-        acad, grads, term = generate_academic_and_events(students, grade_df, start, datetime.now().year)
-        return grade_df, students, acad, grads, term
+        config = self._config()
+        if config["seed"] is None:
+            tables = generate_all(**config)
+        else:
+            # same seeded config → same tables: serve repeats from the cache
+            tables = OutputCache().get_or_build(config, lambda: generate_all(**config))
+        return tables
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+validate.py
+
+Streaming sanity checks for a generated dataset directory (CSV, gzip /
+zstd CSV or Parquet, as written by the GUI, the CLI scripts,
+out_of_core.py or sweep.py). Tables are read in chunks of `chunk_rows`; only ID arrays are
+kept across chunks (8 bytes per student / academic row), never a full
+table, so validation costs a fraction of generation.
+
+Referential integrity:
+  • students.enrollment_id is unique
+  • (enrollment_id, academic_year) is unique in academic
+  • every academic / graduates / terminated enrollment_id is a student
+  • every graduate passed the final grade
+  • every terminated student failed their grade `max_fails` times
+Value checks: grade within the grade table, percentage within 0–100.
+Distribution stats: rows per year, per-grade mean % and pass rate, class
+shares and a 10-point percentage histogram.
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+import profiling
+from engine.rules import PASS_MARK
+
+# the annual and semester layouts name a few columns differently
+_ACADEMIC_TABLES = ["academic", "academic_records"]
+_GRADE_COLS = ["grade", "grade_current"]
+_CLASS_COLS = ["class", "class_current"]
+_PCT_COLS   = ["final_percentage", "Total Weighted percentage in current academic year"]
+_EXAMPLES   = 5
+_EXTENSIONS = ["parquet", "csv", "csv.gz", "csv.zst"]
+
+
+# —————— Chunked readers ——————
+
+def _open_csv(path):
+    # Arrow decompresses .gz / .zst itself (pandas would need the zstandard package)
+    return pa.input_stream(path, compression="detect")
+
+
+def _find(data_dir, name):
+    for ext in _EXTENSIONS:
+        p = os.path.join(data_dir, f"{name}.{ext}")
+        if os.path.exists(p):
+            return p
+    return None
+
+
+def _columns(path):
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        return pq.ParquetFile(path).schema_arrow.names
+    with _open_csv(path) as f:
+        return list(pd.read_csv(f, nrows=0).columns)
+
+
+def iter_chunks(path, columns, chunk_rows):
+    """Yield DataFrames of at most `chunk_rows` rows with just `columns`."""
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows, columns=columns):
+            yield batch.to_pandas()
+    else:
+        with _open_csv(path) as f:
+            yield from pd.read_csv(f, usecols=columns, chunksize=chunk_rows)
+
+
+def _pick(available, candidates, table):
+    for c in candidates:
+        if c in available:
+            return c
+    raise ValueError(f"{table}: none of the columns {candidates} found")
+
+
+# —————— Report ——————
+
+class Report:
+    def __init__(self):
+        self.violations = {}
+        self.stats = {}
+
+    def flag(self, check, ids):
+        ids = np.asarray(ids)
+        if not len(ids):
+            return
+        v = self.violations.setdefault(check, {"count": 0, "examples": []})
+        v["count"] += int(len(ids))
+        room = _EXAMPLES - len(v["examples"])
+        v["examples"] += [int(x) for x in ids[:room]]
+
+    @property
+    def ok(self):
+        return not self.violations
+
+    def to_dict(self):
+        return {"ok": self.ok, "violations": self.violations, "stats": self.stats}
+
+
+def _duplicates(sorted_ids):
+    return np.unique(sorted_ids[1:][sorted_ids[1:] == sorted_ids[:-1]])
+
+
+def _missing(ids, sorted_universe):
+    if sorted_universe is None:   # check skipped
+        return ids[:0]
+    pos = np.searchsorted(sorted_universe, ids)
+    pos[pos == len(sorted_universe)] = 0
+    return ids[sorted_universe[pos] != ids] if len(sorted_universe) else ids
+
+
+# —————— Validation ——————
+
+def validate_dataset(data_dir, chunk_rows=1_000_000, max_fails=3, pass_mark=PASS_MARK):
+    """Validate the tables under `data_dir`; returns a Report."""
+    rep = Report()
+    paths = {nm: _find(data_dir, nm) for nm in ["grades", "students", "graduates", "terminated"]}
+    paths["academic"] = next(filter(None, (_find(data_dir, t) for t in _ACADEMIC_TABLES)), None)
+    missing = [nm for nm in ("grades", "students", "academic") if paths[nm] is None]
+    if missing:
+        raise FileNotFoundError(f"{data_dir}: missing tables {missing}")
+
+    grades = pd.concat(iter_chunks(paths["grades"], None, chunk_rows), ignore_index=True)
+    valid_grades = np.sort(grades["grade"].unique())
+    final_grade = int(valid_grades.max())
+
+    # students (the semester layout's students table carries no enrollment_id)
+    eids = None
+    if "enrollment_id" in _columns(paths["students"]):
+        eids = np.concatenate([c["enrollment_id"].to_numpy(np.int64)
+                               for c in iter_chunks(paths["students"], ["enrollment_id"], chunk_rows)])
+        eids.sort()
+        rep.flag("students.enrollment_id duplicated", _duplicates(eids))
+        rep.stats["students"] = int(len(eids))
+    else:
+        rep.stats["skipped"] = ["students has no enrollment_id: *.enrollment_id in students"]
+
+    # academic
+    cols = _columns(paths["academic"])
+    gcol, ccol, pcol = (_pick(cols, c, "academic") for c in (_GRADE_COLS, _CLASS_COLS, _PCT_COLS))
+    row_keys, passed_final, fail_keys = [], [], []
+    per_year, per_grade, per_class = [], [], []
+    hist = np.zeros(10, dtype=np.int64)
+    for c in iter_chunks(paths["academic"], ["academic_year", "enrollment_id", gcol, ccol, pcol], chunk_rows):
+        eid  = c["enrollment_id"].to_numpy(np.int64)
+        year = c["academic_year"].to_numpy(np.int64)
+        grade = c[gcol].to_numpy(np.int64)
+        pct  = pd.to_numeric(c[pcol], errors="coerce").to_numpy(np.float64)
+
+        rep.flag("academic.enrollment_id not in students", _missing(eid, eids))
+        rep.flag("academic.grade outside grade table", eid[~np.isin(grade, valid_grades)])
+        rep.flag("academic percentage outside 0-100", eid[(pct < 0) | (pct > 100) | np.isnan(pct)])
+
+        row_keys.append(eid * 10_000 + year)
+        passed = pct >= pass_mark
+        passed_final.append(eid[passed & (grade == final_grade)])
+        fail_keys.append(eid[~passed] * 100 + grade[~passed])
+
+        per_year.append(pd.Series(1, index=year).groupby(level=0).sum())
+        per_grade.append(pd.DataFrame({"rows": 1, "pct_sum": pct, "passes": passed.astype(np.int64)},
+                                      index=grade).groupby(level=0).sum())
+        per_class.append(c[ccol].value_counts())
+        hist += np.bincount(np.clip((pct[~np.isnan(pct)] // 10).astype(np.int64), 0, 9), minlength=10)
+
+    row_keys = np.sort(np.concatenate(row_keys)) if row_keys else np.empty(0, np.int64)
+    rep.flag("academic (enrollment_id, academic_year) duplicated", _duplicates(row_keys) // 10_000)
+    del row_keys
+    passed_final = np.unique(np.concatenate(passed_final)) if passed_final else np.empty(0, np.int64)
+    fk, fcount = np.unique(np.concatenate(fail_keys), return_counts=True) if fail_keys \
+        else (np.empty(0, np.int64), np.empty(0, np.int64))
+    struck_out = fk[fcount >= max_fails]
+
+    # graduates / terminated
+    if paths["graduates"]:
+        for c in iter_chunks(paths["graduates"], ["enrollment_id"], chunk_rows):
+            eid = c["enrollment_id"].to_numpy(np.int64)
+            rep.flag("graduates.enrollment_id not in students", _missing(eid, eids))
+            rep.flag(f"graduate without a passed grade {final_grade} record", _missing(eid, passed_final))
+            rep.stats["graduates"] = rep.stats.get("graduates", 0) + len(eid)
+    if paths["terminated"]:
+        for c in iter_chunks(paths["terminated"], ["enrollment_id", "grade"], chunk_rows):
+            eid = c["enrollment_id"].to_numpy(np.int64)
+            key = eid * 100 + c["grade"].to_numpy(np.int64)
+            rep.flag("terminated.enrollment_id not in students", _missing(eid, eids))
+            rep.flag(f"terminated without {max_fails} failures in their grade",
+                     _missing(key, struck_out) // 100)
+            rep.stats["terminated"] = rep.stats.get("terminated", 0) + len(eid)
+
+    # distribution stats
+    years = pd.concat(per_year).groupby(level=0).sum() if per_year else pd.Series(dtype=int)
+    g = pd.concat(per_grade).groupby(level=0).sum() if per_grade else pd.DataFrame()
+    classes = pd.concat(per_class).groupby(level=0).sum() if per_class else pd.Series(dtype=int)
+    rep.stats["academic_rows"] = int(years.sum())
+    rep.stats["rows_per_year"] = {int(k): int(v) for k, v in years.items()}
+    rep.stats["per_grade"] = {int(k): {"rows": int(r.rows),
+                                       "mean_pct": round(r.pct_sum / r.rows, 2),
+                                       "pass_rate": round(r.passes / r.rows, 4)}
+                              for k, r in g.iterrows()}
+    rep.stats["class_share"] = {str(k): round(v / classes.sum(), 4) for k, v in classes.items()}
+    rep.stats["pct_histogram"] = {f"{10 * i}-{10 * i + 10}": int(h) for i, h in enumerate(hist)}
+    return rep
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Streaming validator for generated school datasets")
+    ap.add_argument("data_dir")
+    ap.add_argument("--chunk-rows", type=int, default=1_000_000)
+    ap.add_argument("--report", default=None, help="write the JSON report here")
+    profiling.add_argument(ap)
+    args = ap.parse_args()
+
+    with profiling.session(profiling.profile_dir(args.profile)), profiling.phase("validate"):
+        rep = validate_dataset(args.data_dir, args.chunk_rows)
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(rep.to_dict(), f, indent=2)
+    for check, v in rep.violations.items():
+        print(f"❌ {check}: {v['count']} (e.g. {v['examples']})")
+    print("✅ No violations" if rep.ok else f"⚠️  {len(rep.violations)} checks failed")
+    raise SystemExit(0 if rep.ok else 1)
+
+
+if __name__ == "__main__":
+    main()